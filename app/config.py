@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 import os
 from dotenv import load_dotenv
 
@@ -21,10 +21,95 @@ class Settings(BaseSettings):
     
     # Redis (for caching and session management)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    REDIS_MAX_CONNECTIONS: int = 50  # per worker
+    REDIS_TIMEOUT_SECONDS: float = 0.25  # connect and per-command; Redis is always optional
+    
+    # Outbound SMS: "auto" sends through Twilio when configured, else logs to the console
+    SMS_PROVIDER: str = "auto"
+    SMS_WORKERS: int = 4  # concurrent sends per process
+    SMS_QUEUE_MAX_SIZE: int = 1000
+    SMS_MAX_ATTEMPTS: int = 4
+    SMS_RETRY_BASE_SECONDS: float = 1.0
+    SMS_RETRY_MAX_SECONDS: float = 30.0
+    SMS_PHONE_INTERVAL_SECONDS: int = 60  # one code per phone per interval
+    SMS_PHONE_HOURLY_LIMIT: int = 5
+    SMS_GLOBAL_RATE_PER_SECOND: int = 20  # across all workers
+    
+    # Outbound HTTP (FCM, Twilio)
+    EXTERNAL_HTTP_TIMEOUT_SECONDS: float = 5.0
+    HTTP_POOL_SIZE: int = 10
     
     # File upload
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024  # 64KB per read while streaming uploads
+    
+    # Image pipeline (thumbnails and compressed derivatives)
+    IMAGE_PROCESSING_WORKERS: int = 2
+    IMAGE_VARIANT_QUALITY: int = 80
+    
+    # Pharmacist verification queue
+    PRESCRIPTION_CLAIM_LEASE_SECONDS: int = 15 * 60
+    
+    # Prescription line -> catalog matching
+    MEDICINE_MATCH_MIN_SCORE: float = 0.6  # below this a line is left for manual search
+    
+    # Precomputed alternatives per medicine
+    SUBSTITUTES_PER_MEDICINE: int = 10
+    
+    # Bulk catalog import
+    CATALOG_IMPORT_CHUNK_SIZE: int = 1000
+    CATALOG_IMPORT_MAX_ERRORS: int = 1000  # per-row errors kept in the report
+    # Stock syncs touching more medicines than this rebuild the indexes in the background
+    STOCK_SYNC_INCREMENTAL_LIMIT: int = 200
+    
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # used when the optional brotli package is installed
+    
+    # Shared cache: "redis", or "memory" for tests and single-node deployments
+    CACHE_BACKEND: str = "redis"
+    CACHE_DEFAULT_TTL_SECONDS: float = 300
+    CACHE_LOCAL_MAX_ENTRIES: int = 10_000  # per-process LRU in front of the backend
+    CACHE_LOCAL_TTL_SECONDS: float = 5  # bounds staleness if an invalidation message is lost
+    CATALOG_CACHE_MAX_BYTES: int = 256 * 1024  # larger catalog responses are not cached
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 300
+    ETA_CACHE_TTL_SECONDS: float = 30  # partners move; estimates are cached per ~100 m cell
+    
+    # Rate limiting: "<METHOD> <path> <ip|user> <token_bucket|sliding_window> <limit>/<seconds>"
+    # (a trailing * in the path matches a prefix; user policies count anonymous callers by IP)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_POLICIES: List[str] = [
+        "POST /auth/login ip sliding_window 10/60",  # credential stuffing; each attempt is a bcrypt check
+        "POST /auth/login ip sliding_window 100/3600",
+        "POST /auth/send-verification-code user sliding_window 10/3600",
+        "GET /medicines/search ip token_bucket 120/60",  # bursts of 120, then 2 per second
+        "GET /medicines/search user token_bucket 60/60",
+    ]
+    RATE_LIMIT_TRUSTED_PROXY_HOPS: int = 0  # proxies appending to X-Forwarded-For; 0 uses the peer address
+    
+    # Idempotency-Key on checkout and delivery proof uploads
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600  # how long a response is replayed to retries
+    IDEMPOTENCY_LOCK_SECONDS: int = 60  # longer than any of those requests takes
+    IDEMPOTENCY_WAIT_SECONDS: float = 15  # a duplicate waits this long for the first, then gets 409
+    
+    # Transactional outbox: order side effects (tracking, push notifications) delivered in batches
+    OUTBOX_RELAY_ENABLED: bool = True  # run the relay thread in this process
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_SECONDS: float = 1.0  # commits wake the relay; polling picks up retries and other workers
+    OUTBOX_LEASE_SECONDS: int = 60  # a claimed batch is redelivered if its relay dies
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BASE_SECONDS: float = 5.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 600.0
+    
+    # Request metrics, served in Prometheus text format on /metrics
+    METRICS_ENABLED: bool = True
+    
+    # Per-request query profiler (development/staging): logs N+1 patterns and slow statements
+    QUERY_PROFILER_ENABLED: bool = False
+    QUERY_PROFILER_SLOW_MS: float = 100.0
+    QUERY_PROFILER_N_PLUS_ONE_THRESHOLD: int = 5  # repeats of one SELECT shape per request
     
     class Config:
         env_file = ".env"
@@ -1,12 +1,68 @@
+import itertools
+from datetime import datetime
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+from app.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.utils.auth import verify_token
+from app.utils.cache import Cache
 from app.schemas.user import TokenData
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Authenticated principals by email, so most requests skip the user lookup.
+# The password hash is never cached; it loads on access like any unloaded column.
+principal_cache = Cache("principal", ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+_PRINCIPAL_COLUMNS = [column for column in User.__table__.columns if column.name != "hashed_password"]
+
+def _principal_to_dict(user: User) -> dict:
+    return {column.name: getattr(user, column.name) for column in _PRINCIPAL_COLUMNS}
+
+def _principal_from_dict(db: Session, data: dict) -> User:
+    values = {}
+    for column in _PRINCIPAL_COLUMNS:
+        value = data.get(column.name)
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        values[column.name] = value
+    user = User(**values)
+    make_transient_to_detached(user)
+    # Attached without a SELECT; changes made by the endpoint flush as usual
+    return db.merge(user, load=False)
+
+def load_principal(db: Session, email: str) -> Optional[User]:
+    cached = principal_cache.get(email)
+    if cached is not None:
+        existing = db.identity_map.get(identity_key(User, cached["id"]))
+        return existing if existing is not None else _principal_from_dict(db, cached)
+    user = db.query(User).filter(User.email == email).first()
+    if user is not None:
+        principal_cache.set(email, _principal_to_dict(user))
+    return user
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_principals(session, flush_context):
+    for instance in itertools.chain(session.dirty, session.deleted):
+        if isinstance(instance, User):
+            emails = session.info.setdefault("principals_changed", set())
+            emails.add(instance.email)
+            emails.update(inspect(instance).attrs.email.history.deleted or ())
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session):
+    emails = session.info.pop("principals_changed", None)
+    if emails:
+        principal_cache.delete(*emails)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principals(session):
+    session.info.pop("principals_changed", None)
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -23,7 +79,7 @@ def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = load_principal(db, token_data.email)
     if user is None:
         raise credentials_exception
     
@@ -35,6 +91,21 @@ def get_current_user(
     
     return user
 
+def get_current_user_optional(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Optional[User]:
+    """Get current user if a valid bearer token was sent, otherwise None."""
+    if credentials is None:
+        return None
+    token_data = verify_token(credentials.credentials)
+    if token_data is None:
+        return None
+    user = load_principal(db, token_data.email)
+    if user is None or not user.is_active:
+        return None
+    return user
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user."""
     if not current_user.is_active:
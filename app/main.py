@@ -1,10 +1,20 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.routers import auth_router, medicines_router, categories_router, prescriptions_router, cart_router, orders_router, delivery_router, help_router
+from app.routers import auth_router, medicines_router, categories_router, prescriptions_router, cart_router, orders_router, delivery_router, help_router, uploads_router
 from app.database import engine
-from app.models import User, Medicine, Category, Prescription, PrescriptionMedicine, Cart, CartItem, Order, OrderItem, DeliveryTracking, DeliveryProof, DeliveryPartner, Pharmacy, EmergencyDeliveryRequest
+from app.models import User, Medicine, Category, Prescription, PrescriptionMedicine, Cart, CartItem, Order, OrderItem, DeliveryTracking, DeliveryProof, DeliveryPartner, Pharmacy, EmergencyDeliveryRequest, StoredFile, OrderEvent, OutboxMessage
 from app.config import settings
+from app.utils.clients import check_health, close_clients
+from app.utils.image_processing import shutdown_image_pipeline
+from app.utils.compression import CompressionMiddleware
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils.catalog_version import CatalogETagMiddleware
+from app.utils.metrics import MetricsMiddleware, registry as metrics_registry
+from app.utils.outbox import outbox_relay
+from app.utils.sms_queue import sms_queue
+from app.utils.query_profiler import QueryProfilerMiddleware
+from app.utils.rate_limit import RateLimitMiddleware
 import os
 
 # Create database tables
@@ -22,14 +32,33 @@ DeliveryProof.metadata.create_all(bind=engine)
 DeliveryPartner.metadata.create_all(bind=engine)
 Pharmacy.metadata.create_all(bind=engine)
 EmergencyDeliveryRequest.metadata.create_all(bind=engine)
+StoredFile.metadata.create_all(bind=engine)
+OrderEvent.metadata.create_all(bind=engine)
+OutboxMessage.metadata.create_all(bind=engine)
 
 # Create FastAPI app
 app = FastAPI(
     title="Medicine Delivery API",
     description="Quick Commerce Medicine Delivery Platform API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Innermost, so stored responses are uncompressed and replays are compressed per request
+app.add_middleware(IdempotencyMiddleware)
+# Conditional GET for catalog listings, inside compression so 304s skip it
+app.add_middleware(CatalogETagMiddleware)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+)
+
+# Inside CORS, so browsers can read the 429
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,9 +68,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for uploaded images
-if os.path.exists(settings.UPLOAD_DIR):
-    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+if settings.QUERY_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Outermost, so latency covers every other middleware too
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router)
@@ -52,6 +84,19 @@ app.include_router(cart_router)
 app.include_router(orders_router)
 app.include_router(delivery_router)
 app.include_router(help_router)
+app.include_router(uploads_router)  # uploaded images, with access checks and HTTP caching
+
+@app.on_event("startup")
+def start_background_workers():
+    # Delivers messages left by a previous run or other workers, not just our own
+    outbox_relay.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    shutdown_image_pipeline()
+    sms_queue.stop()
+    outbox_relay.stop()
+    close_clients()
 
 @app.get("/")
 def read_root():
@@ -63,4 +108,13 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/dependencies")
+def dependency_health():
+    # Informational only: the API serves (degraded) without Redis or Twilio
+    return check_health()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4") 
\ No newline at end of file
@@ -9,9 +9,13 @@ from .delivery import DeliveryTracking, DeliveryProof
 from .delivery_partner import DeliveryPartner
 from .pharmacy import Pharmacy
 from .emergency_delivery import EmergencyDeliveryRequest
+from .stored_file import StoredFile
+from .order_event import OrderEvent
+from .outbox import OutboxMessage
 
 __all__ = [
     "User", "Medicine", "Category", "Prescription", "PrescriptionMedicine",
     "Cart", "CartItem", "Order", "OrderItem", "DeliveryTracking", "DeliveryProof",
-    "DeliveryPartner", "Pharmacy", "EmergencyDeliveryRequest"
+    "DeliveryPartner", "Pharmacy", "EmergencyDeliveryRequest", "StoredFile",
+    "OrderEvent", "OutboxMessage"
 ] 
\ No newline at end of file
@@ -12,6 +12,7 @@ class DeliveryTracking(Base):
     current_latitude = Column(Float, nullable=True)
     current_longitude = Column(Float, nullable=True)
     last_updated = Column(DateTime, default=func.now(), onupdate=func.now())
+    last_event_id = Column(Integer, nullable=True)  # newest order event applied; older ones arriving late are skipped
     
     # Relationships
     order = relationship("Order", back_populates="tracking")
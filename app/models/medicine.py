@@ -7,14 +7,17 @@ class Medicine(Base):
     __tablename__ = "medicines"
 
     id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String, unique=True, index=True, nullable=True)  # external catalog key used by bulk imports
     name = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=True)
+    composition = Column(String, nullable=True)  # active ingredients and strength, e.g. "Paracetamol 500mg"
     category = Column(String, nullable=True, index=True)
     price = Column(Float, nullable=False)
     stock = Column(Integer, default=0)
     prescription_required = Column(Boolean, default=False)
     manufacturer = Column(String, nullable=True)
     image_url = Column(String, nullable=True)
+    image_variants = Column(Text, nullable=True)  # JSON map of size variant -> path
     is_available = Column(Boolean, default=True)
     created_at = Column(String, default=func.now())
     updated_at = Column(String, default=func.now(), onupdate=func.now())
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, event
+from sqlalchemy.sql import func
+from app.database import Base
+
+class OrderEvent(Base):
+    """Append-only history of an order; the id orders events and is the replay cursor."""
+    __tablename__ = "order_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    event_type = Column(String, nullable=False)  # created, status_changed
+    from_status = Column(String, nullable=True)
+    to_status = Column(String, nullable=False)
+    actor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=func.now())
+
+    def __repr__(self):
+        return f"<OrderEvent(id={self.id}, order_id={self.order_id}, {self.from_status} -> {self.to_status})>"
+
+# An order's history, and its latest event during replay
+Index("ix_order_events_order_id_id", OrderEvent.order_id, OrderEvent.id)
+
+@event.listens_for(OrderEvent, "before_update")
+@event.listens_for(OrderEvent, "before_delete")
+def _append_only(mapper, connection, target):
+    raise ValueError("Order events are append-only")
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+class OutboxMessage(Base):
+    """Side effect committed with the change that caused it, delivered later by the relay."""
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=func.now())
+    available_at = Column(DateTime, nullable=False, default=func.now())  # retry backoff, or the relay's lease
+    claim_token = Column(String, nullable=True)  # relay batch holding the lease
+    attempts = Column(Integer, default=0, nullable=False)
+    processed_at = Column(DateTime, nullable=True)  # delivered, or given up on (last_error is set)
+    last_error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, topic='{self.topic}', attempts={self.attempts})>"
+
+# Relay claims: undelivered rows that are due
+Index(
+    "ix_outbox_messages_due",
+    OutboxMessage.available_at, OutboxMessage.id,
+    sqlite_where=text("processed_at IS NULL"),
+    postgresql_where=text("processed_at IS NULL")
+)
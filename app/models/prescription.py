@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, DateTime, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -10,12 +10,16 @@ class Prescription(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     image_url = Column(String, nullable=False)
+    image_variants = Column(Text, nullable=True)  # JSON map of size variant -> path
     description = Column(Text, nullable=True)
     is_verified = Column(Boolean, default=False)
     verified_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     verified_at = Column(DateTime, nullable=True)
     status = Column(String, default="pending")  # pending, verified, rejected
     notes = Column(Text, nullable=True)
+    priority = Column(Integer, default=0, nullable=False)  # 0 normal, 1 high, 2 critical
+    claimed_by = Column(Integer, ForeignKey("users.id"), nullable=True)  # pharmacist holding the review lease
+    claim_expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -25,4 +29,12 @@ class Prescription(Base):
     medicines = relationship("PrescriptionMedicine", back_populates="prescription")
 
     def __repr__(self):
-        return f"<Prescription(id={self.id}, user_id={self.user_id}, status='{self.status}')>" 
\ No newline at end of file
+        return f"<Prescription(id={self.id}, user_id={self.user_id}, status='{self.status}')>"
+
+# Verification queue: only pending rows, most urgent first, then oldest
+Index(
+    "ix_prescriptions_pending_queue",
+    Prescription.priority.desc(), Prescription.created_at,
+    sqlite_where=text("status = 'pending'"),
+    postgresql_where=text("status = 'pending'")
+)
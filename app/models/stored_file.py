@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class StoredFile(Base):
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, nullable=False, unique=True, index=True)  # content-addressed path relative to storage root
+    sha256 = Column(String, nullable=False, index=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    released_at = Column(DateTime, nullable=True)  # last time a reference was released
+
+    def __repr__(self):
+        return f"<StoredFile(key='{self.key}', ref_count={self.ref_count})>"
@@ -6,5 +6,6 @@ from .cart import router as cart_router
 from .orders import router as orders_router
 from .delivery import router as delivery_router
 from .help import router as help_router
+from .uploads import router as uploads_router
 
-__all__ = ["auth_router", "medicines_router", "categories_router", "prescriptions_router", "cart_router", "orders_router", "delivery_router", "help_router"] 
\ No newline at end of file
+__all__ = ["auth_router", "medicines_router", "categories_router", "prescriptions_router", "cart_router", "orders_router", "delivery_router", "help_router", "uploads_router"] 
\ No newline at end of file
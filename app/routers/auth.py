@@ -12,9 +12,9 @@ from app.schemas.user import (
 )
 from app.utils.auth import get_password_hash, verify_password, create_access_token
 from app.utils.sms import (
-    generate_verification_code, send_verification_sms, 
-    store_verification_code, verify_phone_code
+    generate_verification_code, store_verification_code, verify_phone_code
 )
+from app.utils.sms_queue import queue_verification_sms, release_phone_send, reserve_phone_send
 from app.dependencies import get_current_active_user
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -162,14 +162,24 @@ def send_phone_verification_code(
             detail="Phone number is already verified"
         )
     
-    # Generate and send verification code
+    retry_after = reserve_phone_send(phone)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many verification codes requested; try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
+    # Store the code and hand the SMS to the outbound queue
     verification_code = generate_verification_code()
     store_verification_code(phone, verification_code)
     
-    if send_verification_sms(phone, verification_code):
+    if queue_verification_sms(phone, verification_code):
         return {"message": "Verification code sent successfully"}
     else:
+        # Nothing was sent, so this attempt does not count against the phone's limits
+        release_phone_send(phone)
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send verification code"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="SMS service is busy; try again shortly"
         ) 
\ No newline at end of file
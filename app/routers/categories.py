@@ -2,19 +2,24 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List
+import orjson
+from fastapi.responses import Response
 
 from app.database import get_db
 from app.models.category import Category
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
 from app.dependencies import get_current_admin_user
+from app.utils.catalog_version import cached_catalog_body
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 @router.get("/", response_model=List[CategoryResponse])
 def get_all_categories(db: Session = Depends(get_db)):
     """Get all medicine categories."""
-    categories = db.query(Category).all()
-    return categories
+    body = cached_catalog_body("categories", "", lambda: orjson.dumps([
+        CategoryResponse.model_validate(category).model_dump(mode="json") for category in db.query(Category)
+    ]))
+    return Response(body, media_type="application/json")
 
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
 def create_category(
@@ -14,9 +14,17 @@ from app.schemas.delivery import (
     DeliveryEstimateRequest, DeliveryEstimateResponse
 )
 from app.dependencies import get_current_active_user
+from app.config import settings
+from app.utils.cache import Cache
+from app.utils.singleflight import SingleFlight
 
 router = APIRouter(prefix="/delivery", tags=["delivery"])
 
+# Nearest pharmacy and partner per ~100 m cell; independent of the medicine
+eta_cache = Cache("eta", ttl=settings.ETA_CACHE_TTL_SECONDS, local_ttl=settings.ETA_CACHE_TTL_SECONDS)
+eta_flight = SingleFlight("eta")
+ETA_CELL_DECIMALS = 3
+
 # Haversine formula for distance in km
 def haversine(lat1, lon1, lat2, lon2):
     R = 6371  # Earth radius in km
@@ -34,8 +42,6 @@ def get_delivery_estimate(
     db: Session = Depends(get_db)
 ):
     """Get delivery time estimate based on user location, partner, and pharmacy."""
-    # Find pharmacies with stock
-    pharmacies = db.query(Pharmacy).filter(Pharmacy.is_active == True).all()
     medicine = db.query(Medicine).filter(Medicine.id == medicine_id).first()
     if not medicine or not medicine.is_available or medicine.stock < 1:
         return DeliveryEstimateResponse(
@@ -44,11 +50,40 @@ def get_delivery_estimate(
             dynamic_price=0.0,
             message="Medicine not available"
         )
+    cell = (round(user_latitude, ETA_CELL_DECIMALS), round(user_longitude, ETA_CELL_DECIMALS))
+    cell_key = f"{cell[0]}:{cell[1]}"
+    route = eta_cache.get(cell_key)
+    if route is None:
+        # Clients in one cell at the same moment share a single lookup
+        route = eta_flight.do(cell_key, lambda: _cache_route(db, cell_key, cell))
+    min_distance, min_partner_distance = route["pharmacy_distance"], route["partner_distance"]
+    # Estimate time: 2 min/km, min 10, max 30
+    estimated_time = min(max(int((min_distance + min_partner_distance) * 2), 10), 30)
+    # Dynamic pricing: base + urgency
+    dynamic_price = medicine.price * (1.2 if estimated_time <= 15 else 1.0)
+    return DeliveryEstimateResponse(
+        estimated_time_minutes=estimated_time,
+        estimated_distance_km=round(min_distance + min_partner_distance, 2),
+        dynamic_price=round(dynamic_price, 2),
+        partner_id=route["partner_id"],
+        pharmacy_id=route["pharmacy_id"],
+        message="Estimate calculated"
+    )
+
+def _cache_route(db: Session, cell_key: str, cell) -> dict:
+    route = _nearest_route(db, *cell)
+    if route["partner_id"] is not None:  # distances are finite, so they survive JSON
+        eta_cache.set(cell_key, route)
+    return route
+
+def _nearest_route(db: Session, latitude: float, longitude: float) -> dict:
+    """Nearest active pharmacy to the location, and the nearest available partner to that pharmacy."""
     # Find nearest pharmacy with stock
+    pharmacies = db.query(Pharmacy).filter(Pharmacy.is_active == True).all()
     best_pharmacy = None
     min_distance = float('inf')
     for pharmacy in pharmacies:
-        dist = haversine(user_latitude, user_longitude, pharmacy.latitude, pharmacy.longitude)
+        dist = haversine(latitude, longitude, pharmacy.latitude, pharmacy.longitude)
         if dist < min_distance:
             min_distance = dist
             best_pharmacy = pharmacy
@@ -61,18 +96,12 @@ def get_delivery_estimate(
         if dist < min_partner_distance:
             min_partner_distance = dist
             best_partner = partner
-    # Estimate time: 2 min/km, min 10, max 30
-    estimated_time = min(max(int((min_distance + min_partner_distance) * 2), 10), 30)
-    # Dynamic pricing: base + urgency
-    dynamic_price = medicine.price * (1.2 if estimated_time <= 15 else 1.0)
-    return DeliveryEstimateResponse(
-        estimated_time_minutes=estimated_time,
-        estimated_distance_km=round(min_distance + min_partner_distance, 2),
-        dynamic_price=round(dynamic_price, 2),
-        partner_id=best_partner.id if best_partner else None,
-        pharmacy_id=best_pharmacy.id if best_pharmacy else None,
-        message="Estimate calculated"
-    )
+    return {
+        "pharmacy_id": best_pharmacy.id if best_pharmacy else None,
+        "pharmacy_distance": min_distance,
+        "partner_id": best_partner.id if best_partner else None,
+        "partner_distance": min_partner_distance,
+    }
 
 @router.get("/partners", response_model=List[DeliveryPartnerResponse])
 def get_delivery_partners(db: Session = Depends(get_db)):
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import io
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, BackgroundTasks, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
@@ -6,16 +9,43 @@ from typing import List, Optional
 from app.database import get_db
 from app.models.medicine import Medicine
 from app.schemas.medicine import (
-    MedicineCreate, MedicineUpdate, MedicineStockUpdate, MedicineResponse
+    MedicineCreate, MedicineUpdate, MedicineStockUpdate, MedicineResponse, CatalogImportReport,
+    MedicineStockSync, MedicineStockSyncResponse
 )
+from app.config import settings
 from app.dependencies import get_current_admin_user, get_current_active_user
+from app.utils.file_upload import stream_upload_to_disk, get_file_url
+from app.utils.storage import add_reference, release_reference
+from app.utils.image_processing import process_uploaded_image
+from app.utils.medicine_matching import refresh_catalog_index
+from app.utils.catalog_import import (
+    CATALOG_FORMATS, detect_format, iter_records, import_catalog, export_catalog, rebuild_derived_indexes
+)
+from app.utils.inventory import apply_stock_sync
+from app.utils.catalog_version import cached_catalog_body
+from app.utils.streaming import streaming_json_response, wants_ndjson
+from app.utils.serialization import MEDICINE_COLUMNS, medicine_row_to_dict, dump_medicine_row
+from app.utils.substitution_index import (
+    get_substitution_index, refresh_substitution_index
+)
 
 router = APIRouter(prefix="/medicines", tags=["medicines"])
 
+def _reindex(db: Session, medicine_ids: List[int]) -> None:
+    # Keep the in-memory matching and substitution indexes in step with catalog writes
+    refresh_catalog_index(db, medicine_ids)
+    refresh_substitution_index(db, medicine_ids)
+
 @router.get("/", response_model=List[MedicineResponse])
-def get_all_medicines(db: Session = Depends(get_db)):
-    medicines = db.query(Medicine).all()
-    return medicines
+def get_all_medicines(
+    request: Request,
+    stream: bool = Query(False, description="Stream the JSON array; Accept: application/x-ndjson streams NDJSON"),
+    db: Session = Depends(get_db)
+):
+    if stream or wants_ndjson(request):
+        return streaming_json_response(request, lambda s: s.query(*MEDICINE_COLUMNS).order_by(Medicine.id), dump_medicine_row)
+    # Column projection encoded directly: no ORM objects, no response-model re-validation
+    return ORJSONResponse([medicine_row_to_dict(row) for row in db.query(*MEDICINE_COLUMNS)])
 
 @router.post("/", response_model=MedicineResponse, status_code=status.HTTP_201_CREATED)
 def add_medicine(
@@ -28,11 +58,61 @@ def add_medicine(
         db.add(db_medicine)
         db.commit()
         db.refresh(db_medicine)
+        _reindex(db, [db_medicine.id])
         return db_medicine
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Failed to add medicine")
 
+@router.post("/import", response_model=CatalogImportReport)
+def import_medicines(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or jsonl; taken from the file extension when omitted"),
+    db: Session = Depends(get_db),
+    admin_user=Depends(get_current_admin_user)
+):
+    fmt = detect_format(file.filename, format)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unsupported catalog format, use csv or jsonl")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = import_catalog(db, iter_records(stream, fmt))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Catalog file must be UTF-8 encoded")
+    finally:
+        stream.detach()
+    if report["imported"]:
+        background_tasks.add_task(rebuild_derived_indexes)
+    return report
+
+@router.get("/export")
+def export_medicines(
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    admin_user=Depends(get_current_admin_user)
+):
+    return StreamingResponse(
+        export_catalog(format),
+        media_type=CATALOG_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="medicines.{format}"'}
+    )
+
+@router.post("/stock-sync", response_model=MedicineStockSyncResponse)
+def sync_medicine_stock(
+    sync: MedicineStockSync,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    admin_user=Depends(get_current_admin_user)
+):
+    """Apply absolute stock levels or deltas for many medicines in one transaction."""
+    result = apply_stock_sync(db, sync.items)
+    # Derived indexes are refreshed once for the whole batch
+    if len(result["medicine_ids"]) > settings.STOCK_SYNC_INCREMENTAL_LIMIT:
+        background_tasks.add_task(rebuild_derived_indexes)
+    else:
+        _reindex(db, result["medicine_ids"])
+    return result
+
 @router.put("/{id}", response_model=MedicineResponse)
 def update_medicine(
     id: int,
@@ -48,11 +128,33 @@ def update_medicine(
     try:
         db.commit()
         db.refresh(medicine)
+        _reindex(db, [medicine.id])
         return medicine
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Failed to update medicine")
 
+@router.post("/{id}/image", response_model=MedicineResponse)
+async def upload_medicine_image(
+    id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    admin_user=Depends(get_current_admin_user)
+):
+    medicine = db.query(Medicine).filter(Medicine.id == id).first()
+    if not medicine:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    stored = await stream_upload_to_disk(file, "medicines")
+    release_reference(db, medicine.image_url)
+    add_reference(db, stored.path, stored.sha256, stored.size)
+    medicine.image_url = get_file_url(stored.path)
+    medicine.image_variants = None
+    db.commit()
+    db.refresh(medicine)
+    background_tasks.add_task(process_uploaded_image, Medicine, medicine.id, stored.path)
+    return medicine
+
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_medicine(
     id: int,
@@ -64,18 +166,18 @@ def delete_medicine(
         raise HTTPException(status_code=404, detail="Medicine not found")
     db.delete(medicine)
     db.commit()
+    _reindex(db, [id])
     return
 
-@router.get("/search", response_model=List[MedicineResponse])
-def search_medicines(
-    q: Optional[str] = Query(None),
-    category: Optional[str] = Query(None),
-    prescription_required: Optional[bool] = Query(None),
-    min_price: Optional[float] = Query(None),
-    max_price: Optional[float] = Query(None),
-    db: Session = Depends(get_db)
+def _search_query(
+    db: Session,
+    q: Optional[str],
+    category: Optional[str],
+    prescription_required: Optional[bool],
+    min_price: Optional[float],
+    max_price: Optional[float]
 ):
-    query = db.query(Medicine)
+    query = db.query(*MEDICINE_COLUMNS)
     if q:
         query = query.filter(Medicine.name.ilike(f"%{q}%"))
     if category:
@@ -86,19 +188,53 @@ def search_medicines(
         query = query.filter(Medicine.price >= min_price)
     if max_price is not None:
         query = query.filter(Medicine.price <= max_price)
-    return query.all()
+    return query
+
+@router.get("/search", response_model=List[MedicineResponse])
+def search_medicines(
+    request: Request,
+    q: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    prescription_required: Optional[bool] = Query(None),
+    min_price: Optional[float] = Query(None),
+    max_price: Optional[float] = Query(None),
+    stream: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    filters = (q, category, prescription_required, min_price, max_price)
+    if stream or wants_ndjson(request):
+        return streaming_json_response(
+            request, lambda s: _search_query(s, *filters).order_by(Medicine.id), dump_medicine_row
+        )
+    body = cached_catalog_body(
+        "search", repr(filters), lambda: orjson.dumps([medicine_row_to_dict(row) for row in _search_query(db, *filters)])
+    )
+    return Response(body, media_type="application/json")
 
 @router.get("/{id}/alternatives", response_model=List[MedicineResponse])
-def get_alternative_medicines(id: int, db: Session = Depends(get_db)):
-    medicine = db.query(Medicine).filter(Medicine.id == id).first()
+def get_alternative_medicines(
+    id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    medicine = db.query(Medicine.id).filter(Medicine.id == id).first()
     if not medicine:
         raise HTTPException(status_code=404, detail="Medicine not found")
-    # Alternatives: same category, not the same id
-    alternatives = db.query(Medicine).filter(
-        Medicine.category == medicine.category,
-        Medicine.id != id
-    ).all()
-    return alternatives
+    # Precomputed top-k: same salts first, then strength/form, stock and price
+    ranked = get_substitution_index(db).alternatives(id, limit)
+    if not ranked:
+        return []
+    medicines = {m.id: m for m in db.query(Medicine).filter(Medicine.id.in_([mid for mid, _ in ranked]))}
+    return [medicines[mid] for mid, _ in ranked if mid in medicines]
+
+@router.post("/alternatives/rebuild", status_code=status.HTTP_202_ACCEPTED)
+def rebuild_alternatives(
+    background_tasks: BackgroundTasks,
+    admin_user=Depends(get_current_admin_user)
+):
+    # Also refreshes the prescription matching index
+    background_tasks.add_task(rebuild_derived_indexes)
+    return {"message": "Alternatives rebuild scheduled"}
 
 @router.patch("/{id}/stock", response_model=MedicineResponse)
 def update_medicine_stock(
@@ -113,4 +249,5 @@ def update_medicine_stock(
     medicine.stock = stock_update.stock
     db.commit()
     db.refresh(medicine)
+    refresh_substitution_index(db, [medicine.id])
     return medicine 
\ No newline at end of file
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 from datetime import datetime
 
@@ -9,17 +10,24 @@ from app.models.cart import Cart, CartItem
 from app.models.medicine import Medicine
 from app.models.prescription import Prescription
 from app.models.delivery import DeliveryTracking, DeliveryProof
+from app.models.order_event import OrderEvent
 from app.schemas.order import (
-    OrderCreate, OrderResponse, OrderStatusUpdate, OrderItemResponse,
-    DeliveryTrackingResponse, DeliveryProofCreate, DeliveryProofResponse
+    OrderCreate, OrderResponse, OrderStatusUpdate, OrderStatusBatchUpdate, OrderStatusBatchResponse, OrderItemResponse,
+    DeliveryTrackingResponse, OrderEventResponse, DeliveryProofCreate, DeliveryProofResponse
 )
-from app.dependencies import get_current_active_user
-from app.utils.file_upload import save_uploaded_file, get_file_url
-from app.utils.notifications import send_push_notification
-from app.models.user import User
+from app.dependencies import get_current_active_user, get_current_pharmacist_user
+from app.utils.file_upload import stream_upload_to_disk, get_file_url
+from app.utils.storage import add_reference, release_reference
+from app.utils.order_events import record_order_event, queue_notification
+from app.utils.order_status import ORDER_STATUSES, transition_orders
+from app.utils.streaming import streaming_json_response, wants_ndjson
+from app.utils.serialization import order_rows
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+# transition_orders conflict kind -> response status for single-order updates
+_CONFLICT_STATUS_CODES = {"not_found": 404, "forbidden": 403, "invalid": 409, "stale": 409}
+
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order_from_cart(
     order_data: OrderCreate,
@@ -59,6 +67,8 @@ def create_order_from_cart(
         total_amount=total_amount
     )
     db.add(order)
+    db.flush()
+    created = record_order_event(db, order, "created", None, "pending", current_user.id, track=False, notify=False)
     db.commit()
     db.refresh(order)
     
@@ -80,7 +90,7 @@ def create_order_from_cart(
     db.commit()
     
     # Create delivery tracking
-    tracking = DeliveryTracking(order_id=order.id, current_status="pending")
+    tracking = DeliveryTracking(order_id=order.id, current_status="pending", last_event_id=created.id)
     db.add(tracking)
     db.commit()
     
@@ -107,36 +117,50 @@ def create_order_from_cart(
         updated_at=order.updated_at
     )
 
+def _user_orders_query(db: Session, user_id: int):
+    # Items and their medicine's name/image come in with one extra SELECT per batch of orders
+    return db.query(Order).filter(Order.user_id == user_id).options(
+        selectinload(Order.items).joinedload(OrderItem.medicine).load_only(Medicine.name, Medicine.image_url)
+    ).order_by(Order.created_at.desc(), Order.id.desc())
+
+def _order_response(order: Order) -> OrderResponse:
+    items_response = [OrderItemResponse(
+        id=oi.id,
+        medicine_id=oi.medicine_id,
+        quantity=oi.quantity,
+        price=oi.price,
+        prescription_id=oi.prescription_id,
+        medicine_name=oi.medicine.name if oi.medicine else None,
+        medicine_image_url=oi.medicine.image_url if oi.medicine else None
+    ) for oi in order.items]
+    return OrderResponse(
+        id=order.id,
+        user_id=order.user_id,
+        delivery_address=order.delivery_address,
+        status=order.status,
+        total_amount=order.total_amount,
+        items=items_response,
+        created_at=order.created_at,
+        updated_at=order.updated_at
+    )
+
 @router.get("/", response_model=List[OrderResponse])
 def get_user_orders(
+    request: Request,
+    stream: bool = Query(False, description="Stream the JSON array; Accept: application/x-ndjson streams NDJSON"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_active_user)
 ):
     """Get user's orders with delivery status."""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()
-    responses = []
-    for order in orders:
-        items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-        items_response = [OrderItemResponse(
-            id=oi.id,
-            medicine_id=oi.medicine_id,
-            quantity=oi.quantity,
-            price=oi.price,
-            prescription_id=oi.prescription_id,
-            medicine_name=db.query(Medicine).filter(Medicine.id == oi.medicine_id).first().name,
-            medicine_image_url=db.query(Medicine).filter(Medicine.id == oi.medicine_id).first().image_url
-        ) for oi in items]
-        responses.append(OrderResponse(
-            id=order.id,
-            user_id=order.user_id,
-            delivery_address=order.delivery_address,
-            status=order.status,
-            total_amount=order.total_amount,
-            items=items_response,
-            created_at=order.created_at,
-            updated_at=order.updated_at
-        ))
-    return responses
+    if stream or wants_ndjson(request):
+        user_id = current_user.id
+        return streaming_json_response(
+            request,
+            lambda s: _user_orders_query(s, user_id),
+            lambda order: _order_response(order).model_dump_json(),
+            batch_size=200
+        )
+    return ORJSONResponse(order_rows(db, current_user.id))
 
 @router.get("/{id}", response_model=OrderResponse)
 def get_order_details(
@@ -176,23 +200,20 @@ def update_order_status(
     db: Session = Depends(get_db),
     current_user=Depends(get_current_active_user)
 ):
-    """Update order status (pharmacy/delivery partner)."""
-    order = db.query(Order).filter(Order.id == id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    order.status = status_update.status
+    """Move an order along pending -> confirmed -> dispatched -> delivered, or cancel it.
+
+    Pharmacy staff make any allowed transition; customers may cancel their
+    own pending order. A change that lost a race with another update is a 409.
+    """
+    if status_update.status not in ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown order status {status_update.status!r}")
+    # Tracking and the push notification follow from the outbox, committed with the change
+    _, conflicts = transition_orders(db, [id], status_update.status, current_user, status_update.expected_status)
+    if conflicts:
+        conflict = conflicts[0]
+        raise HTTPException(status_code=_CONFLICT_STATUS_CODES.get(conflict.kind, 409), detail=conflict.reason)
     db.commit()
-    db.refresh(order)
-    # Update tracking
-    tracking = db.query(DeliveryTracking).filter(DeliveryTracking.order_id == id).first()
-    if tracking:
-        tracking.current_status = status_update.status
-        tracking.last_updated = datetime.utcnow()
-        db.commit()
-    # Send push notification to user
-    user = db.query(User).filter(User.id == order.user_id).first()
-    if user and user.device_token:
-        send_push_notification(user.device_token, "Order Update", f"Your order #{order.id} status: {order.status}")
+    order = db.query(Order).filter(Order.id == id).first()
     # Prepare response
     items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
     items_response = [OrderItemResponse(
@@ -215,6 +236,21 @@ def update_order_status(
         updated_at=order.updated_at
     )
 
+@router.post("/status-batch", response_model=OrderStatusBatchResponse)
+def update_order_status_batch(
+    batch: OrderStatusBatchUpdate,
+    db: Session = Depends(get_db),
+    pharmacist=Depends(get_current_pharmacist_user)
+):
+    """Move many orders to one status in one transaction (pharmacist only); orders that cannot move are listed as conflicts."""
+    if batch.status not in ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown order status {batch.status!r}")
+    updated, conflicts = transition_orders(db, batch.order_ids, batch.status, pharmacist, batch.expected_status)
+    db.commit()
+    return OrderStatusBatchResponse(updated=updated, conflicts=[
+        {"order_id": c.order_id, "reason": c.reason, "current_status": c.current_status} for c in conflicts
+    ])
+
 @router.get("/{id}/track", response_model=DeliveryTrackingResponse)
 def track_order(
     id: int,
@@ -227,6 +263,18 @@ def track_order(
         raise HTTPException(status_code=404, detail="Tracking not found")
     return tracking
 
+@router.get("/{id}/events", response_model=List[OrderEventResponse])
+def get_order_events(
+    id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_active_user)
+):
+    """Status history of an order, oldest first."""
+    order = db.query(Order.user_id).filter(Order.id == id).first()
+    if not order or (order.user_id != current_user.id and current_user.role not in ("admin", "pharmacist")):
+        raise HTTPException(status_code=404, detail="Order not found")
+    return db.query(OrderEvent).filter(OrderEvent.order_id == id).order_by(OrderEvent.id).all()
+
 @router.post("/{id}/delivery-proof", response_model=DeliveryProofResponse)
 async def upload_delivery_proof(
     id: int,
@@ -240,21 +288,21 @@ async def upload_delivery_proof(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     image_url = None
+    stored = None
     if file:
-        file_path = save_uploaded_file(file, "delivery_proofs")
-        image_url = get_file_url(file_path)
+        stored = await stream_upload_to_disk(file, "delivery_proofs")
+        image_url = get_file_url(stored.path)
+        add_reference(db, stored.path, stored.sha256, stored.size)
     proof = db.query(DeliveryProof).filter(DeliveryProof.order_id == id).first()
     if not proof:
         proof = DeliveryProof(order_id=id, image_url=image_url, signature=signature, delivered_at=datetime.utcnow())
         db.add(proof)
     else:
+        release_reference(db, proof.image_url)
         proof.image_url = image_url
         proof.signature = signature
         proof.delivered_at = datetime.utcnow()
+    queue_notification(db, order.user_id, "Order Delivered", f"Your order #{order.id} has been delivered.")
     db.commit()
     db.refresh(proof)
-    # Send push notification to user
-    user = db.query(User).filter(User.id == order.user_id).first()
-    if user and user.device_token:
-        send_push_notification(user.device_token, "Order Delivered", f"Your order #{order.id} has been delivered.")
     return proof 
\ No newline at end of file
@@ -1,40 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks, Query
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
 from datetime import datetime
 
 from app.database import get_db
 from app.models.prescription import Prescription
 from app.models.prescription_medicine import PrescriptionMedicine
+from app.models.medicine import Medicine
+from app.models.cart import CartItem
+from app.config import settings
 from app.schemas.prescription import (
     PrescriptionCreate, PrescriptionVerify, PrescriptionResponse, 
-    PrescriptionWithMedicinesResponse, PrescriptionMedicineResponse
+    PrescriptionWithMedicinesResponse, PrescriptionMedicineResponse,
+    PrescriptionBatchVerify, PrescriptionBatchVerifyResponse, PrescriptionClaimRelease,
+    PrescriptionQueueMetrics, PrescriptionLineMatches, PrescriptionCartFillResponse
 )
 from app.dependencies import get_current_active_user, get_current_pharmacist_user
-from app.utils.file_upload import save_uploaded_file, validate_image_file, get_file_url
+from app.routers.cart import get_or_create_cart
+from app.utils.file_upload import stream_upload_to_disk, get_file_url
+from app.utils.storage import add_reference
+from app.utils.prescription_queue import (
+    PRIORITY_LEVELS, peek_queue, claim_prescriptions, release_claims, record_verification, queue_metrics
+)
+from app.utils.image_processing import process_uploaded_image
+from app.utils.medicine_matching import get_catalog_index
 
 router = APIRouter(prefix="/prescriptions", tags=["prescriptions"])
 
 @router.post("/upload", response_model=PrescriptionResponse, status_code=status.HTTP_201_CREATED)
 async def upload_prescription(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     description: Optional[str] = Form(None),
+    urgency: str = Form("normal"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_active_user)
 ):
     """Upload prescription image."""
-    
-    # Validate file
-    if not validate_image_file(file):
+    if urgency not in PRIORITY_LEVELS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid image file"
+            detail=f"Urgency must be one of: {', '.join(PRIORITY_LEVELS)}"
         )
     
-    # Save file
+    # Validate and save file (header checked from the first chunk while streaming)
     try:
-        file_path = save_uploaded_file(file, "prescriptions")
-        image_url = get_file_url(file_path)
+        stored = await stream_upload_to_disk(file, "prescriptions")
+        image_url = get_file_url(stored.path)
     except HTTPException:
         raise
     except Exception as e:
@@ -47,14 +59,19 @@ async def upload_prescription(
     prescription_data = {
         "user_id": current_user.id,
         "image_url": image_url,
-        "description": description
+        "description": description,
+        "priority": PRIORITY_LEVELS[urgency]
     }
     
     db_prescription = Prescription(**prescription_data)
     db.add(db_prescription)
+    add_reference(db, stored.path, stored.sha256, stored.size)
     db.commit()
     db.refresh(db_prescription)
     
+    # Thumbnails and compressed derivatives are generated after the response is sent
+    background_tasks.add_task(process_uploaded_image, Prescription, db_prescription.id, stored.path)
+    
     return db_prescription
 
 @router.get("/", response_model=List[PrescriptionResponse])
@@ -68,6 +85,80 @@ def get_user_prescriptions(
     ).order_by(Prescription.created_at.desc()).all()
     return prescriptions
 
+@router.get("/with-medicines", response_model=List[PrescriptionWithMedicinesResponse])
+def get_user_prescriptions_with_medicines(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_active_user)
+):
+    """Get user's prescriptions with their medicines (two queries regardless of count)."""
+    prescriptions = db.query(Prescription).options(
+        selectinload(Prescription.medicines)
+    ).filter(
+        Prescription.user_id == current_user.id
+    ).order_by(Prescription.created_at.desc()).all()
+    return prescriptions
+
+@router.get("/queue", response_model=List[PrescriptionResponse])
+def get_verification_queue(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    pharmacist=Depends(get_current_pharmacist_user)
+):
+    """List unclaimed pending prescriptions, most urgent and oldest first (pharmacist only)."""
+    return peek_queue(db, limit)
+
+@router.post("/queue/claim", response_model=List[PrescriptionResponse])
+def claim_verification_work(
+    limit: int = Query(10, ge=1, le=100),
+    lease_seconds: Optional[int] = Query(None, ge=30, le=4 * 3600),
+    db: Session = Depends(get_db),
+    pharmacist=Depends(get_current_pharmacist_user)
+):
+    """Lease the next prescriptions for review; returns every live claim held (pharmacist only)."""
+    return claim_prescriptions(db, pharmacist.id, limit, lease_seconds)
+
+@router.post("/queue/release")
+def release_verification_work(
+    release: PrescriptionClaimRelease,
+    db: Session = Depends(get_db),
+    pharmacist=Depends(get_current_pharmacist_user)
+):
+    """Return claimed prescriptions to the queue (pharmacist only)."""
+    released = release_claims(db, pharmacist.id, release.prescription_ids)
+    return {"released": released}
+
+@router.get("/queue/metrics", response_model=PrescriptionQueueMetrics)
+def get_verification_queue_metrics(
+    window_hours: int = Query(24, ge=1, le=24 * 30),
+    db: Session = Depends(get_db),
+    pharmacist=Depends(get_current_pharmacist_user)
+):
+    """Queue depth and time-to-verify percentiles (pharmacist only)."""
+    return queue_metrics(db, window_hours)
+
+@router.post("/verify-batch", response_model=PrescriptionBatchVerifyResponse)
+def verify_prescriptions_batch(
+    batch: PrescriptionBatchVerify,
+    db: Session = Depends(get_db),
+    pharmacist=Depends(get_current_pharmacist_user)
+):
+    """Verify or reject many prescriptions in one transaction (pharmacist only)."""
+    verified = []
+    conflicts = []
+    now = datetime.utcnow()
+    for item in batch.items:
+        if item.status not in ("verified", "rejected"):
+            conflicts.append({"prescription_id": item.prescription_id, "reason": "Invalid status"})
+        elif record_verification(db, item.prescription_id, pharmacist.id, item.status, item.notes, now):
+            verified.append(item.prescription_id)
+        else:
+            conflicts.append({
+                "prescription_id": item.prescription_id,
+                "reason": "Not found, already verified, or claimed by another pharmacist"
+            })
+    db.commit()
+    return PrescriptionBatchVerifyResponse(verified=verified, conflicts=conflicts)
+
 @router.get("/{id}", response_model=PrescriptionWithMedicinesResponse)
 def get_prescription_details(
     id: int,
@@ -75,7 +166,10 @@ def get_prescription_details(
     current_user=Depends(get_current_active_user)
 ):
     """Get specific prescription details."""
-    prescription = db.query(Prescription).filter(
+    # Medicines are joined in so serialization doesn't trigger a lazy load
+    prescription = db.query(Prescription).options(
+        joinedload(Prescription.medicines)
+    ).filter(
         Prescription.id == id,
         Prescription.user_id == current_user.id
     ).first()
@@ -110,12 +204,13 @@ def verify_prescription(
             detail="Prescription already verified"
         )
     
-    # Update prescription
-    prescription.is_verified = verification.status == "verified"
-    prescription.verified_by = pharmacist.id
-    prescription.verified_at = datetime.utcnow()
-    prescription.status = verification.status
-    prescription.notes = verification.notes
+    # Update prescription unless another pharmacist holds a live claim on it
+    if not record_verification(db, id, pharmacist.id, verification.status, verification.notes):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Prescription is claimed by another pharmacist"
+        )
     
     db.commit()
     db.refresh(prescription)
@@ -129,8 +224,10 @@ def get_prescription_medicines(
     current_user=Depends(get_current_active_user)
 ):
     """Get medicines from prescription."""
-    # Check if prescription exists and belongs to user
-    prescription = db.query(Prescription).filter(
+    # Check ownership and load the medicines in the same round-trip
+    prescription = db.query(Prescription).options(
+        joinedload(Prescription.medicines)
+    ).filter(
         Prescription.id == id,
         Prescription.user_id == current_user.id
     ).first()
@@ -141,9 +238,117 @@ def get_prescription_medicines(
             detail="Prescription not found"
         )
     
-    # Get medicines from prescription
-    medicines = db.query(PrescriptionMedicine).filter(
-        PrescriptionMedicine.prescription_id == id
-    ).all()
+    return prescription.medicines
+
+def _match_prescription_lines(db: Session, prescription: Prescription, limit: int):
+    """Resolve every line of a prescription to ranked catalog medicines in one pass."""
+    lines = prescription.medicines
+    ranked = get_catalog_index(db).match_many(
+        [f"{line.medicine_name} {line.dosage or ''}" for line in lines],
+        limit=limit,
+        min_score=settings.MEDICINE_MATCH_MIN_SCORE
+    )
+    medicine_ids = {medicine_id for matches in ranked for medicine_id, _ in matches}
+    medicines = {}
+    if medicine_ids:
+        medicines = {m.id: m for m in db.query(Medicine).filter(Medicine.id.in_(medicine_ids))}
+    results = []
+    for line, matches in zip(lines, ranked):
+        candidates = [
+            {
+                "medicine_id": medicine_id,
+                "name": medicines[medicine_id].name,
+                "composition": medicines[medicine_id].composition,
+                "price": medicines[medicine_id].price,
+                "stock": medicines[medicine_id].stock,
+                "is_available": medicines[medicine_id].is_available,
+                "prescription_required": medicines[medicine_id].prescription_required,
+                "score": score,
+            }
+            for medicine_id, score in matches if medicine_id in medicines
+        ]
+        results.append({
+            "prescription_medicine_id": line.id,
+            "medicine_name": line.medicine_name,
+            "quantity": line.quantity or 1,
+            "candidates": candidates,
+        })
+    return results
+
+def _get_own_prescription_with_medicines(db: Session, id: int, user_id: int) -> Prescription:
+    prescription = db.query(Prescription).options(
+        joinedload(Prescription.medicines)
+    ).filter(
+        Prescription.id == id,
+        Prescription.user_id == user_id
+    ).first()
+    if not prescription:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Prescription not found"
+        )
+    return prescription
+
+@router.get("/{id}/matches", response_model=List[PrescriptionLineMatches])
+def get_prescription_matches(
+    id: int,
+    limit: int = Query(3, ge=1, le=20),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_active_user)
+):
+    """Ranked catalog medicines for each line of a prescription."""
+    prescription = _get_own_prescription_with_medicines(db, id, current_user.id)
+    return _match_prescription_lines(db, prescription, limit)
+
+@router.post("/{id}/fill-cart", response_model=PrescriptionCartFillResponse)
+def fill_cart_from_prescription(
+    id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_active_user)
+):
+    """Add the best available match for every line of a verified prescription to the cart."""
+    prescription = _get_own_prescription_with_medicines(db, id, current_user.id)
+    if not prescription.is_verified:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Prescription must be verified before filling the cart"
+        )
     
-    return medicines 
\ No newline at end of file
+    cart = get_or_create_cart(current_user.id, db)
+    existing = {item.medicine_id: item for item in db.query(CartItem).filter(CartItem.cart_id == cart.id)}
+    added = []
+    unmatched = []
+    for line in _match_prescription_lines(db, prescription, limit=5):
+        quantity = line["quantity"]
+        # Stock has to cover what the cart already holds of the medicine as well
+        choice = next((
+            candidate for candidate in line["candidates"]
+            if candidate["is_available"] and candidate["stock"] >= quantity + (
+                existing[candidate["medicine_id"]].quantity if candidate["medicine_id"] in existing else 0
+            )
+        ), None)
+        if choice is None:
+            unmatched.append(line["prescription_medicine_id"])
+            continue
+        item = existing.get(choice["medicine_id"])
+        if item:
+            item.quantity += quantity
+            item.prescription_required = choice["prescription_required"]
+            item.prescription_id = prescription.id
+        else:
+            item = CartItem(
+                cart_id=cart.id,
+                medicine_id=choice["medicine_id"],
+                quantity=quantity,
+                prescription_required=choice["prescription_required"],
+                prescription_id=prescription.id
+            )
+            db.add(item)
+            existing[choice["medicine_id"]] = item
+        added.append({
+            "prescription_medicine_id": line["prescription_medicine_id"],
+            "medicine_id": choice["medicine_id"],
+            "quantity": quantity
+        })
+    db.commit()
+    return PrescriptionCartFillResponse(added=added, unmatched=unmatched)
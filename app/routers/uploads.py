@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from pathlib import Path
+from typing import Optional
+import os
+import stat
+from starlette.concurrency import run_in_threadpool
+
+from app.database import get_db
+from app.models.prescription import Prescription
+from app.models.delivery import DeliveryProof
+from app.models.order import Order
+from app.models.user import User
+from app.dependencies import get_current_user_optional
+from app.utils.storage import get_storage, is_content_key
+from app.utils.image_processing import IMAGE_VARIANTS
+from app.utils.file_serving import (
+    UploadFileResponse, file_etag, parse_range, IMMUTABLE_MAX_AGE, MUTABLE_MAX_AGE
+)
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+PUBLIC_FOLDERS = {"medicines"}
+PRIVATE_FOLDERS = {"prescriptions", "delivery_proofs"}
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _matches_original_url(column, file_path: str):
+    """Condition matching the stored URL of the original image behind a path or one of its variants.
+
+    The original is the path itself, or the variant's base name with any
+    extension (legacy uuid uploads were stored without one).
+    """
+    path = Path(file_path)
+    stem = path.stem
+    for name in IMAGE_VARIANTS:
+        if stem.endswith(f"_{name}"):
+            stem = stem[:-len(name) - 1]
+            break
+    base = f"/uploads/{path.parent.as_posix()}/{stem}"
+    return or_(
+        column == f"/uploads/{file_path}",
+        column == base,
+        column.like(f"{_escape_like(base)}.%", escape="\\")
+    )
+
+def _can_read(db: Session, folder: str, file_path: str, user: Optional[User]) -> bool:
+    if folder in PUBLIC_FOLDERS:
+        return True
+    if user is None:
+        return False
+    if user.role in ("admin", "pharmacist"):
+        return True
+    if folder == "prescriptions":
+        return db.query(Prescription.id).filter(
+            Prescription.user_id == user.id,
+            _matches_original_url(Prescription.image_url, file_path)
+        ).first() is not None
+    if folder == "delivery_proofs":
+        return db.query(DeliveryProof.id).join(Order, Order.id == DeliveryProof.order_id).filter(
+            Order.user_id == user.id,
+            _matches_original_url(DeliveryProof.image_url, file_path)
+        ).first() is not None
+    return False
+
+def _content_hash(file_path: str) -> Optional[str]:
+    """Content-addressed names carry their own hash (variants are derived deterministically)."""
+    if not is_content_key(file_path):
+        return None
+    stem = Path(file_path).stem
+    sha256, _, variant = stem.partition("_")
+    return f"{sha256}-{variant}" if variant else sha256
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_upload(
+    file_path: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user_optional)
+):
+    """Serve an uploaded file with strong ETags, Range support and long-lived caching."""
+    folder = file_path.split("/", 1)[0]
+    if folder not in PUBLIC_FOLDERS | PRIVATE_FOLDERS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    if folder not in PUBLIC_FOLDERS and not await run_in_threadpool(_can_read, db, folder, file_path, current_user):
+        if current_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        # Don't reveal whether someone else's file exists
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    try:
+        path = get_storage().local_path(file_path)
+        stat_result = await run_in_threadpool(os.stat, path)
+    except (ValueError, FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    content_hash = _content_hash(file_path)
+    if content_hash is not None:
+        etag = file_etag(path, stat_result, content_hash)
+    else:
+        # Legacy uuid-named upload: hash the content once per mtime/size
+        etag = await run_in_threadpool(file_etag, path, stat_result)
+    visibility = "public" if folder in PUBLIC_FOLDERS else "private"
+    if content_hash is not None:
+        cache_control = f"{visibility}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = f"{visibility}, max-age={MUTABLE_MAX_AGE}"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"etag": etag, "cache-control": cache_control})
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"content-range": f"bytes */{stat_result.st_size}"}
+            )
+
+    return UploadFileResponse(
+        path,
+        stat_result,
+        etag=etag,
+        cache_control=cache_control,
+        byte_range=byte_range,
+        send_body=request.method != "HEAD",
+    )
@@ -3,14 +3,19 @@ from .user import (
     PhoneVerification, UserResponse, Token, TokenData
 )
 from .medicine import (
-    MedicineBase, MedicineCreate, MedicineUpdate, MedicineStockUpdate, MedicineResponse, MedicineSearchQuery
+    MedicineBase, MedicineCreate, MedicineUpdate, MedicineStockUpdate, MedicineResponse, MedicineSearchQuery,
+    CatalogImportError, CatalogImportReport,
+    MedicineStockSyncItem, MedicineStockSync, MedicineStockSyncResponse
 )
 from .category import (
     CategoryBase, CategoryCreate, CategoryUpdate, CategoryResponse
 )
 from .prescription import (
     PrescriptionBase, PrescriptionCreate, PrescriptionVerify, 
-    PrescriptionResponse, PrescriptionWithMedicinesResponse, PrescriptionMedicineResponse
+    PrescriptionResponse, PrescriptionWithMedicinesResponse, PrescriptionMedicineResponse,
+    PrescriptionBatchVerifyItem, PrescriptionBatchVerify, PrescriptionBatchConflict,
+    PrescriptionBatchVerifyResponse, PrescriptionClaimRelease, PrescriptionQueueMetrics,
+    MedicineMatchCandidate, PrescriptionLineMatches, PrescriptionCartFillItem, PrescriptionCartFillResponse
 )
 from .cart import (
     CartItemBase, CartItemCreate, CartItemUpdate, CartItemResponse,
@@ -18,7 +23,8 @@ from .cart import (
 )
 from .order import (
     OrderItemBase, OrderItemResponse, OrderCreate, OrderResponse, OrderStatusUpdate,
-    DeliveryTrackingResponse, DeliveryProofCreate, DeliveryProofResponse
+    OrderStatusBatchUpdate, OrderStatusConflict, OrderStatusBatchResponse,
+    DeliveryTrackingResponse, OrderEventResponse, DeliveryProofCreate, DeliveryProofResponse
 )
 from .delivery import (
     DeliveryPartnerResponse, PharmacyResponse, EmergencyDeliveryRequestCreate, EmergencyDeliveryRequestResponse,
@@ -29,13 +35,19 @@ __all__ = [
     "UserBase", "UserCreate", "UserUpdate", "UserLogin",
     "PhoneVerification", "UserResponse", "Token", "TokenData",
     "MedicineBase", "MedicineCreate", "MedicineUpdate", "MedicineStockUpdate", "MedicineResponse", "MedicineSearchQuery",
+    "CatalogImportError", "CatalogImportReport",
+    "MedicineStockSyncItem", "MedicineStockSync", "MedicineStockSyncResponse",
     "CategoryBase", "CategoryCreate", "CategoryUpdate", "CategoryResponse",
     "PrescriptionBase", "PrescriptionCreate", "PrescriptionVerify", 
     "PrescriptionResponse", "PrescriptionWithMedicinesResponse", "PrescriptionMedicineResponse",
+    "PrescriptionBatchVerifyItem", "PrescriptionBatchVerify", "PrescriptionBatchConflict",
+    "PrescriptionBatchVerifyResponse", "PrescriptionClaimRelease", "PrescriptionQueueMetrics",
+    "MedicineMatchCandidate", "PrescriptionLineMatches", "PrescriptionCartFillItem", "PrescriptionCartFillResponse",
     "CartItemBase", "CartItemCreate", "CartItemUpdate", "CartItemResponse",
     "CartResponse", "PrescriptionValidationRequest", "PrescriptionValidationResponse", "CartValidationResponse",
     "OrderItemBase", "OrderItemResponse", "OrderCreate", "OrderResponse", "OrderStatusUpdate",
-    "DeliveryTrackingResponse", "DeliveryProofCreate", "DeliveryProofResponse",
+    "OrderStatusBatchUpdate", "OrderStatusConflict", "OrderStatusBatchResponse",
+    "DeliveryTrackingResponse", "OrderEventResponse", "DeliveryProofCreate", "DeliveryProofResponse",
     "DeliveryPartnerResponse", "PharmacyResponse", "EmergencyDeliveryRequestCreate", "EmergencyDeliveryRequestResponse",
     "DeliveryEstimateRequest", "DeliveryEstimateResponse"
 ] 
\ No newline at end of file
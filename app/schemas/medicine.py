@@ -1,10 +1,17 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, validator
+from typing import Optional, List, Dict
 from datetime import datetime
+from app.utils.file_upload import image_variant_urls
+
+def parse_image_variants(cls, v):
+    # Stored as a JSON map of size variant -> path relative to the upload dir
+    return image_variant_urls(v)
 
 class MedicineBase(BaseModel):
+    sku: Optional[str] = None
     name: str
     description: Optional[str] = None
+    composition: Optional[str] = None
     category: Optional[str] = None
     price: float
     stock: int = 0
@@ -17,8 +24,10 @@ class MedicineCreate(MedicineBase):
     pass
 
 class MedicineUpdate(BaseModel):
+    sku: Optional[str] = None
     name: Optional[str] = None
     description: Optional[str] = None
+    composition: Optional[str] = None
     category: Optional[str] = None
     price: Optional[float] = None
     stock: Optional[int] = None
@@ -30,14 +39,57 @@ class MedicineUpdate(BaseModel):
 class MedicineStockUpdate(BaseModel):
     stock: int
 
+class MedicineStockSyncItem(BaseModel):
+    id: int
+    stock: Optional[int] = None  # absolute stock level
+    delta: Optional[int] = None  # change relative to the current level
+
+    @validator('delta', always=True)
+    def validate_change(cls, v, values):
+        if (v is None) == (values.get('stock') is None):
+            raise ValueError('Give exactly one of stock or delta')
+        if values.get('stock') is not None and values['stock'] < 0:
+            raise ValueError('Stock cannot be negative')
+        return v
+
+class MedicineStockSync(BaseModel):
+    items: List[MedicineStockSyncItem]
+
+    @validator('items')
+    def validate_items(cls, v):
+        if len(v) > 50000:
+            raise ValueError('At most 50000 items per sync')
+        return v
+
+class MedicineStockSyncResponse(BaseModel):
+    updated: int
+    out_of_stock: int
+    not_found: List[int]
+
 class MedicineResponse(MedicineBase):
     id: int
+    image_variants: Optional[Dict[str, str]] = None
     created_at: datetime
     updated_at: datetime
 
+    _image_variants = validator('image_variants', pre=True, allow_reuse=True)(parse_image_variants)
+
     class Config:
         from_attributes = True
 
+class CatalogImportError(BaseModel):
+    row: int
+    sku: Optional[str] = None
+    errors: List[str]
+
+class CatalogImportReport(BaseModel):
+    processed: int
+    imported: int
+    duplicates: int = 0  # rows superseded by a later row for the same SKU in the file
+    failed: int
+    errors: List[CatalogImportError]
+    errors_truncated: bool = False
+
 class MedicineSearchQuery(BaseModel):
     q: Optional[str] = None
     category: Optional[str] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -32,6 +32,27 @@ class OrderResponse(BaseModel):
 
 class OrderStatusUpdate(BaseModel):
     status: str
+    expected_status: Optional[str] = None  # refuse the change unless the order is still in this status
+
+class OrderStatusBatchUpdate(BaseModel):
+    order_ids: List[int]
+    status: str
+    expected_status: Optional[str] = None
+
+    @validator('order_ids')
+    def validate_order_ids(cls, v):
+        if len(v) > 1000:
+            raise ValueError('At most 1000 orders per batch')
+        return v
+
+class OrderStatusConflict(BaseModel):
+    order_id: int
+    reason: str
+    current_status: Optional[str] = None
+
+class OrderStatusBatchResponse(BaseModel):
+    updated: List[int] = []
+    conflicts: List[OrderStatusConflict] = []
 
 class DeliveryTrackingResponse(BaseModel):
     order_id: int
@@ -42,6 +63,17 @@ class DeliveryTrackingResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class OrderEventResponse(BaseModel):
+    id: int
+    order_id: int
+    event_type: str
+    from_status: Optional[str] = None
+    to_status: str
+    actor_id: Optional[int] = None
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
 class DeliveryProofCreate(BaseModel):
     image_url: Optional[str] = None
     signature: Optional[str] = None
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, validator
+from typing import Optional, List, Dict
 from datetime import datetime
+from .medicine import parse_image_variants
 
 class PrescriptionBase(BaseModel):
     description: Optional[str] = None
@@ -29,17 +30,73 @@ class PrescriptionResponse(BaseModel):
     id: int
     user_id: int
     image_url: str
+    image_variants: Optional[Dict[str, str]] = None
     description: Optional[str] = None
     is_verified: bool
     verified_by: Optional[int] = None
     verified_at: Optional[datetime] = None
     status: str
     notes: Optional[str] = None
+    priority: int = 0
+    claimed_by: Optional[int] = None
+    claim_expires_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
+    _image_variants = validator('image_variants', pre=True, allow_reuse=True)(parse_image_variants)
+
     class Config:
         from_attributes = True
 
 class PrescriptionWithMedicinesResponse(PrescriptionResponse):
-    medicines: List[PrescriptionMedicineResponse] = [] 
\ No newline at end of file
+    medicines: List[PrescriptionMedicineResponse] = []
+
+class PrescriptionBatchVerifyItem(PrescriptionVerify):
+    prescription_id: int
+
+class PrescriptionBatchVerify(BaseModel):
+    items: List[PrescriptionBatchVerifyItem]
+
+class PrescriptionBatchConflict(BaseModel):
+    prescription_id: int
+    reason: str
+
+class PrescriptionBatchVerifyResponse(BaseModel):
+    verified: List[int] = []
+    conflicts: List[PrescriptionBatchConflict] = []
+
+class PrescriptionClaimRelease(BaseModel):
+    prescription_ids: Optional[List[int]] = None  # None releases every claim held
+
+class PrescriptionQueueMetrics(BaseModel):
+    pending: int
+    claimed: int
+    oldest_pending_seconds: Optional[float] = None
+    window_hours: int
+    reviewed: int
+    time_to_verify_seconds: Dict[str, float] = {}
+
+class MedicineMatchCandidate(BaseModel):
+    medicine_id: int
+    name: str
+    composition: Optional[str] = None
+    price: float
+    stock: int
+    is_available: bool
+    prescription_required: bool = False
+    score: float
+
+class PrescriptionLineMatches(BaseModel):
+    prescription_medicine_id: int
+    medicine_name: str
+    quantity: int
+    candidates: List[MedicineMatchCandidate] = []
+
+class PrescriptionCartFillItem(BaseModel):
+    prescription_medicine_id: int
+    medicine_id: int
+    quantity: int
+
+class PrescriptionCartFillResponse(BaseModel):
+    added: List[PrescriptionCartFillItem] = []
+    unmatched: List[int] = []  # prescription medicine ids with no available match
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -38,4 +39,19 @@ def verify_token(token: str) -> Optional[TokenData]:
         token_data = TokenData(email=email)
         return token_data
     except JWTError:
-        return None 
\ No newline at end of file
+        return None
+
+@lru_cache(maxsize=4096)
+def _token_subject(token: str) -> Optional[str]:
+    token_data = verify_token(token)
+    return token_data.email if token_data else None
+
+def bearer_subject(authorization: Optional[str]) -> Optional[str]:
+    """Email in a valid bearer token, for keying per-user state in middleware.
+
+    Identity only: expiry and account status are still checked by the endpoint.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return _token_subject(token)
@@ -0,0 +1,366 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import orjson
+from app.config import settings
+from app.utils.clients import get_redis
+from app.utils.metrics import registry, track_external_call
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+REDIS_RETRY_SECONDS = 30
+# Tags invalidation messages so a worker skips its own
+PROCESS_ID = os.urandom(6).hex()
+
+cache_requests = registry.counter(
+    "cache_requests_total", "Cache lookups by namespace and outcome (local, shared or miss).", ("namespace", "result"))
+
+class CacheUnavailable(Exception):
+    pass
+
+class MemoryBackend:
+    """In-process stand-in for Redis: for tests and single-node deployments."""
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._subscribers: Dict[str, List[Callable[[bytes], None]]] = {}
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return True
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        now = time.monotonic()
+        with self._lock:
+            values = []
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and entry[1] is not None and entry[1] <= now:
+                    del self._data[key]
+                    entry = None
+                values.append(entry[0] if entry else None)
+            return values
+
+    def set_many(self, items: Dict[str, bytes], ttl: Optional[float]) -> None:
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (value, expires)
+
+    def delete_many(self, keys: Sequence[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float]) -> bool:
+        """Set only if the key is absent (or expired); True when set."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def incr(self, key: str, ttl: Optional[float] = None, amount: int = 1) -> int:
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._data.get(key, (b"0", None))
+            if expires is not None and expires <= now:
+                value, expires = b"0", None
+            if ttl:
+                expires = now + ttl
+            value = str(int(value) + amount).encode()
+            self._data[key] = (value, expires)
+            return int(value)
+
+    def publish(self, channel: str, message: bytes) -> None:
+        for callback in list(self._subscribers.get(channel, [])):
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None], on_reconnect: Callable[[], None]) -> None:
+        self._subscribers.setdefault(channel, []).append(callback)
+
+class RedisBackend:
+    """The shared Redis client; after a failure it is skipped for REDIS_RETRY_SECONDS."""
+
+    def __init__(self, client):
+        import redis
+        self._redis = client
+        self._errors = (redis.RedisError, OSError)
+        self._down_until = 0.0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _call(self, operation: str, fn: Callable[[], Any]) -> Any:
+        if not self.available():
+            raise CacheUnavailable(operation)
+        try:
+            with track_external_call("redis", operation):
+                return fn()
+        except self._errors as exc:
+            self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            raise CacheUnavailable(operation) from exc
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        def fetch():
+            # One round trip for the whole batch; unlike MGET this also works on a cluster
+            pipe = self._redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(key)
+            return pipe.execute()
+        return self._call("get_many", fetch) if len(keys) > 1 else [self._call("get", lambda: self._redis.get(keys[0]))]
+
+    def set_many(self, items: Dict[str, bytes], ttl: Optional[float]) -> None:
+        def store():
+            pipe = self._redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(key, value, px=int(ttl * 1000) if ttl else None)
+            pipe.execute()
+        self._call("set_many", store)
+
+    def delete_many(self, keys: Sequence[str]) -> None:
+        self._call("delete", lambda: self._redis.delete(*keys))
+
+    def add(self, key: str, value: bytes, ttl: Optional[float]) -> bool:
+        return bool(self._call("add", lambda: self._redis.set(key, value, px=int(ttl * 1000) if ttl else None, nx=True)))
+
+    def incr(self, key: str, ttl: Optional[float] = None, amount: int = 1) -> int:
+        if not ttl:
+            return self._call("incr", lambda: self._redis.incr(key, amount))
+
+        def incr_with_expiry():
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.incr(key, amount)
+            pipe.pexpire(key, int(ttl * 1000))
+            return pipe.execute()[0]
+        return self._call("incr", incr_with_expiry)
+
+    def publish(self, channel: str, message: bytes) -> None:
+        self._call("publish", lambda: self._redis.publish(channel, message))
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None], on_reconnect: Callable[[], None]) -> None:
+        threading.Thread(target=self._listen, args=(channel, callback, on_reconnect),
+                         name="cache-invalidation", daemon=True).start()
+
+    def _listen(self, channel, callback, on_reconnect):
+        delay = 1.0
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                # Messages may have been missed while disconnected
+                on_reconnect()
+                delay = 1.0
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        callback(message["data"])
+            except self._errors:
+                time.sleep(delay)
+                delay = min(delay * 2, REDIS_RETRY_SECONDS)
+
+class LocalLRU:
+    """Bounded, short-lived per-process copy of hot entries."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        expires = time.monotonic() + min(self.ttl, ttl or self.ttl)
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+_backend = None
+_backend_lock = threading.Lock()
+_caches: Dict[str, "Cache"] = {}
+# namespace -> callbacks for other workers' invalidations: the keys, or None when messages may have been missed
+_listeners: Dict[str, List[Callable[[Optional[List[str]]], None]]] = {}
+
+def on_invalidation(namespace: str, callback: Callable[[Optional[List[str]]], None]) -> None:
+    """Call ``callback`` when another worker invalidates keys in ``namespace`` (for in-process state beyond caches)."""
+    _listeners.setdefault(namespace, []).append(callback)
+
+def publish_invalidation(namespace: str, keys: List[str]) -> None:
+    message = orjson.dumps({"origin": PROCESS_ID, "namespace": namespace, "keys": keys})
+    try:
+        get_cache_backend().publish(INVALIDATION_CHANNEL, message)
+    except CacheUnavailable:
+        pass
+
+def _on_invalidation(message: bytes) -> None:
+    payload = orjson.loads(message)
+    if payload.get("origin") == PROCESS_ID:
+        return
+    cache = _caches.get(payload.get("namespace"))
+    if cache is not None:
+        cache.local.discard(payload.get("keys", []))
+    for callback in list(_listeners.get(payload.get("namespace"), [])):
+        callback(payload.get("keys", []))
+
+def _clear_local_tiers() -> None:
+    for cache in list(_caches.values()):
+        cache.local.clear()
+    for callbacks in list(_listeners.values()):
+        for callback in list(callbacks):
+            callback(None)
+
+def get_cache_backend():
+    """The shared backend, created on first use (never at import) from CACHE_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = MemoryBackend() if settings.CACHE_BACKEND == "memory" else RedisBackend(get_redis())
+                backend.subscribe(INVALIDATION_CHANNEL, _on_invalidation, _clear_local_tiers)
+                _backend = backend
+    return _backend
+
+def set_cache_backend(backend) -> None:
+    """Swap the shared backend (tests); local tiers are dropped."""
+    global _backend
+    with _backend_lock:
+        backend.subscribe(INVALIDATION_CHANNEL, _on_invalidation, _clear_local_tiers)
+        _backend = backend
+    _clear_local_tiers()
+
+def _json_dumps(value: Any) -> bytes:
+    return orjson.dumps(value)
+
+def _raw(value: Any) -> Any:
+    return value
+
+class Cache:
+    """Two-tier cache: an in-process LRU in front of the shared backend.
+
+    Values are JSON-encoded unless ``raw=True`` (bytes in, bytes out). Backend
+    outages degrade to misses. Deletes and increments are broadcast so other
+    workers drop their local copies; the local TTL bounds staleness when a
+    message is lost.
+    """
+
+    def __init__(self, namespace: str, ttl: Optional[float] = None, local_ttl: Optional[float] = None,
+                 local_max_entries: Optional[int] = None, raw: bool = False):
+        self.namespace = namespace
+        self.ttl = ttl if ttl is not None else settings.CACHE_DEFAULT_TTL_SECONDS
+        self.local = LocalLRU(
+            settings.CACHE_LOCAL_MAX_ENTRIES if local_max_entries is None else local_max_entries,
+            settings.CACHE_LOCAL_TTL_SECONDS if local_ttl is None else local_ttl,
+        )
+        self._dumps = _raw if raw else _json_dumps
+        self._loads = _raw if raw else orjson.loads
+        _caches[namespace] = self
+
+    @property
+    def backend(self):
+        return get_cache_backend()
+
+    @property
+    def available(self) -> bool:
+        """False while the shared backend is known to be down."""
+        return self.backend.available()
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def get_local(self, key: str) -> Any:
+        """This process's copy only, without touching the backend; None when absent."""
+        value = self.local.get(self._key(key))
+        return None if value is None else self._loads(value)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Values for the keys found; local hits first, the rest in one backend round trip."""
+        found, missing = {}, []
+        for key in keys:
+            value = self.local.get(self._key(key))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if found:
+            cache_requests.inc((self.namespace, "local"), len(found))
+        if missing:
+            try:
+                values = self.backend.get_many([self._key(key) for key in missing])
+            except CacheUnavailable:
+                values = [None] * len(missing)
+            hits = 0
+            for key, value in zip(missing, values):
+                if value is not None:
+                    hits += 1
+                    found[key] = value
+                    self.local.set(self._key(key), value)
+            if hits:
+                cache_requests.inc((self.namespace, "shared"), hits)
+            if hits < len(missing):
+                cache_requests.inc((self.namespace, "miss"), len(missing) - hits)
+        return {key: self._loads(value) for key, value in found.items()}
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, values: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        ttl = ttl or self.ttl
+        encoded = {self._key(key): self._dumps(value) for key, value in values.items()}
+        for key, value in encoded.items():
+            self.local.set(key, value, ttl)
+        try:
+            self.backend.set_many(encoded, ttl)
+        except CacheUnavailable:
+            pass
+
+    def delete(self, *keys: str) -> None:
+        full_keys = [self._key(key) for key in keys]
+        self.local.discard(full_keys)
+        try:
+            self.backend.delete_many(full_keys)
+        except CacheUnavailable:
+            pass
+        self._broadcast(full_keys)
+
+    def incr(self, key: str) -> Optional[int]:
+        """Atomic counter in the backend; None while it is unavailable."""
+        full_key = self._key(key)
+        self.local.discard([full_key])
+        try:
+            value = self.backend.incr(full_key)
+        except CacheUnavailable:
+            return None
+        self._broadcast([full_key])
+        return value
+
+    def _broadcast(self, full_keys: List[str]) -> None:
+        publish_invalidation(self.namespace, full_keys)
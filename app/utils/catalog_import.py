@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.medicine import Medicine
+from app.schemas.medicine import MedicineCreate
+from app.utils.catalog_version import mark_catalog_changed
+from app.utils.medicine_matching import rebuild_catalog_index
+from app.utils.substitution_index import rebuild_substitution_index
+
+# Columns written by the export, in order; the import accepts the same layout
+EXPORT_FIELDS = [
+    "sku", "name", "description", "composition", "category", "price", "stock",
+    "prescription_required", "manufacturer", "image_url", "is_available",
+]
+CATALOG_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> Optional[str]:
+    if requested:
+        return requested.lower() if requested.lower() in CATALOG_FORMATS else None
+    suffix = (filename or "").rsplit(".", 1)[-1].lower()
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}.get(suffix)
+
+def iter_csv_records(stream: TextIO) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(row number, record, parse error) per data row. Empty cells are left out of the record,
+    so they keep the existing value on update and the column default on insert."""
+    for row_number, row in enumerate(csv.DictReader(stream), start=1):
+        yield row_number, {k.strip(): v for k, v in row.items() if k and v not in (None, "")}, None
+
+def iter_jsonl_records(stream: TextIO) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    for row_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "expected a JSON object"
+            continue
+        yield row_number, record, None
+
+def iter_records(stream: TextIO, fmt: str):
+    return iter_csv_records(stream) if fmt == "csv" else iter_jsonl_records(stream)
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()]
+
+def _upsert_statement(db: Session, columns: Iterable[str]):
+    """INSERT ... ON CONFLICT (sku) DO UPDATE for the given columns."""
+    dialect = db.bind.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return None
+    stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(Medicine.__table__)
+    updates = {column: stmt.excluded[column] for column in columns if column != "sku"}
+    updates["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=["sku"], set_=updates)
+
+def _write_rows(db: Session, rows: List[dict]) -> None:
+    """Insert rows without a SKU and upsert rows with one, in one executemany per column set."""
+    groups: Dict[Tuple[bool, Tuple[str, ...]], List[dict]] = {}
+    for row in rows:
+        groups.setdefault((bool(row.get("sku")), tuple(sorted(row))), []).append(row)
+    for (has_sku, columns), group in groups.items():
+        stmt = _upsert_statement(db, columns) if has_sku else None
+        if has_sku and stmt is None:
+            # Other databases: update existing SKUs, insert the rest
+            existing = {sku for (sku,) in db.query(Medicine.sku).filter(Medicine.sku.in_([r["sku"] for r in group]))}
+            for row in group:
+                if row["sku"] in existing:
+                    db.query(Medicine).filter(Medicine.sku == row["sku"]).update(row, synchronize_session=False)
+                else:
+                    db.execute(insert(Medicine.__table__), [row])
+            continue
+        db.execute(stmt if stmt is not None else insert(Medicine.__table__), group)
+
+class CatalogImportReport:
+    def __init__(self, max_errors: int):
+        self.processed = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.max_errors = max_errors
+
+    def add_error(self, row: int, sku: Optional[str], messages: List[str]) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "sku": sku, "errors": messages})
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+def _flush_chunk(db: Session, chunk: List[Tuple[int, dict]], report: CatalogImportReport) -> None:
+    # A later row for the same SKU in the chunk wins (ON CONFLICT cannot touch a row twice per statement)
+    by_sku: Dict[str, Tuple[int, dict]] = {}
+    rows = []
+    for row_number, row in chunk:
+        if row.get("sku"):
+            by_sku[row["sku"]] = (row_number, row)
+        else:
+            rows.append((row_number, row))
+    rows.extend(by_sku.values())
+    report.duplicates += len(chunk) - len(rows)
+    try:
+        _write_rows(db, [row for _, row in rows])
+        mark_catalog_changed(db)
+        db.commit()
+        report.imported += len(rows)
+    except SQLAlchemyError:
+        db.rollback()
+        # Retry one row at a time to pin the failure on the offending rows
+        for row_number, row in rows:
+            try:
+                with db.begin_nested():
+                    _write_rows(db, [row])
+                report.imported += 1
+            except SQLAlchemyError as e:
+                report.add_error(row_number, row.get("sku"), [str(e.orig if hasattr(e, "orig") else e)])
+        mark_catalog_changed(db)
+        db.commit()
+
+def import_catalog(
+    db: Session,
+    records: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+    chunk_size: Optional[int] = None,
+    max_errors: Optional[int] = None
+) -> dict:
+    """Validate records with MedicineCreate and write them in chunks. Returns the import report."""
+    chunk_size = chunk_size or settings.CATALOG_IMPORT_CHUNK_SIZE
+    report = CatalogImportReport(max_errors if max_errors is not None else settings.CATALOG_IMPORT_MAX_ERRORS)
+    chunk: List[Tuple[int, dict]] = []
+    for row_number, record, parse_error in records:
+        report.processed += 1
+        if parse_error is not None:
+            report.add_error(row_number, None, [parse_error])
+            continue
+        try:
+            medicine = MedicineCreate(**record)
+        except ValidationError as e:
+            report.add_error(row_number, record.get("sku"), _validation_messages(e))
+            continue
+        chunk.append((row_number, medicine.dict(exclude_unset=True)))
+        if len(chunk) >= chunk_size:
+            _flush_chunk(db, chunk, report)
+            chunk = []
+    if chunk:
+        _flush_chunk(db, chunk, report)
+    return report.as_dict()
+
+def rebuild_derived_indexes() -> None:
+    """Rebuild the in-memory catalog indexes once after a bulk write (those not built yet stay lazy)."""
+    db = SessionLocal()
+    try:
+        rebuild_catalog_index(db)
+    finally:
+        db.close()
+    rebuild_substitution_index()
+
+def _export_row(medicine) -> dict:
+    return {field: getattr(medicine, field) for field in EXPORT_FIELDS}
+
+def export_catalog(fmt: str, batch_size: int = 1000) -> Iterator[str]:
+    """Stream the catalog as CSV or JSONL. Uses its own session so it can outlive the request's."""
+    db = SessionLocal()
+    try:
+        columns = [getattr(Medicine, field) for field in EXPORT_FIELDS]
+        rows = db.query(*columns).order_by(Medicine.id).yield_per(batch_size)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS) if fmt == "csv" else None
+        if writer is not None:
+            writer.writeheader()
+        for count, medicine in enumerate(rows, start=1):
+            row = _export_row(medicine)
+            if writer is not None:
+                writer.writerow({k: str(v).lower() if isinstance(v, bool) else v for k, v in row.items()})
+            else:
+                buffer.write(json.dumps(row) + "\n")
+            if count % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
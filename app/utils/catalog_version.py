@@ -0,0 +1,178 @@
+import hashlib
+import itertools
+import threading
+import time
+from typing import Callable, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.models.category import Category
+from app.models.medicine import Medicine
+from app.utils.cache import Cache
+from app.utils.singleflight import SingleFlight
+
+CATALOG_VERSION_KEY = "version"
+MISSED_BUMP_RETRY_SECONDS = 1.0
+# GET endpoints whose body depends only on the catalog (and the query string)
+CATALOG_PATHS = {"/medicines/", "/medicines/search", "/categories/"}
+
+# Catalog version and version-keyed response bodies; bumps are broadcast, so the
+# short local TTL only matters when an invalidation message is lost
+catalog_cache = Cache("catalog", raw=True, local_max_entries=256)
+
+class CatalogVersion:
+    """Counter bumped on every catalog write, shared through the cache backend.
+
+    There is no version while the backend is unreachable: workers cannot see
+    each other's writes then, so catalog responses go out without ETags and
+    bypass the body cache. A bump that could not reach the backend is retried
+    in the background until it lands, so ETags issued before the outage never
+    match again.
+    """
+
+    def __init__(self, cache: Cache):
+        self._cache = cache
+        self._missed_bump = False
+        self._retry_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[str]:
+        """The shared version, or None while the backend is unavailable."""
+        if self._missed_bump:
+            with self._lock:
+                if not self._apply_missed_bump():
+                    return None
+        value = self._cache.get(CATALOG_VERSION_KEY)
+        if value is None and not self._cache.available:
+            return None
+        return f"r{int(value or 0)}"
+
+    def peek(self) -> Optional[str]:
+        """The version from this process's copy alone (no I/O); None means ask current()."""
+        if self._missed_bump:
+            return None
+        value = self._cache.get_local(CATALOG_VERSION_KEY)
+        return None if value is None else f"r{int(value)}"
+
+    def bump(self) -> None:
+        if self._cache.incr(CATALOG_VERSION_KEY) is not None:
+            return
+        with self._lock:
+            self._missed_bump = True
+            if self._retry_thread is None:
+                self._retry_thread = threading.Thread(
+                    target=self._retry_missed_bump, name="catalog-version-retry", daemon=True)
+                self._retry_thread.start()
+
+    def _apply_missed_bump(self) -> bool:
+        """With the lock held: True once no bump is outstanding."""
+        # Any number of missed writes only need the version to move once
+        if self._missed_bump and self._cache.available and self._cache.incr(CATALOG_VERSION_KEY) is not None:
+            self._missed_bump = False
+        return not self._missed_bump
+
+    def _retry_missed_bump(self) -> None:
+        while True:
+            time.sleep(MISSED_BUMP_RETRY_SECONDS)
+            with self._lock:
+                if self._apply_missed_bump():
+                    self._retry_thread = None
+                    return
+
+catalog_version = CatalogVersion(catalog_cache)
+
+def mark_catalog_changed(db: Session) -> None:
+    """Flag writes made outside the ORM unit of work (Core bulk statements); bumped on commit."""
+    db.info["catalog_changed"] = True
+
+@event.listens_for(Session, "after_flush")
+def _detect_catalog_writes(session, flush_context):
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, (Medicine, Category)):
+            session.info["catalog_changed"] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session):
+    if session.info.pop("catalog_changed", False):
+        catalog_version.bump()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("catalog_changed", None)
+
+def catalog_etag(version: str, scope: Scope, headers: Headers) -> str:
+    variant = b"|".join([scope["path"].encode(), scope.get("query_string", b""), headers.get("accept", "").encode()])
+    return f'W/"{version}-{hashlib.sha1(variant).hexdigest()[:16]}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+catalog_flight = SingleFlight("catalog")
+
+def cached_catalog_body(kind: str, variant: str, build: Callable[[], bytes]) -> bytes:
+    """Encoded response body for a catalog read, shared across workers until the next catalog write."""
+    version = catalog_version.current()
+    if version is None:
+        return build()  # no version to key on while the backend is down
+    key = f"{kind}:{version}:{hashlib.sha1(variant.encode()).hexdigest()}"
+    body = catalog_cache.get(key)
+    if body is None:
+        # Concurrent misses for the same listing wait for one build
+        body = catalog_flight.do(key, lambda: _build_catalog_body(key, build))
+    return body
+
+def _build_catalog_body(key: str, build: Callable[[], bytes]) -> bytes:
+    body = build()
+    if len(body) <= settings.CATALOG_CACHE_MAX_BYTES:
+        catalog_cache.set(key, body)
+    return body
+
+class CatalogETagMiddleware:
+    """ETag / If-None-Match for catalog listings, keyed on the catalog version.
+
+    A matching If-None-Match is answered with 304 before routing, so unchanged
+    catalogs never reach the database. Without a version (backend down) the
+    response carries no ETag.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in CATALOG_PATHS:
+            await self.app(scope, receive, send)
+            return
+        version = catalog_version.peek()
+        if version is None:
+            # Reading the shared version is blocking I/O
+            version = await run_in_threadpool(catalog_version.current)
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        etag = catalog_etag(version, scope, headers)
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+        if _etag_matches(headers.get("if-none-match"), etag):
+            await Response(status_code=304, headers=cache_headers)(scope, receive, send)
+            return
+
+        async def send_with_etag(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                response_headers = MutableHeaders(raw=message["headers"])
+                response_headers["ETag"] = etag
+                response_headers["Cache-Control"] = "no-cache"
+                response_headers.add_vary_header("Accept")
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
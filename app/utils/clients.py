@@ -0,0 +1,81 @@
+import threading
+from typing import Dict
+from app.config import settings
+
+# Clients are built (and their libraries imported) on first use, so workers boot
+# without Redis or Twilio reachable and import faster
+_lock = threading.Lock()
+_redis = None
+_twilio = None
+_http_session = None
+
+def get_redis():
+    """Shared Redis client on one bounded connection pool."""
+    global _redis
+    if _redis is None:
+        with _lock:
+            if _redis is None:
+                import redis
+                pool = redis.ConnectionPool.from_url(
+                    settings.REDIS_URL,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS,
+                    socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+                    health_check_interval=30,
+                )
+                _redis = redis.Redis(connection_pool=pool)
+    return _redis
+
+def get_twilio():
+    """Twilio client with a pooled HTTP session, or None when Twilio is not configured."""
+    global _twilio
+    if _twilio is None and settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
+        with _lock:
+            if _twilio is None:
+                from twilio.http.http_client import TwilioHttpClient
+                from twilio.rest import Client
+                http_client = TwilioHttpClient(pool_connections=True, timeout=settings.EXTERNAL_HTTP_TIMEOUT_SECONDS)
+                _twilio = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+    return _twilio
+
+def get_http_session():
+    """requests Session with keep-alive pooling and a default timeout on every call."""
+    global _http_session
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                class TimeoutSession(requests.Session):
+                    def request(self, method, url, **kwargs):
+                        kwargs.setdefault("timeout", settings.EXTERNAL_HTTP_TIMEOUT_SECONDS)
+                        return super().request(method, url, **kwargs)
+
+                session = TimeoutSession()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+def check_health() -> Dict[str, str]:
+    """Status of each external dependency: "ok", "not configured", or the error."""
+    status = {}
+    try:
+        get_redis().ping()
+        status["redis"] = "ok"
+    except Exception as exc:  # any failure is reported, never raised
+        status["redis"] = f"unavailable: {exc.__class__.__name__}"
+    status["twilio"] = "ok" if get_twilio() is not None else "not configured"
+    return status
+
+def close_clients() -> None:
+    """Release pooled connections (worker shutdown)."""
+    global _redis, _twilio, _http_session
+    with _lock:
+        if _redis is not None:
+            _redis.connection_pool.disconnect()
+        if _http_session is not None:
+            _http_session.close()
+        _redis = _twilio = _http_session = None
@@ -0,0 +1,133 @@
+import hashlib
+import mimetypes
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Content-addressed blobs never change, so caches may keep them for a year without revalidating
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MUTABLE_MAX_AGE = 3600
+READ_CHUNK_SIZE = 256 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+_hash_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_hash_cache_lock = Lock()
+_HASH_CACHE_SIZE = 4096
+
+def file_etag(path: str, stat_result: os.stat_result, content_hash: Optional[str] = None) -> str:
+    """Strong ETag from the content hash; computed (and cached per mtime/size) when not known."""
+    if content_hash is None:
+        cache_key = (path, stat_result.st_mtime_ns, stat_result.st_size)
+        with _hash_cache_lock:
+            content_hash = _hash_cache.get(cache_key)
+            if content_hash is not None:
+                _hash_cache.move_to_end(cache_key)
+        if content_hash is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            content_hash = digest.hexdigest()
+            with _hash_cache_lock:
+                _hash_cache[cache_key] = content_hash
+                if len(_hash_cache) > _HASH_CACHE_SIZE:
+                    _hash_cache.popitem(last=False)
+    return f'"{content_hash}"'
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive (start, end).
+
+    Returns None when the header is absent, malformed or asks for several ranges
+    (the full body is sent then). Raises ValueError when the range is unsatisfiable.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    start_text, end_text = (part.strip() for part in spec.split("-", 1))
+    try:
+        if start_text == "":
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise ValueError("Unsatisfiable range")
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError as e:
+        if "Unsatisfiable" in str(e):
+            raise
+        return None
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, size - 1)
+
+class UploadFileResponse(Response):
+    """File response with Range support that hands the file descriptor to the server
+    (zero-copy ``sendfile``) when it advertises the ASGI zerocopysend extension,
+    and falls back to chunked reads in a worker thread otherwise."""
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        etag: str,
+        cache_control: str,
+        byte_range: Optional[Tuple[int, int]] = None,
+        send_body: bool = True,
+    ):
+        self.path = path
+        self.send_body = send_body
+        self.background = None
+        size = stat_result.st_size
+        if byte_range is None:
+            self.offset, self.count = 0, size
+            self.status_code = 200
+        else:
+            self.offset, self.count = byte_range[0], byte_range[1] - byte_range[0] + 1
+            self.status_code = 206
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.init_headers({
+            "content-type": media_type,
+            "content-length": str(self.count),
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "cache-control": cache_control,
+        })
+        if byte_range is not None:
+            self.headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+            try:
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": fd,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            finally:
+                os.close(fd)
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
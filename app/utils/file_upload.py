@@ -1,54 +1,123 @@
-import os
+import json
 import uuid
+import hashlib
 from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile, HTTPException
-from PIL import Image
-import io
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
+from app.utils.storage import get_storage, content_key
 
-def save_uploaded_file(upload_file: UploadFile, folder: str = "prescriptions") -> str:
-    """Save uploaded file and return the file path."""
-    
-    # Create upload directory if it doesn't exist
-    upload_dir = Path(settings.UPLOAD_DIR) / folder
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Validate file type
-    if not upload_file.content_type.startswith('image/'):
+# Number of leading bytes needed to recognise every supported image format
+IMAGE_HEADER_SIZE = 32
+
+class StoredUpload(NamedTuple):
+    path: str  # relative to UPLOAD_DIR
+    sha256: str
+    size: int
+
+def detect_image_type(header: bytes) -> Optional[str]:
+    """Return the image format encoded in the leading bytes, if any."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header.startswith(b"BM"):
+        return "bmp"
+    if header[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    return None
+
+IMAGE_EXTENSIONS = {
+    "jpeg": ".jpg",
+    "png": ".png",
+    "gif": ".gif",
+    "webp": ".webp",
+    "bmp": ".bmp",
+    "tiff": ".tiff",
+}
+
+async def stream_upload_to_disk(upload_file: UploadFile, folder: str = "prescriptions") -> StoredUpload:
+    """Stream an upload into content-addressed storage, enforcing size and image header checks.
+
+    Memory use is bounded by UPLOAD_CHUNK_SIZE regardless of the file size, the
+    SHA-256 digest is computed while writing and all disk I/O runs off the event loop.
+    The finished file is stored under its digest, so identical uploads share one blob.
+    """
+    if not upload_file.content_type or not upload_file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
-    
-    # Generate unique filename
-    file_extension = Path(upload_file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = upload_dir / unique_filename
-    
-    # Save file
+
+    incoming_dir = Path(settings.UPLOAD_DIR) / ".incoming"
+    await run_in_threadpool(incoming_dir.mkdir, parents=True, exist_ok=True)
+    temp_path = incoming_dir / str(uuid.uuid4())
+
+    digest = hashlib.sha256()
+    size = 0
+    image_type = None
     try:
-        with open(file_path, "wb") as buffer:
-            content = upload_file.file.read()
-            if len(content) > settings.MAX_FILE_SIZE:
-                raise HTTPException(status_code=400, detail="File too large")
-            buffer.write(content)
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await upload_file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0:
+                    image_type = detect_image_type(chunk[:IMAGE_HEADER_SIZE])
+                    if image_type is None:
+                        raise HTTPException(status_code=400, detail="Invalid image file")
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(status_code=400, detail="File too large")
+                digest.update(chunk)
+                await buffer.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Invalid image file")
+        sha256 = digest.hexdigest()
+        key = content_key(folder, sha256, IMAGE_EXTENSIONS[image_type])
+        await run_in_threadpool(get_storage().put_file, str(temp_path), key)
+    except HTTPException:
+        await _remove_quietly(temp_path)
+        raise
     except Exception as e:
+        await _remove_quietly(temp_path)
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
-    
-    # Return relative path for database storage
-    return str(file_path.relative_to(Path(settings.UPLOAD_DIR)))
 
-def validate_image_file(upload_file: UploadFile) -> bool:
-    """Validate that the uploaded file is a valid image."""
+    # Return storage key (relative path) for database storage
+    return StoredUpload(path=key, sha256=sha256, size=size)
+
+async def save_uploaded_file(upload_file: UploadFile, folder: str = "prescriptions") -> str:
+    """Save uploaded file and return the file path."""
+    stored = await stream_upload_to_disk(upload_file, folder)
+    return stored.path
+
+async def validate_image_file(upload_file: UploadFile) -> bool:
+    """Validate that the uploaded file is an image by sniffing its header bytes."""
     try:
-        # Read image data
-        content = upload_file.file.read()
-        upload_file.file.seek(0)  # Reset file pointer
-        
-        # Try to open with PIL
-        image = Image.open(io.BytesIO(content))
-        image.verify()
-        return True
+        header = await upload_file.read(IMAGE_HEADER_SIZE)
+        await upload_file.seek(0)  # Reset file pointer
+        return detect_image_type(header) is not None
     except Exception:
         return False
 
+async def _remove_quietly(file_path: Path) -> None:
+    try:
+        await aiofiles.os.remove(file_path)
+    except OSError:
+        pass
+
 def get_file_url(file_path: str) -> str:
     """Generate a URL for the uploaded file."""
-    return f"/uploads/{file_path}" 
\ No newline at end of file
+    return f"/uploads/{file_path}"
+
+def image_variant_urls(value) -> Optional[Dict[str, str]]:
+    """URLs for a stored JSON map of size variant -> upload path; an already parsed map passes through."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return {name: get_file_url(path) for name, path in json.loads(value).items()}
+    return value
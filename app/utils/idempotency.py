@@ -0,0 +1,284 @@
+import asyncio
+import base64
+import hashlib
+import re
+import time
+from tempfile import SpooledTemporaryFile
+from typing import Dict, Optional, Sequence, Tuple
+import orjson
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import ClientDisconnect
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.utils.auth import bearer_subject
+from app.utils.cache import CacheUnavailable, MemoryBackend, get_cache_backend
+from app.utils.metrics import registry
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+KEY_PREFIX = "idempotency"
+
+# Routes where a retried request must not run twice: (method, path template)
+IDEMPOTENT_ROUTES = [
+    ("POST", "/orders/"),
+    ("POST", "/orders/{id}/delivery-proof"),
+]
+
+# Outcomes a retry may legitimately change; these are never replayed
+RETRYABLE_STATUSES = {401, 403, 408, 409, 425, 429}
+
+# Buffered bodies larger than this move from memory to a temporary file
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+idempotency_requests = registry.counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key: executed, replayed, coalesced, mismatch (key reused for another request) or busy.",
+    ("result",))
+
+def _route_pattern(template: str) -> "re.Pattern":
+    parts = re.split(r"(\{[^}]+\})", template)
+    return re.compile("^" + "".join("[^/]+" if part.startswith("{") else re.escape(part) for part in parts) + "$")
+
+class RequestFingerprint:
+    """Hash of what the request asks for, fed the body chunk by chunk.
+
+    Multipart boundaries are dropped, as clients regenerate them on retry; the
+    last bytes of each chunk are held back in case a boundary straddles two.
+    """
+
+    def __init__(self, method: str, path: str, content_type: str):
+        media_type, _, params = content_type.partition(";")
+        match = re.search(r'boundary="?([^";]+)"?', params)
+        self._boundary = match.group(1).encode("latin-1") if match else b""
+        self._digest = hashlib.sha256(f"{method} {path} {media_type.strip().lower()}\n".encode())
+        self._tail = b""
+
+    def update(self, chunk: bytes) -> None:
+        if not self._boundary:
+            self._digest.update(chunk)
+            return
+        data = self._tail + chunk
+        start = 0
+        while True:
+            found = data.find(self._boundary, start)
+            if found < 0:
+                break
+            self._digest.update(data[start:found])
+            start = found + len(self._boundary)
+        keep = max(start, len(data) - len(self._boundary) + 1)
+        self._digest.update(data[start:keep])
+        self._tail = data[keep:]
+
+    def hexdigest(self) -> str:
+        digest = self._digest.copy()
+        digest.update(self._tail)
+        return digest.hexdigest()
+
+class IdempotencyStore:
+    """Records in the shared cache backend, or in this process while it is down."""
+
+    def __init__(self):
+        self.local = MemoryBackend()
+
+    def _call(self, operation: str, *args):
+        try:
+            return getattr(get_cache_backend(), operation)(*args)
+        except CacheUnavailable:
+            return getattr(self.local, operation)(*args)
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._call("get_many", [key])[0]
+        return orjson.loads(value) if value is not None else None
+
+    def claim(self, key: str, fingerprint: str) -> bool:
+        record = orjson.dumps({"state": "in_progress", "fingerprint": fingerprint})
+        return self._call("add", key, record, settings.IDEMPOTENCY_LOCK_SECONDS)
+
+    def complete(self, key: str, record: dict) -> None:
+        self._call("set_many", {key: orjson.dumps(record)}, settings.IDEMPOTENCY_TTL_SECONDS)
+
+    def release(self, key: str) -> None:
+        self._call("delete_many", [key])
+
+def _replay(record: dict) -> Response:
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+    response = Response(base64.b64decode(record["body"]), status_code=record["status"])
+    response.raw_headers = headers + [(b"idempotent-replayed", b"true")]
+    return response
+
+class IdempotencyMiddleware:
+    """Runs a request with an ``Idempotency-Key`` header at most once per user and key.
+
+    The first request claims the key and its response is stored for
+    IDEMPOTENCY_TTL_SECONDS; retries with the same body get that response
+    back, while reusing the key for a different request is a 422. Duplicates
+    arriving while the first is still running wait for its result instead
+    of executing: in this process on a shared future, across workers by
+    polling the store. Server errors are not stored, so those retries run.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence[Tuple[str, str]] = IDEMPOTENT_ROUTES):
+        self.app = app
+        self.routes = [(method, _route_pattern(template)) for method, template in routes]
+        self.store = IdempotencyStore()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _applies(self, scope: Scope) -> bool:
+        return any(scope["method"] == method and pattern.match(scope["path"]) for method, pattern in self.routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get(HEADER)
+        user = bearer_subject(headers.get("authorization"))
+        if idempotency_key is None or user is None:
+            # Unauthenticated requests are rejected by the endpoint itself
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+            await JSONResponse({"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400)(scope, receive, send)
+            return
+
+        fingerprint = RequestFingerprint(scope["method"], scope["path"], headers.get("content-type", ""))
+        try:
+            body = await self._read_body(receive, fingerprint)
+        except ClientDisconnect:
+            # Nobody to answer, and a truncated body must not claim the key
+            return
+        if body is None:
+            await JSONResponse({"detail": "Request body too large"}, status_code=413)(scope, receive, send)
+            return
+        key = f"{KEY_PREFIX}:{user}:{scope['method']} {scope['path']}:{idempotency_key}"
+        try:
+            await self._run_once(scope, receive, send, key, fingerprint.hexdigest(), body)
+        finally:
+            body.close()
+
+    async def _run_once(
+        self, scope: Scope, receive: Receive, send: Send, key: str, fingerprint: str, body: SpooledTemporaryFile
+    ) -> None:
+        """Replay, wait for or execute the request holding ``key``."""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        waited = False
+        while True:
+            record = await run_in_threadpool(self.store.get, key)
+            if record is not None and record["fingerprint"] != fingerprint:
+                idempotency_requests.inc(("mismatch",))
+                response = JSONResponse({"detail": "Idempotency-Key was already used for a different request"}, status_code=422)
+                await response(scope, receive, send)
+                return
+            if record is not None and record["state"] == "done":
+                idempotency_requests.inc(("coalesced" if waited else "replayed",))
+                await _replay(record)(scope, receive, send)
+                return
+            if record is None and await run_in_threadpool(self.store.claim, key, fingerprint):
+                break
+            # Another request with this key is running
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                idempotency_requests.inc(("busy",))
+                response = JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still in progress"},
+                    status_code=409, headers={"Retry-After": "1"})
+                await response(scope, receive, send)
+                return
+            await self._wait_for(key, remaining)
+            waited = True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        outcome = None
+        try:
+            outcome = await self._execute(scope, body, receive, send)
+            if outcome["status"] < 500 and outcome["status"] not in RETRYABLE_STATUSES:
+                outcome["fingerprint"] = fingerprint
+                await run_in_threadpool(self.store.complete, key, outcome)
+            else:
+                outcome = None
+                await run_in_threadpool(self.store.release, key)
+            idempotency_requests.inc(("executed",))
+        except BaseException:
+            # Shielded so a cancelled request still frees the key
+            await asyncio.shield(run_in_threadpool(self.store.release, key))
+            raise
+        finally:
+            del self._inflight[key]
+            future.set_result(outcome)
+
+    async def _wait_for(self, key: str, timeout: float) -> None:
+        """Until the in-process request holding ``key`` finishes, or ``timeout`` for one held elsewhere."""
+        future = self._inflight.get(key)
+        if future is None or future.get_loop() is not asyncio.get_running_loop():
+            await asyncio.sleep(min(timeout, 0.1))
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _read_body(self, receive: Receive, fingerprint: RequestFingerprint) -> Optional[SpooledTemporaryFile]:
+        """Spool the body while hashing it; None past MAX_FILE_SIZE plus room for form fields.
+
+        Raises ClientDisconnect when the client goes away before sending it all.
+        """
+        limit = settings.MAX_FILE_SIZE + 1024 * 1024
+        body = SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        size = 0
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    raise ClientDisconnect()
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size > limit:
+                    body.close()
+                    return None
+                fingerprint.update(chunk)
+                await _spool_io(body, body.write, chunk)
+                if not message.get("more_body", False):
+                    return body
+        except BaseException:
+            body.close()
+            raise
+
+    async def _execute(self, scope: Scope, body: SpooledTemporaryFile, receive: Receive, send: Send) -> dict:
+        """Run the endpoint on the spooled body, sending its response while keeping a copy."""
+        remaining = body.tell()
+        body.seek(0)
+        started = False
+
+        async def replay_body() -> Message:
+            nonlocal remaining, started
+            if remaining or not started:
+                started = True
+                chunk = await _spool_io(body, body.read, min(remaining, settings.UPLOAD_CHUNK_SIZE))
+                remaining -= len(chunk)
+                return {"type": "http.request", "body": chunk, "more_body": remaining > 0}
+            # Body consumed: later reads wait for the client to go away, as they would unwrapped
+            return await receive()
+
+        outcome = {"state": "done", "status": 500, "headers": [], "body": b""}
+        response_body = []
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                outcome["status"] = message["status"]
+                outcome["headers"] = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_body, capture)
+        outcome["body"] = base64.b64encode(b"".join(response_body)).decode()
+        return outcome
+
+async def _spool_io(spool: SpooledTemporaryFile, operation, *args):
+    # Once rolled over to disk, file I/O goes to the threadpool as UploadFile does
+    if getattr(spool, "_rolled", True):
+        return await run_in_threadpool(operation, *args)
+    return operation(*args)
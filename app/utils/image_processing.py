@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+from PIL import Image, ImageOps, features
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger("app.image_processing")
+
+# Size variants generated for every uploaded image: name -> longest edge in pixels
+IMAGE_VARIANTS = {
+    "thumb": 160,
+    "small": 480,
+    "medium": 1080,
+}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESSING_WORKERS)
+    return _executor
+
+def shutdown_image_pipeline() -> None:
+    """Stop the worker processes (called on application shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def render_variants(source_path: str, upload_dir: str, quality: int = 80) -> Dict[str, str]:
+    """Write resized derivatives next to the source image and return their relative paths.
+
+    Runs inside a worker process, so it only takes and returns plain values.
+    """
+    root = Path(upload_dir)
+    source = root / source_path
+    use_webp = features.check("webp")
+    extension = ".webp" if use_webp else ".jpg"
+    variants = {}
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        for name, max_edge in IMAGE_VARIANTS.items():
+            target = source.with_name(f"{source.stem}_{name}{extension}")
+            variants[name] = str(target.relative_to(root))
+            if target.exists():
+                # Content-addressed source: an identical upload already produced this variant
+                continue
+            derivative = image.copy()
+            # Never upscale; small originals just get re-encoded
+            derivative.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            # Rendered under a temporary name and renamed, so a crash or a concurrent render
+            # of the same upload never leaves a truncated variant to be served as immutable
+            temp_path = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                if use_webp:
+                    derivative.save(temp_path, "WEBP", quality=quality, method=4)
+                else:
+                    derivative.save(temp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+                os.replace(temp_path, target)
+            except BaseException:
+                temp_path.unlink(missing_ok=True)
+                raise
+    return variants
+
+async def generate_image_variants(file_path: str) -> Dict[str, str]:
+    """Generate size variants for an uploaded image in the process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), render_variants, file_path, settings.UPLOAD_DIR, settings.IMAGE_VARIANT_QUALITY
+    )
+
+async def process_uploaded_image(model, record_id: int, file_path: str) -> None:
+    """Background task: generate variants and store their paths on the owning row."""
+    try:
+        variants = await generate_image_variants(file_path)
+    except Exception:
+        logger.exception("Generating image variants for %s failed", file_path)
+        return
+    await run_in_threadpool(_store_variants, model, record_id, variants)
+
+def _store_variants(model, record_id: int, variants: Dict[str, str]) -> None:
+    db = SessionLocal()
+    try:
+        record = db.query(model).filter(model.id == record_id).first()
+        if record is not None:
+            record.image_variants = json.dumps(variants)
+            db.commit()
+    finally:
+        db.close()
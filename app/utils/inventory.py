@@ -0,0 +1,89 @@
+from typing import Dict, List, Sequence
+from sqlalchemy import bindparam, case, false, func, select, true, update
+from sqlalchemy.orm import Session
+from app.models.medicine import Medicine
+from app.utils.catalog_version import mark_catalog_changed
+
+_medicines = Medicine.__table__
+
+def _stock_update(new_stock):
+    """UPDATE for one row keyed by :b_id. Stock never goes below zero; selling out hides the
+    medicine and a restock from zero shows it again (a manual is_available=false is kept)."""
+    new_stock = case((new_stock < 0, 0), else_=new_stock)
+    return (
+        update(_medicines)
+        .where(_medicines.c.id == bindparam("b_id"))
+        .values(
+            stock=new_stock,
+            is_available=case(
+                (new_stock <= 0, false()),
+                (func.coalesce(_medicines.c.stock, 0) <= 0, true()),
+                else_=_medicines.c.is_available
+            ),
+            updated_at=func.now()
+        )
+    )
+
+_SET_STOCK = _stock_update(bindparam("b_stock"))
+_ADD_STOCK = _stock_update(func.coalesce(_medicines.c.stock, 0) + bindparam("b_delta"))
+
+def _existing_ids(db: Session, ids: Sequence[int], chunk_size: int = 5000) -> set:
+    found = set()
+    for i in range(0, len(ids), chunk_size):
+        found.update(db.execute(select(_medicines.c.id).where(_medicines.c.id.in_(ids[i:i + chunk_size]))).scalars())
+    return found
+
+def restock(db: Session, quantities: Dict[int, int]) -> None:
+    """Put units (medicine id -> quantity) back into stock, in the caller's transaction."""
+    if quantities:
+        # In id order, so concurrent restocks lock rows in the same order
+        db.connection().execute(_ADD_STOCK, [
+            {"b_id": medicine_id, "b_delta": quantity} for medicine_id, quantity in sorted(quantities.items())
+        ])
+        mark_catalog_changed(db)
+
+def apply_stock_sync(db: Session, items: Sequence) -> Dict:
+    """Apply absolute (``stock``) and relative (``delta``) stock changes in one transaction.
+    Items for unknown medicines are skipped and reported."""
+    ids = list(dict.fromkeys(item.id for item in items))
+    found = _existing_ids(db, ids)
+
+    # One executemany per kind of change; a medicine listed twice starts a new round so
+    # its changes still apply in the order given
+    pending: Dict[object, List[dict]] = {_SET_STOCK: [], _ADD_STOCK: []}
+    pending_ids = set()
+
+    def flush():
+        for stmt, params in pending.items():
+            if params:
+                db.connection().execute(stmt, params)
+                params.clear()
+        pending_ids.clear()
+
+    for item in items:
+        if item.id not in found:
+            continue
+        if item.id in pending_ids:
+            flush()
+        pending_ids.add(item.id)
+        if item.stock is not None:
+            pending[_SET_STOCK].append({"b_id": item.id, "b_stock": item.stock})
+        else:
+            pending[_ADD_STOCK].append({"b_id": item.id, "b_delta": item.delta})
+    flush()
+    mark_catalog_changed(db)
+    db.commit()
+
+    updated = [medicine_id for medicine_id in ids if medicine_id in found]
+    out_of_stock = 0
+    for i in range(0, len(updated), 5000):
+        out_of_stock += db.execute(
+            select(func.count()).select_from(_medicines)
+            .where(_medicines.c.id.in_(updated[i:i + 5000]), _medicines.c.stock <= 0)
+        ).scalar()
+    return {
+        "updated": len(updated),
+        "out_of_stock": out_of_stock,
+        "not_found": [medicine_id for medicine_id in ids if medicine_id not in found],
+        "medicine_ids": updated,
+    }
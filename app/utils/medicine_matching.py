@@ -0,0 +1,250 @@
+import difflib
+import math
+import re
+from collections import defaultdict
+from threading import Lock, RLock
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from app.models.medicine import Medicine
+from app.utils.cache import get_cache_backend, on_invalidation, publish_invalidation
+
+# Dosage forms and the abbreviations prescribers use for them
+DOSAGE_FORMS = {
+    "tab": "tablet", "tabs": "tablet", "tablet": "tablet", "tablets": "tablet",
+    "cap": "capsule", "caps": "capsule", "capsule": "capsule", "capsules": "capsule",
+    "syp": "syrup", "syr": "syrup", "syrup": "syrup",
+    "susp": "suspension", "suspension": "suspension",
+    "inj": "injection", "injection": "injection",
+    "oint": "ointment", "ointment": "ointment",
+    "cream": "cream", "gel": "gel", "lotion": "lotion",
+    "drop": "drops", "drops": "drops",
+    "inhaler": "inhaler", "spray": "spray", "powder": "powder", "sachet": "sachet",
+}
+
+# Generic-name spellings that refer to the same salt
+SALT_SYNONYMS = {
+    "acetaminophen": "paracetamol",
+    "amoxycillin": "amoxicillin",
+    "albuterol": "salbutamol",
+    "frusemide": "furosemide",
+    "lignocaine": "lidocaine",
+}
+
+STOPWORDS = {"of", "and", "the", "for", "with", "ip", "bp", "usp", "plus", "od", "bd", "tds", "sos", "rx"}
+
+_STRENGTH_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(mcg|µg|ug|mg|gm|g|ml|iu|%)(?![a-z])")
+_BARE_NUMBER_RE = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(?![\w.])")
+_WORD_RE = re.compile(r"[a-z][a-z0-9\-]+")
+_UNIT_SCALE = {"mcg": ("mg", 0.001), "µg": ("mg", 0.001), "ug": ("mg", 0.001),
+               "mg": ("mg", 1), "g": ("mg", 1000), "gm": ("mg", 1000),
+               "ml": ("ml", 1), "iu": ("iu", 1), "%": ("%", 1)}
+
+# Score weights: salt/name tokens dominate, strength and dosage form refine
+TOKEN_WEIGHT, STRENGTH_WEIGHT, FORM_WEIGHT = 0.75, 0.15, 0.10
+
+class MedicineFeatures(NamedTuple):
+    tokens: FrozenSet[str]
+    strengths: FrozenSet[str]
+    form: Optional[str]
+
+def parse_medicine_text(text: str) -> MedicineFeatures:
+    """Normalise free text such as "Tab. Crocin 0.5 g" into salt/name tokens, strengths and form."""
+    text = (text or "").lower()
+    strengths = set()
+    for value, unit in _STRENGTH_RE.findall(text):
+        base_unit, scale = _UNIT_SCALE[unit]
+        strengths.add(f"{float(value) * scale:g}{base_unit}")
+    text = _STRENGTH_RE.sub(" ", text)
+    if not strengths:
+        # "Dolo 650" / "Paracetamol 650": a bare number on its own is a strength in mg
+        strengths.update(f"{float(value):g}mg" for value in _BARE_NUMBER_RE.findall(text))
+    tokens = set()
+    form = None
+    for word in _WORD_RE.findall(text.replace(".", " ")):
+        if word in DOSAGE_FORMS:
+            form = form or DOSAGE_FORMS[word]
+        elif word not in STOPWORDS:
+            tokens.add(SALT_SYNONYMS.get(word, word))
+    return MedicineFeatures(frozenset(tokens), frozenset(strengths), form)
+
+class CatalogIndex:
+    """In-memory inverted index of the medicine catalog for matching free-text prescription lines."""
+
+    def __init__(self):
+        self._lock = RLock()
+        self._features: Dict[int, MedicineFeatures] = {}
+        self._available: Dict[int, bool] = {}
+        self._postings: Dict[str, set] = defaultdict(set)
+        self._vocabulary: Dict[str, set] = defaultdict(set)  # first letter -> tokens, for typo fallback
+        self.built = False
+
+    def __len__(self):
+        return len(self._features)
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[str], bool]]) -> None:
+        """Replace the index with (id, name, composition, is_available) rows."""
+        with self._lock:
+            self._features.clear()
+            self._available.clear()
+            self._postings.clear()
+            self._vocabulary.clear()
+            for medicine_id, name, composition, is_available in rows:
+                self._add(medicine_id, name, composition, is_available)
+            self.built = True
+
+    def upsert(self, medicine_id: int, name: str, composition: Optional[str], is_available: bool) -> None:
+        with self._lock:
+            self._remove(medicine_id)
+            self._add(medicine_id, name, composition, is_available)
+
+    def remove(self, medicine_id: int) -> None:
+        with self._lock:
+            self._remove(medicine_id)
+
+    def features(self, medicine_id: int) -> Optional[MedicineFeatures]:
+        return self._features.get(medicine_id)
+
+    def _add(self, medicine_id, name, composition, is_available):
+        features = parse_medicine_text(f"{name} {composition or ''}")
+        self._features[medicine_id] = features
+        self._available[medicine_id] = bool(is_available)
+        for token in features.tokens:
+            self._postings[token].add(medicine_id)
+            self._vocabulary[token[0]].add(token)
+
+    def _remove(self, medicine_id):
+        features = self._features.pop(medicine_id, None)
+        self._available.pop(medicine_id, None)
+        if features is None:
+            return
+        for token in features.tokens:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(medicine_id)
+                if not postings:
+                    del self._postings[token]
+                    self._vocabulary[token[0]].discard(token)
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + len(self._features) / (1 + len(self._postings.get(token, ()))))
+
+    def _resolve_tokens(self, tokens: FrozenSet[str]) -> FrozenSet[str]:
+        """Map misspelt tokens onto the closest catalog token (e.g. "paracetmol")."""
+        resolved = set()
+        for token in tokens:
+            if token in self._postings:
+                resolved.add(token)
+                continue
+            close = difflib.get_close_matches(token, self._vocabulary.get(token[0], ()), n=1, cutoff=0.8)
+            resolved.add(close[0] if close else token)
+        return frozenset(resolved)
+
+    def score(self, query: MedicineFeatures, candidate: MedicineFeatures, idf: Dict[str, float]) -> float:
+        query_weight = sum(idf.values())
+        if not query_weight:
+            return 0.0
+        overlap = sum(idf[t] for t in query.tokens & candidate.tokens)
+        candidate_weight = sum(idf.get(t) or self._idf(t) for t in candidate.tokens) or 1.0
+        token_part = 0.8 * overlap / query_weight + 0.2 * min(overlap / candidate_weight, 1.0)
+
+        if not query.strengths or not candidate.strengths:
+            strength_part = 0.5
+        else:
+            strength_part = 1.0 if query.strengths & candidate.strengths else 0.0
+        if not query.form or not candidate.form:
+            form_part = 0.5
+        else:
+            form_part = 1.0 if query.form == candidate.form else 0.0
+        return TOKEN_WEIGHT * token_part + STRENGTH_WEIGHT * strength_part + FORM_WEIGHT * form_part
+
+    def match(self, text: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Rank catalog medicines for one prescription line. Returns (medicine_id, score) pairs."""
+        with self._lock:
+            parsed = parse_medicine_text(text)
+            query = parsed._replace(tokens=self._resolve_tokens(parsed.tokens))
+            if not query.tokens:
+                return []
+            idf = {token: self._idf(token) for token in query.tokens}
+            # Candidates come from the rarest tokens; very common ones only add noise
+            postings = sorted((self._postings[t] for t in query.tokens if t in self._postings), key=len)
+            candidates = set()
+            for posting in postings[:3]:
+                candidates |= posting
+            scored = []
+            for medicine_id in candidates:
+                score = self.score(query, self._features[medicine_id], idf)
+                if score >= min_score:
+                    scored.append((medicine_id, round(score, 4)))
+            scored.sort(key=lambda item: (-item[1], not self._available.get(item[0], False), item[0]))
+            return scored[:limit]
+
+    def match_many(self, lines: Sequence[str], limit: int = 5, min_score: float = 0.0) -> List[List[Tuple[int, float]]]:
+        """Bulk variant of match(); identical lines are only scored once."""
+        cache: Dict[str, List[Tuple[int, float]]] = {}
+        results = []
+        for line in lines:
+            key = (line or "").strip().lower()
+            if key not in cache:
+                cache[key] = self.match(key, limit, min_score)
+            results.append(cache[key])
+        return results
+
+catalog_index = CatalogIndex()
+
+# Other workers announce the medicines they re-indexed on the cache invalidation
+# channel; the ids are applied here on the next lookup ("*" or a reconnect: everything)
+INDEX_NAMESPACE = "catalog_index"
+_remote_changes: set = set()
+_remote_changes_lock = Lock()
+
+def _on_remote_change(keys: Optional[List[str]]) -> None:
+    with _remote_changes_lock:
+        _remote_changes.update(["*"] if keys is None else keys)
+
+on_invalidation(INDEX_NAMESPACE, _on_remote_change)
+
+def _catalog_rows(db: Session, ids: Optional[Sequence[int]] = None):
+    query = db.query(Medicine.id, Medicine.name, Medicine.composition, Medicine.is_available)
+    if ids is not None:
+        query = query.filter(Medicine.id.in_(ids))
+    return query.yield_per(5000)
+
+def get_catalog_index(db: Session) -> CatalogIndex:
+    """Return the catalog index, building it from the database on first use
+    and applying catalog writes other workers made since the last lookup."""
+    if not catalog_index.built:
+        get_cache_backend()  # subscribes to invalidations before the snapshot is read
+        with catalog_index._lock:
+            if not catalog_index.built:
+                catalog_index.build(_catalog_rows(db))
+        return catalog_index
+    with _remote_changes_lock:
+        changes = set(_remote_changes)
+        _remote_changes.clear()
+    if "*" in changes:
+        catalog_index.build(_catalog_rows(db))
+    elif changes:
+        _reindex(db, [int(medicine_id) for medicine_id in changes])
+    return catalog_index
+
+def _reindex(db: Session, medicine_ids: List[int]) -> None:
+    seen = set()
+    for medicine_id, name, composition, is_available in _catalog_rows(db, medicine_ids):
+        catalog_index.upsert(medicine_id, name, composition, is_available)
+        seen.add(medicine_id)
+    for medicine_id in set(medicine_ids) - seen:
+        catalog_index.remove(medicine_id)
+
+def refresh_catalog_index(db: Session, medicine_ids: Sequence[int]) -> None:
+    """Re-index the given medicines after a catalog write (deleted ids are dropped), here and in other workers."""
+    if not medicine_ids:
+        return
+    if catalog_index.built:
+        _reindex(db, list(medicine_ids))
+    publish_invalidation(INDEX_NAMESPACE, [str(medicine_id) for medicine_id in medicine_ids])
+
+def rebuild_catalog_index(db: Session) -> None:
+    """Rebuild after a bulk catalog write: here if the index was built, and in every other worker that has one."""
+    if catalog_index.built:
+        catalog_index.build(_catalog_rows(db))
+    publish_invalidation(INDEX_NAMESPACE, ["*"])
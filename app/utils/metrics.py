@@ -0,0 +1,225 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_label_text(self.labelnames, k)} {v:g}" for k, v in values]
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = self.header()
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Time from request start to the last body byte.", ("method", "route"))
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled.")
+db_queries = registry.histogram(
+    "http_request_db_queries", "Database statements executed per request.", ("route",), DB_QUERY_BUCKETS)
+db_time = registry.histogram(
+    "http_request_db_seconds", "Time spent in database statements per request.", ("route",))
+external_latency = registry.histogram(
+    "external_call_duration_seconds", "Latency of calls to external services.", ("service", "operation"))
+external_errors = registry.counter(
+    "external_call_errors_total", "Failed calls to external services.", ("service", "operation"))
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+# Set per request by the middleware; mutated in place, so sync endpoints running in
+# the threadpool (which get a copy of the context) still report into the same object
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+# Extra consumers of per-statement timings (e.g. the query profiler): fn(statement, seconds)
+statement_observers: List[Callable[[str, float], None]] = []
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+    for observer in statement_observers:
+        observer(statement, elapsed)
+
+@contextmanager
+def track_external_call(service: str, operation: str) -> Iterator[None]:
+    """Time a call to FCM, Twilio, Redis, ...; exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        external_errors.inc((service, operation))
+        raise
+    finally:
+        external_latency.observe(time.perf_counter() - start, (service, operation))
+
+_route_templates: Dict[object, str] = {}
+
+def route_label(scope: Scope) -> str:
+    """Template of the matched route (``/orders/{id}``), available once routing has run."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if endpoint not in _route_templates:
+        for route in getattr(scope.get("app"), "routes", []):
+            if hasattr(route, "endpoint"):
+                _route_templates.setdefault(route.endpoint, route.path)
+    return _route_templates.get(endpoint, "unmatched")
+
+class MetricsMiddleware:
+    """Pure ASGI request instrumentation. Routes are labelled by their template,
+    never the raw path, to keep label cardinality bounded."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+        http_in_flight.inc()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            current_request_stats.reset(token)
+            route = route_label(scope)
+            method = scope["method"]
+            http_requests.inc((method, route, str(status_code)))
+            http_latency.observe(elapsed, (method, route))
+            db_queries.observe(stats.db_queries, (route,))
+            db_time.observe(stats.db_seconds, (route,))
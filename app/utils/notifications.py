@@ -1,6 +1,7 @@
-import requests
 import os
 from app.config import settings
+from app.utils.clients import get_http_session
+from app.utils.metrics import track_external_call
 
 FCM_SERVER_KEY = os.getenv("FCM_SERVER_KEY", "your-fcm-server-key")
 FCM_URL = "https://fcm.googleapis.com/fcm/send"
@@ -19,5 +20,6 @@ def send_push_notification(device_token: str, title: str, message: str) -> bool:
             "body": message
         }
     }
-    response = requests.post(FCM_URL, json=payload, headers=headers)
+    with track_external_call("fcm", "send"):
+        response = get_http_session().post(FCM_URL, json=payload, headers=headers)
     return response.status_code == 200 
\ No newline at end of file
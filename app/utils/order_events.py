@@ -0,0 +1,141 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.delivery import DeliveryTracking
+from app.models.order import Order
+from app.models.order_event import OrderEvent
+from app.models.outbox import OutboxMessage
+from app.models.user import User
+from app.utils.notifications import send_push_notification
+from app.utils.outbox import add_message, handler, payload
+
+TRACKING_TOPIC = "order.tracking"
+NOTIFICATION_TOPIC = "order.notification"
+
+def record_order_event(
+    db: Session,
+    order: Order,
+    event_type: str,
+    from_status: Optional[str],
+    to_status: str,
+    actor_id: Optional[int] = None,
+    track: bool = True,
+    notify: bool = True
+) -> OrderEvent:
+    """Append an event and its side effects (tracking update, push notification) to the caller's transaction."""
+    return record_order_events(
+        db, [(order.id, order.user_id, from_status)], event_type, to_status, actor_id, track, notify
+    )[0]
+
+def record_order_events(
+    db: Session,
+    changes: Sequence[Tuple[int, int, Optional[str]]],
+    event_type: str,
+    to_status: str,
+    actor_id: Optional[int] = None,
+    track: bool = True,
+    notify: bool = True
+) -> List[OrderEvent]:
+    """Same as record_order_event for many (order id, user id, from status) changes, with one flush."""
+    order_events = [
+        OrderEvent(order_id=order_id, event_type=event_type, from_status=from_status, to_status=to_status, actor_id=actor_id)
+        for order_id, _, from_status in changes
+    ]
+    if not order_events:
+        return order_events
+    db.add_all(order_events)
+    db.flush()  # the tracking update carries the event id
+    for (order_id, user_id, _), order_event in zip(changes, order_events):
+        if track:
+            add_message(db, TRACKING_TOPIC, {"order_id": order_id, "status": to_status, "event_id": order_event.id})
+        if notify:
+            queue_notification(db, user_id, "Order Update", f"Your order #{order_id} status: {to_status}")
+    return order_events
+
+def queue_notification(db: Session, user_id: int, title: str, message: str) -> None:
+    add_message(db, NOTIFICATION_TOPIC, {"user_id": user_id, "title": title, "message": message})
+
+def apply_tracking(db: Session, statuses: Dict[int, Tuple[str, int]], force: bool = False) -> int:
+    """Set tracking rows from {order id: (status, event id)}; returns how many changed.
+
+    Events older than the one a row already reflects are skipped, so
+    redelivered or reordered messages are harmless. ``force`` overwrites
+    regardless, for rebuilding from the log.
+    """
+    if not statuses:
+        return 0
+    trackings = {t.order_id: t for t in db.query(DeliveryTracking).filter(DeliveryTracking.order_id.in_(statuses))}
+    now = datetime.utcnow()
+    changed = 0
+    for order_id, (status, event_id) in statuses.items():
+        tracking = trackings.get(order_id)
+        if tracking is None:
+            db.add(DeliveryTracking(order_id=order_id, current_status=status, last_event_id=event_id, last_updated=now))
+            changed += 1
+        elif force or tracking.last_event_id is None or tracking.last_event_id < event_id:
+            if tracking.current_status != status or tracking.last_event_id != event_id:
+                tracking.current_status = status
+                tracking.last_event_id = event_id
+                tracking.last_updated = now
+                changed += 1
+    return changed
+
+@handler(TRACKING_TOPIC)
+def _deliver_tracking(db: Session, messages: List[OutboxMessage]) -> Dict[int, str]:
+    # Only the newest event per order in the batch matters
+    latest: Dict[int, Tuple[str, int]] = {}
+    for message in messages:
+        update = payload(message)
+        current = latest.get(update["order_id"])
+        if current is None or current[1] < update["event_id"]:
+            latest[update["order_id"]] = (update["status"], update["event_id"])
+    apply_tracking(db, latest)
+    return {}
+
+@handler(NOTIFICATION_TOPIC)
+def _deliver_notifications(db: Session, messages: List[OutboxMessage]) -> Dict[int, str]:
+    notifications = {message.id: payload(message) for message in messages}
+    user_ids = {notification["user_id"] for notification in notifications.values()}
+    device_tokens = dict(db.query(User.id, User.device_token).filter(User.id.in_(user_ids)))
+    failures = {}
+    for message_id, notification in notifications.items():
+        device_token = device_tokens.get(notification["user_id"])
+        if not device_token:
+            continue  # nothing to deliver to
+        try:
+            if not send_push_notification(device_token, notification["title"], notification["message"]):
+                failures[message_id] = "Push notification rejected"
+        except Exception as e:
+            failures[message_id] = f"{e.__class__.__name__}: {e}"
+    return failures
+
+def rebuild_tracking(db: Session, order_ids: Optional[Iterable[int]] = None, chunk_size: int = 1000) -> int:
+    """Reset tracking status from each order's latest event; returns the rows changed.
+
+    Walks orders in id order, ``chunk_size`` at a time, with one grouped
+    query per chunk over the (order_id, id) index. Orders without events
+    (created before the log existed) are left alone.
+    """
+    order_ids = sorted(set(order_ids)) if order_ids is not None else None
+    changed = 0
+    after = 0
+    while True:
+        chunk_query = select(OrderEvent.order_id).where(OrderEvent.order_id > after)
+        if order_ids is not None:
+            chunk_query = chunk_query.where(OrderEvent.order_id.in_(order_ids))
+        chunk = db.execute(chunk_query.distinct().order_by(OrderEvent.order_id).limit(chunk_size)).scalars().all()
+        if not chunk:
+            return changed
+        latest_ids = (
+            select(func.max(OrderEvent.id))
+            .where(OrderEvent.order_id.in_(chunk))
+            .group_by(OrderEvent.order_id)
+            .scalar_subquery()
+        )
+        rows = db.execute(
+            select(OrderEvent.order_id, OrderEvent.to_status, OrderEvent.id).where(OrderEvent.id.in_(latest_ids))
+        ).all()
+        changed += apply_tracking(db, {row.order_id: (row.to_status, row.id) for row in rows}, force=True)
+        db.commit()
+        after = chunk[-1]
@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.models.order import Order, OrderItem
+from app.utils.inventory import restock
+from app.utils.order_events import record_order_events
+
+ORDER_STATUSES = ("pending", "confirmed", "dispatched", "delivered", "cancelled")
+
+# status -> statuses an order may move to from it; delivered and cancelled are final
+TRANSITIONS: Dict[str, FrozenSet[str]] = {
+    "pending": frozenset({"confirmed", "cancelled"}),
+    "confirmed": frozenset({"dispatched", "cancelled"}),
+    "dispatched": frozenset({"delivered", "cancelled"}),
+    "delivered": frozenset(),
+    "cancelled": frozenset(),
+}
+
+STAFF_ROLES = ("admin", "pharmacist")
+# Customers may only withdraw their own order before the pharmacy confirms it
+CUSTOMER_TRANSITIONS = {("pending", "cancelled")}
+
+@dataclass
+class StatusConflict:
+    """Why an order was left alone; ``kind`` is not_found, forbidden, invalid or stale."""
+
+    order_id: int
+    kind: str
+    reason: str
+    current_status: Optional[str] = None
+
+def can_transition(from_status: Optional[str], to_status: str) -> bool:
+    return to_status in TRANSITIONS.get(from_status, frozenset())
+
+def _compare_and_set(db: Session, order_ids: List[int], from_status: str, to_status: str) -> List[int]:
+    """Move the orders still at ``from_status``; returns the ids that moved."""
+    statement = (
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.status == from_status)
+        .values(status=to_status)
+        .execution_options(synchronize_session=False)
+    )
+    if db.bind.dialect.update_returning:
+        return db.execute(statement.returning(Order.id)).scalars().all()
+    return [
+        order_id for order_id in order_ids
+        if db.execute(statement.where(Order.id == order_id)).rowcount == 1
+    ]
+
+def transition_orders(
+    db: Session,
+    order_ids: Sequence[int],
+    to_status: str,
+    actor,
+    expected_status: Optional[str] = None
+) -> Tuple[List[int], List[StatusConflict]]:
+    """Move orders to ``to_status``, returning (moved ids, conflicts), and record their events.
+
+    Each order is checked against the transition table and the actor's
+    role, then written with ``UPDATE ... WHERE status = <status just read>``,
+    one statement per starting status. An order another request moved in
+    between is reported as stale rather than overwritten. ``expected_status``
+    lets the caller insist on the status it last saw. Cancelled orders give
+    their items back to stock. The caller commits.
+    """
+    requested = list(dict.fromkeys(order_ids))
+    rows = {row.id: row for row in db.execute(
+        select(Order.id, Order.user_id, Order.status).where(Order.id.in_(requested))
+    )}
+    staff = actor.role in STAFF_ROLES
+    conflicts: List[StatusConflict] = []
+    candidates = []
+    for order_id in requested:
+        row = rows.get(order_id)
+        if row is None or not (staff or row.user_id == actor.id):
+            conflicts.append(StatusConflict(order_id, "not_found", "Order not found"))
+        elif expected_status is not None and row.status != expected_status:
+            conflicts.append(StatusConflict(
+                order_id, "stale", f"Order is {row.status}, not {expected_status}", row.status))
+        elif row.status == to_status:
+            conflicts.append(StatusConflict(order_id, "invalid", f"Order is already {to_status}", row.status))
+        elif not can_transition(row.status, to_status):
+            conflicts.append(StatusConflict(
+                order_id, "invalid", f"Cannot move a {row.status} order to {to_status}", row.status))
+        elif not staff and (row.status, to_status) not in CUSTOMER_TRANSITIONS:
+            conflicts.append(StatusConflict(
+                order_id, "forbidden", f"Only pharmacy staff can move an order to {to_status}", row.status))
+        else:
+            candidates.append(row)
+
+    moved = set()
+    lost: List[int] = []
+    for from_status, group in groupby(sorted(candidates, key=lambda row: row.status), key=lambda row: row.status):
+        group = list(group)
+        won = set(_compare_and_set(db, [row.id for row in group], from_status, to_status))
+        record_order_events(
+            db, [(row.id, row.user_id, from_status) for row in group if row.id in won],
+            "status_changed", to_status, actor.id
+        )
+        moved |= won
+        lost.extend(row.id for row in group if row.id not in won)
+    if to_status == "cancelled" and moved:
+        # Only orders this call moved: one cancelled concurrently was restocked by its canceller
+        restock(db, dict(db.execute(
+            select(OrderItem.medicine_id, func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(moved))
+            .group_by(OrderItem.medicine_id)
+        ).all()))
+    if lost:
+        current = dict(db.execute(select(Order.id, Order.status).where(Order.id.in_(lost))).all())
+        conflicts.extend(
+            StatusConflict(order_id, "stale", "Order status changed concurrently", current.get(order_id))
+            for order_id in lost
+        )
+    return [order_id for order_id in requested if order_id in moved], conflicts
@@ -0,0 +1,179 @@
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Callable, Dict, List, Optional
+import orjson
+from sqlalchemy import and_, event, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.outbox import OutboxMessage
+from app.utils.metrics import registry
+
+logger = logging.getLogger("app.outbox")
+
+outbox_messages = registry.counter(
+    "outbox_messages_total", "Outbox messages handled by the relay: delivered, retried or dead.", ("topic", "result"))
+
+# topic -> handler(db, messages) returning {message id: error} for the ones that failed.
+# Database changes a handler makes are committed together with the delivery marks.
+HANDLERS: Dict[str, Callable[[Session, List[OutboxMessage]], Dict[int, str]]] = {}
+
+def handler(topic: str):
+    def register(fn):
+        HANDLERS[topic] = fn
+        return fn
+    return register
+
+def add_message(db: Session, topic: str, payload: dict) -> OutboxMessage:
+    """Stage a message in the caller's transaction; it exists only if that transaction commits."""
+    message = OutboxMessage(topic=topic, payload=orjson.dumps(payload).decode(), available_at=datetime.utcnow())
+    db.add(message)
+    db.info["outbox_pending"] = True
+    return message
+
+def payload(message: OutboxMessage) -> dict:
+    return orjson.loads(message.payload)
+
+def _due(now: datetime):
+    return and_(OutboxMessage.processed_at.is_(None), OutboxMessage.available_at <= now)
+
+def claim_messages(db: Session, limit: int) -> List[OutboxMessage]:
+    """Lease up to ``limit`` due messages to this relay batch, oldest first.
+
+    Same scheme as the prescription queue: FOR UPDATE SKIP LOCKED on
+    PostgreSQL, a conditional UPDATE elsewhere. A relay that dies mid-batch
+    leaves the lease to expire, so delivery is at least once.
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    candidates = select(OutboxMessage.id).where(_due(now)).order_by(OutboxMessage.id).limit(limit)
+    if db.bind.dialect.name == "postgresql":
+        ids = db.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+        condition = OutboxMessage.id.in_(ids)
+    else:
+        condition = and_(OutboxMessage.id.in_(candidates.scalar_subquery()), _due(now))
+    db.execute(
+        update(OutboxMessage)
+        .where(condition)
+        .values(claim_token=token, available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return db.query(OutboxMessage).filter(OutboxMessage.claim_token == token).order_by(OutboxMessage.id).all()
+
+def _mark_failed(message: OutboxMessage, error: str, now: datetime) -> None:
+    message.attempts += 1
+    message.last_error = error[:1000]
+    message.claim_token = None
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.processed_at = now
+        outbox_messages.inc((message.topic, "dead"))
+        logger.error("Giving up on outbox message %s (%s) after %d attempts: %s",
+                     message.id, message.topic, message.attempts, error)
+    else:
+        delay = min(settings.OUTBOX_RETRY_MAX_SECONDS, settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (message.attempts - 1))
+        message.available_at = now + timedelta(seconds=delay)
+        outbox_messages.inc((message.topic, "retried"))
+
+def _deliver_topic(db: Session, topic: str, messages: List[OutboxMessage]) -> None:
+    """Run one topic's handler and record the outcome, in a transaction of its own."""
+    ids = [message.id for message in messages]
+    try:
+        topic_handler = HANDLERS.get(topic)
+        if topic_handler is None:
+            failures = {message.id: f"No handler for topic {topic!r}" for message in messages}
+        else:
+            failures = topic_handler(db, messages) or {}
+        now = datetime.utcnow()
+        delivered = [message_id for message_id in ids if message_id not in failures]
+        if delivered:
+            db.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(delivered))
+                .values(processed_at=now, claim_token=None)
+                .execution_options(synchronize_session=False)
+            )
+            outbox_messages.inc((topic, "delivered"), len(delivered))
+        for message in messages:
+            if message.id in failures:
+                _mark_failed(message, failures[message.id], now)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Outbox handler for %s failed", topic)
+        now = datetime.utcnow()
+        for message in db.query(OutboxMessage).filter(OutboxMessage.id.in_(ids)):
+            _mark_failed(message, f"{e.__class__.__name__}: {e}", now)
+        db.commit()
+
+def relay_batch(limit: Optional[int] = None) -> int:
+    """Deliver one batch of due messages, grouped by topic; returns how many were claimed."""
+    db = SessionLocal()
+    try:
+        messages = claim_messages(db, limit or settings.OUTBOX_BATCH_SIZE)
+        for topic, group in groupby(sorted(messages, key=lambda m: (m.topic, m.id)), key=lambda m: m.topic):
+            _deliver_topic(db, topic, list(group))
+        return len(messages)
+    finally:
+        db.close()
+
+class OutboxRelay:
+    """Background thread delivering outbox messages in batches.
+
+    Started by the app's startup hook. Commits that add messages wake it at
+    once; otherwise it polls every OUTBOX_POLL_SECONDS for retries and for
+    messages written by other workers or scripts.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if not settings.OUTBOX_RELAY_ENABLED:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        # Never starts the thread: CLI scripts and a stopped app commit messages too,
+        # and leave them to the relay of a running app
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                claimed = relay_batch()
+            except Exception:
+                logger.exception("Outbox relay batch failed")
+                claimed = 0
+            if claimed < settings.OUTBOX_BATCH_SIZE:
+                self._wake.wait(settings.OUTBOX_POLL_SECONDS)
+                self._wake.clear()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join(timeout)
+
+outbox_relay = OutboxRelay()
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session):
+    if session.info.pop("outbox_pending", False):
+        outbox_relay.wake()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("outbox_pending", None)
@@ -0,0 +1,151 @@
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import and_, or_, select, update, func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.prescription import Prescription
+
+# Urgency accepted on upload -> stored queue priority
+PRIORITY_LEVELS = {"normal": 0, "high": 1, "critical": 2}
+
+def _unleased(now: datetime, pharmacist_id: Optional[int] = None):
+    """Nobody holds a live lease on the row (or the caller is the one holding it)."""
+    unleased = or_(Prescription.claimed_by.is_(None), Prescription.claim_expires_at < now)
+    if pharmacist_id is not None:
+        unleased = or_(unleased, Prescription.claimed_by == pharmacist_id)
+    return unleased
+
+def _claimable(now: datetime, pharmacist_id: Optional[int] = None):
+    return and_(Prescription.status == "pending", _unleased(now, pharmacist_id))
+
+def _queue_order():
+    return (Prescription.priority.desc(), Prescription.created_at.asc(), Prescription.id.asc())
+
+def peek_queue(db: Session, limit: int) -> List[Prescription]:
+    """Pending prescriptions available for claiming, most urgent and oldest first."""
+    return db.query(Prescription).filter(_claimable(datetime.utcnow())).order_by(*_queue_order()).limit(limit).all()
+
+def claim_prescriptions(
+    db: Session,
+    pharmacist_id: int,
+    limit: int,
+    lease_seconds: Optional[int] = None
+) -> List[Prescription]:
+    """Lease up to ``limit`` prescriptions to a pharmacist and return all of their live claims.
+
+    On PostgreSQL candidate rows are locked with ``FOR UPDATE SKIP LOCKED`` so
+    concurrent pharmacists never wait on or grab each other's rows. Elsewhere
+    (SQLite) a single conditional UPDATE does the claim; SQLite serialises writers
+    and the WHERE clause re-checks the lease, which gives the same guarantee.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds or settings.PRESCRIPTION_CLAIM_LEASE_SECONDS)
+    candidates = select(Prescription.id).where(_claimable(now)).order_by(*_queue_order()).limit(limit)
+
+    if db.bind.dialect.name == "postgresql":
+        ids = db.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+        condition = Prescription.id.in_(ids)
+    else:
+        condition = and_(Prescription.id.in_(candidates.scalar_subquery()), _claimable(now))
+
+    db.execute(
+        update(Prescription)
+        .where(condition)
+        .values(claimed_by=pharmacist_id, claim_expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    # Renew the lease on anything this pharmacist was already holding
+    db.execute(
+        update(Prescription)
+        .where(
+            Prescription.claimed_by == pharmacist_id,
+            Prescription.status == "pending",
+            Prescription.claim_expires_at >= now
+        )
+        .values(claim_expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return db.query(Prescription).filter(
+        Prescription.claimed_by == pharmacist_id,
+        Prescription.status == "pending",
+        Prescription.claim_expires_at >= now
+    ).order_by(*_queue_order()).all()
+
+def release_claims(db: Session, pharmacist_id: int, prescription_ids: Optional[Sequence[int]] = None) -> int:
+    """Hand leased prescriptions back to the queue. Returns the number released."""
+    query = update(Prescription).where(
+        Prescription.claimed_by == pharmacist_id,
+        Prescription.status == "pending"
+    )
+    if prescription_ids:
+        query = query.where(Prescription.id.in_(prescription_ids))
+    result = db.execute(
+        query.values(claimed_by=None, claim_expires_at=None).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+def record_verification(
+    db: Session,
+    prescription_id: int,
+    pharmacist_id: int,
+    status: str,
+    notes: Optional[str],
+    now: Optional[datetime] = None
+) -> bool:
+    """Conditionally mark a prescription verified/rejected. False if it is already
+    verified or another pharmacist holds a live lease on it. Committed by the caller."""
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(Prescription)
+        .where(
+            Prescription.id == prescription_id,
+            Prescription.is_verified == False,
+            _unleased(now, pharmacist_id)
+        )
+        .values(
+            is_verified=status == "verified",
+            verified_by=pharmacist_id,
+            verified_at=now,
+            status=status,
+            notes=notes,
+            claimed_by=None,
+            claim_expires_at=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+def queue_metrics(db: Session, window_hours: int = 24) -> Dict:
+    """Queue depth plus time-to-verify percentiles for prescriptions reviewed in the window."""
+    now = datetime.utcnow()
+    pending, claimed, oldest = db.query(
+        func.count(Prescription.id),
+        func.count(Prescription.id).filter(Prescription.claim_expires_at >= now),
+        func.min(Prescription.created_at)
+    ).filter(Prescription.status == "pending").one()
+
+    rows = db.query(Prescription.created_at, Prescription.verified_at).filter(
+        Prescription.verified_at >= now - timedelta(hours=window_hours),
+        Prescription.created_at.isnot(None)
+    ).all()
+    durations = sorted((verified_at - created_at).total_seconds() for created_at, verified_at in rows)
+    percentiles = {}
+    if durations:
+        percentiles = {f"p{p}": round(_percentile(durations, p), 1) for p in (50, 90, 95, 99)}
+
+    return {
+        "pending": pending,
+        "claimed": claimed,
+        "oldest_pending_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+        "window_hours": window_hours,
+        "reviewed": len(durations),
+        "time_to_verify_seconds": percentiles,
+    }
@@ -0,0 +1,158 @@
+import logging
+import re
+from collections import Counter as CounterDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("app.query_profiler")
+
+DEBUG_HEADER = "x-debug-queries"
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\]|'[^']*'|-?\d+(?:\.\d+)?)\s*,?)+\)", re.I)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b-?\d+(?:\.\d+)?\b")
+
+def normalize_statement(statement: str) -> str:
+    """Statement shape: literals and IN lists collapsed, so repeats of one query compare equal."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _NUMBER.sub("?", shape)
+
+class QueryProfile:
+    """Every statement run while the profile is active, with its duration in seconds."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.statements: List[Tuple[str, float]] = []
+        self._lock = Lock()
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.statements.append((statement, seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(seconds for _, seconds in self.statements)
+
+    def shapes(self) -> Dict[str, int]:
+        """Statement shape -> number of executions, most repeated first."""
+        return dict(CounterDict(normalize_statement(s) for s, _ in self.statements).most_common())
+
+    def n_plus_one(self, threshold: Optional[int] = None) -> Dict[str, int]:
+        """SELECT shapes repeated at least ``threshold`` times: the tell-tale of a per-row query loop."""
+        threshold = threshold or settings.QUERY_PROFILER_N_PLUS_ONE_THRESHOLD
+        return {shape: n for shape, n in self.shapes().items() if n >= threshold and shape.upper().startswith("SELECT")}
+
+    def slow(self, threshold_ms: Optional[float] = None) -> List[Tuple[str, float]]:
+        threshold_ms = settings.QUERY_PROFILER_SLOW_MS if threshold_ms is None else threshold_ms
+        return [(s, seconds) for s, seconds in self.statements if seconds * 1000 >= threshold_ms]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries in {self.total_seconds * 1000:.1f} ms" + (f" for {self.label}" if self.label else "")]
+        for shape, n in self.n_plus_one().items():
+            lines.append(f"  N+1 ({n}x): {shape}")
+        for statement, seconds in self.slow():
+            lines.append(f"  slow ({seconds * 1000:.1f} ms): {_WHITESPACE.sub(' ', statement)}")
+        return "\n".join(lines)
+
+# The request being profiled; the profile is mutated in place, so sync endpoints in
+# the threadpool report into it as well
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_query_profile", default=None)
+
+# Profiles that see statements from every thread, for tests driving the app through
+# TestClient (which runs it on another thread than the test)
+_global_profiles: List[QueryProfile] = []
+_global_lock = Lock()
+
+def _observe(statement: str, seconds: float) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, seconds)
+    if _global_profiles:
+        with _global_lock:
+            for global_profile in _global_profiles:
+                if global_profile is not profile:
+                    global_profile.record(statement, seconds)
+
+def install() -> None:
+    """Hook the profiler into the engine listeners shared with request metrics."""
+    if _observe not in metrics.statement_observers:
+        metrics.statement_observers.append(_observe)
+
+@contextmanager
+def profile_queries(label: str = "") -> Iterator[QueryProfile]:
+    """Record every statement, from any thread, executed inside the block."""
+    install()
+    profile = QueryProfile(label)
+    with _global_lock:
+        _global_profiles.append(profile)
+    try:
+        yield profile
+    finally:
+        with _global_lock:
+            _global_profiles.remove(profile)
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+@contextmanager
+def query_budget(max_queries: int, allow_n_plus_one: bool = False, label: str = "") -> Iterator[QueryProfile]:
+    """Fail when the block runs more than ``max_queries`` statements, or an N+1 pattern unless allowed."""
+    with profile_queries(label) as profile:
+        yield profile
+    problems = []
+    if profile.count > max_queries:
+        problems.append(f"{profile.count} queries, budget is {max_queries}")
+    if not allow_n_plus_one and profile.n_plus_one():
+        problems.append("N+1 pattern detected")
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems) + "\n" + profile.report())
+
+class QueryProfilerMiddleware:
+    """Per-request statement profile for development and staging.
+
+    N+1 patterns and slow statements are logged with the route template. Clients
+    sending ``X-Debug-Queries: 1`` also get the counts back as response headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        install()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+        debug = Headers(scope=scope).get(DEBUG_HEADER, "") not in ("", "0")
+
+        async def send_with_profile(message: Message) -> None:
+            if debug and message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                headers["X-Query-Count"] = str(profile.count)
+                headers["X-Query-Time-Ms"] = f"{profile.total_seconds * 1000:.1f}"
+                headers["X-Query-N-Plus-One"] = str(len(profile.n_plus_one()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_profile.reset(token)
+            profile.label = f"{scope['method']} {metrics.route_label(scope)}"
+            if profile.n_plus_one() or profile.slow():
+                logger.warning("Query profile: %s", profile.report())
+            elif debug:
+                logger.info("Query profile: %s", profile.report())
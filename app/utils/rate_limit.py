@@ -0,0 +1,259 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import settings
+from app.utils.auth import bearer_subject
+from app.utils.cache import REDIS_RETRY_SECONDS
+from app.utils.clients import get_redis
+from app.utils.metrics import registry, track_external_call
+
+ALGORITHMS = ("token_bucket", "sliding_window")
+SCOPES = ("ip", "user")
+KEY_PREFIX = "rl"
+
+rate_limited = registry.counter("rate_limited_total", "Requests rejected with 429, by policy.", ("policy",))
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """``limit`` requests per ``period`` seconds on one route, counted per client IP or per user.
+
+    A token bucket allows bursts of ``limit`` and refills at limit/period per
+    second; a sliding window caps the count over any ``period``-long window
+    (weighted over the current and previous fixed windows).
+    """
+
+    method: str
+    path: str
+    scope: str
+    algorithm: str
+    limit: int
+    period: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path} {self.scope} {self.algorithm} {self.limit}/{self.period:g}"
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method != "*" and self.method != method:
+            return False
+        if self.path.endswith("*"):
+            return path.startswith(self.path[:-1])
+        return self.path == path
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimitPolicy":
+        """From ``"<METHOD> <path> <ip|user> <algorithm> <limit>/<seconds>"``; ``*`` matches any method or path suffix."""
+        try:
+            method, path, scope, algorithm, rate = spec.split()
+            limit, period = rate.split("/")
+            policy = cls(method.upper(), path.rstrip("/") or "/", scope, algorithm, int(limit), float(period))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit policy {spec!r}: expected '<METHOD> <path> <ip|user> <algorithm> <limit>/<seconds>'")
+        if scope not in SCOPES or algorithm not in ALGORITHMS or policy.limit < 1 or policy.period <= 0:
+            raise ValueError(f"Invalid rate limit policy {spec!r}: scope is one of {SCOPES}, algorithm one of {ALGORITHMS}")
+        return policy
+
+def token_bucket(state: Optional[Tuple[float, float]], limit: int, period: float, now: float):
+    """(allowed, seconds to wait, new state) for a bucket state of (tokens, updated at)."""
+    rate = limit / period
+    tokens, updated = state or (limit, now)
+    tokens = min(limit, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return True, 0.0, (tokens - 1, now)
+    return False, (1 - tokens) / rate, (tokens, now)
+
+def sliding_window(state: Optional[Tuple[int, int, int]], limit: int, period: float, now: float):
+    """(allowed, seconds to wait, new state) for a window state of (window number, current count, previous count)."""
+    window = int(now // period)
+    current = previous = 0
+    if state is not None:
+        if state[0] == window:
+            current, previous = state[1], state[2]
+        elif state[0] == window - 1:
+            previous = state[1]
+    elapsed = (now % period) / period
+    if previous * (1 - elapsed) + current + 1 <= limit:
+        return True, 0.0, (window, current + 1, previous)
+    if current + 1 > limit:
+        # Not before the next window, where this window's count becomes the weighted one
+        wait = period - now % period + max(0.0, 1 - (limit - 1) / current) * period
+    else:
+        wait = (1 - (limit - current - 1) / previous - elapsed) * period
+    return False, max(wait, 0.0), (window, current, previous)
+
+class MemoryRateStore:
+    """Per-process limiter state: single-node deployments, and the fallback while Redis is down."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._state: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, checks: Sequence[Tuple[RateLimitPolicy, str]]) -> List[Tuple[bool, float]]:
+        now = time.time()
+        results = []
+        with self._lock:
+            if len(self._state) > self.max_keys:
+                # Crude bound on memory under key churn; limits restart for everyone
+                self._state.clear()
+            for policy, key in checks:
+                algorithm = token_bucket if policy.algorithm == "token_bucket" else sliding_window
+                allowed, wait, self._state[key] = algorithm(self._state.get(key), policy.limit, policy.period, now)
+                results.append((allowed, wait))
+        return results
+
+# Both scripts mirror the Python functions above; Redis TIME keeps every worker on one clock
+_LUA_NOW = "local t = redis.call('TIME') local now = tonumber(t[1]) + tonumber(t[2]) / 1000000 "
+TOKEN_BUCKET_LUA = _LUA_NOW + """
+local limit, period = tonumber(ARGV[1]), tonumber(ARGV[2])
+local rate = limit / period
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or limit
+local updated = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - updated) * rate)
+local allowed, wait = 0, 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(period * 1000))
+return {allowed, tostring(wait)}
+"""
+SLIDING_WINDOW_LUA = _LUA_NOW + """
+local limit, period = tonumber(ARGV[1]), tonumber(ARGV[2])
+local window = math.floor(now / period)
+local state = redis.call('HMGET', KEYS[1], 'window', 'current', 'previous')
+local current, previous = 0, 0
+if tonumber(state[1]) == window then
+    current, previous = tonumber(state[2]), tonumber(state[3])
+elseif tonumber(state[1]) == window - 1 then
+    previous = tonumber(state[2])
+end
+local elapsed = (now % period) / period
+if previous * (1 - elapsed) + current + 1 <= limit then
+    redis.call('HSET', KEYS[1], 'window', window, 'current', current + 1, 'previous', previous)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(period * 2000))
+    return {1, '0'}
+end
+local wait
+if current + 1 > limit then
+    wait = period - now % period + math.max(0, 1 - (limit - 1) / current) * period
+else
+    wait = (1 - (limit - current - 1) / previous - elapsed) * period
+end
+return {0, tostring(math.max(wait, 0))}
+"""
+
+class RedisRateStore:
+    """Limiter state shared by every worker; one pipelined round trip per request."""
+
+    def __init__(self, client):
+        import redis
+        self._redis = client
+        self._errors = (redis.RedisError, OSError)
+        self._scripts = {
+            "token_bucket": client.register_script(TOKEN_BUCKET_LUA),
+            "sliding_window": client.register_script(SLIDING_WINDOW_LUA),
+        }
+        self._down_until = 0.0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def hit(self, checks: Sequence[Tuple[RateLimitPolicy, str]]) -> Optional[List[Tuple[bool, float]]]:
+        """Results per check, or None when Redis cannot be reached."""
+        try:
+            with track_external_call("redis", "rate_limit"):
+                pipe = self._redis.pipeline(transaction=False)
+                for policy, key in checks:
+                    self._scripts[policy.algorithm](keys=[key], args=[policy.limit, policy.period], client=pipe)
+                replies = pipe.execute()
+        except self._errors:
+            self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            return None
+        return [(bool(allowed), float(wait)) for allowed, wait in replies]
+
+class RateLimiter:
+    def __init__(self, policies: Sequence[RateLimitPolicy], shared: Optional[RedisRateStore] = None):
+        self.policies = list(policies)
+        self.shared = shared
+        self.local = MemoryRateStore()
+
+    def policies_for(self, method: str, path: str) -> List[RateLimitPolicy]:
+        path = path.rstrip("/") or "/"
+        return [policy for policy in self.policies if policy.matches(method, path)]
+
+    async def check(self, checks: Sequence[Tuple[RateLimitPolicy, str]]) -> Optional[Tuple[RateLimitPolicy, float]]:
+        """The first exceeded policy and the seconds until it allows a request, or None."""
+        results = None
+        if self.shared is not None and self.shared.available():
+            results = await run_in_threadpool(self.shared.hit, checks)
+        if results is None:
+            results = self.local.hit(checks)
+        for (policy, _), (allowed, wait) in zip(checks, results):
+            if not allowed:
+                return policy, wait
+        return None
+
+def client_ip(scope: Scope, headers: Headers) -> str:
+    """Peer address, or the address RATE_LIMIT_TRUSTED_PROXY_HOPS proxies in front of us saw."""
+    hops = settings.RATE_LIMIT_TRUSTED_PROXY_HOPS
+    if hops:
+        forwarded = [part.strip() for part in headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if forwarded:
+            return forwarded[max(0, len(forwarded) - hops)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def build_rate_limiter() -> RateLimiter:
+    policies = [RateLimitPolicy.parse(spec) for spec in settings.RATE_LIMIT_POLICIES]
+    shared = None if settings.CACHE_BACKEND == "memory" else RedisRateStore(get_redis())
+    return RateLimiter(policies, shared)
+
+class RateLimitMiddleware:
+    """Answers 429 with Retry-After once a client exceeds a policy for the route.
+
+    User-scoped policies count per authenticated user and fall back to the
+    client IP for anonymous requests. Routes without a policy cost one list scan.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or build_rate_limiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        policies = self.limiter.policies_for(scope["method"], scope["path"])
+        if policies:
+            headers = Headers(scope=scope)
+            user = None
+            if any(policy.scope == "user" for policy in policies):
+                user = bearer_subject(headers.get("authorization"))
+            ip = client_ip(scope, headers)
+            checks = []
+            for policy in policies:
+                identity = f"user:{user}" if policy.scope == "user" and user else f"ip:{ip}"
+                checks.append((policy, f"{KEY_PREFIX}:{policy.name}:{identity}"))
+            exceeded = await self.limiter.check(checks)
+            if exceeded is not None:
+                policy, wait = exceeded
+                rate_limited.inc((policy.name,))
+                response = JSONResponse(
+                    {"detail": "Too many requests; try again later"},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
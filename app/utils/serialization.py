@@ -0,0 +1,67 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Optional
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.medicine import Medicine
+from app.models.order import Order, OrderItem
+from app.schemas.medicine import MedicineResponse
+from app.schemas.order import OrderResponse, OrderItemResponse
+from app.utils.file_upload import image_variant_urls
+
+# Column-only projections for hot list endpoints. Rows are turned straight into
+# dicts shaped like the response models and encoded with orjson, skipping ORM
+# object construction and response-model validation, which the data read back
+# from our own tables does not need.
+
+MEDICINE_FIELDS = [name for name in MedicineResponse.model_fields]
+MEDICINE_COLUMNS = [getattr(Medicine, name) for name in MEDICINE_FIELDS]
+
+ORDER_FIELDS = [name for name in OrderResponse.model_fields if name != "items"]
+ORDER_ITEM_FIELDS = [name for name in OrderItemResponse.model_fields
+                     if name not in ("medicine_name", "medicine_image_url")]
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Medicine timestamps are String columns holding the database's now() text."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+def medicine_row_to_dict(row) -> dict:
+    data = dict(zip(MEDICINE_FIELDS, row))
+    data["created_at"] = parse_timestamp(data["created_at"])
+    data["updated_at"] = parse_timestamp(data["updated_at"])
+    data["image_variants"] = image_variant_urls(data["image_variants"])
+    return data
+
+def dump_medicine_row(row) -> str:
+    return orjson.dumps(medicine_row_to_dict(row)).decode()
+
+def order_rows(db: Session, user_id: int) -> List[dict]:
+    """A user's orders with their items, newest first, in two queries."""
+    orders = [
+        dict(zip(ORDER_FIELDS, row)) for row in db.execute(
+            select(*(getattr(Order, name) for name in ORDER_FIELDS))
+            .where(Order.user_id == user_id)
+            .order_by(Order.created_at.desc(), Order.id.desc())
+        )
+    ]
+    if not orders:
+        return []
+    items = defaultdict(list)
+    item_rows = db.execute(
+        select(OrderItem.order_id, *(getattr(OrderItem, name) for name in ORDER_ITEM_FIELDS),
+               Medicine.name, Medicine.image_url)
+        .outerjoin(Medicine, Medicine.id == OrderItem.medicine_id)
+        .where(OrderItem.order_id.in_([order["id"] for order in orders]))
+        .order_by(OrderItem.id)
+    )
+    for order_id, *values, medicine_name, medicine_image_url in item_rows:
+        item = dict(zip(ORDER_ITEM_FIELDS, values))
+        item["medicine_name"] = medicine_name
+        item["medicine_image_url"] = medicine_image_url
+        items[order_id].append(item)
+    for order in orders:
+        order["items"] = items[order["id"]]
+    return orders
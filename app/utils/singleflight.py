@@ -0,0 +1,65 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+from app.utils.metrics import registry
+
+singleflight_calls = registry.counter(
+    "singleflight_calls_total", "Coalesced reads: leaders executed, followers got a leader's result.", ("group", "role"))
+singleflight_ratio = registry.gauge(
+    "singleflight_coalescing_ratio", "Share of calls answered by another call's execution since start.", ("group",))
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Runs concurrent identical reads once per worker and hands every caller the result.
+
+    ``do`` is for sync code (endpoints in the threadpool). Only calls
+    overlapping in time are merged: nothing is kept once the leader returns,
+    and its exception is raised to all of the waiters. Never call ``do`` on
+    the event loop thread.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._followers = 0
+
+    def _record(self, leader: bool) -> None:
+        singleflight_calls.inc((self.group, "leader" if leader else "follower"))
+        with self._lock:
+            if leader:
+                self._leaders += 1
+            else:
+                self._followers += 1
+            ratio = self._followers / (self._leaders + self._followers)
+        singleflight_ratio.set(ratio, (self.group,))
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._record(leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -1,53 +1,109 @@
+import logging
 import random
-import redis
+import threading
 from typing import Optional
-from twilio.rest import Client
 from app.config import settings
+from app.utils.cache import CacheUnavailable, MemoryBackend, get_cache_backend
+from app.utils.clients import get_twilio
+from app.utils.metrics import track_external_call
 
-# Redis client for storing verification codes
-redis_client = redis.from_url(settings.REDIS_URL)
+logger = logging.getLogger("app.sms")
 
-# Twilio client
-twilio_client = None
-if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
-    twilio_client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+class SMSDeliveryError(Exception):
+    """A provider failed to send; ``retryable`` is False when resending cannot help (bad number, auth)."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class ConsoleProvider:
+    """Logs messages instead of sending them: development and tests."""
+
+    name = "console"
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, phone: str, body: str) -> str:
+        self.sent.append((phone, body))
+        logger.info("SMS to %s: %s", phone, body)
+        return f"console-{len(self.sent)}"
+
+class TwilioProvider:
+    name = "twilio"
+
+    def send(self, phone: str, body: str) -> str:
+        from twilio.base.exceptions import TwilioRestException
+        try:
+            with track_external_call("twilio", "send_sms"):
+                message = get_twilio().messages.create(body=body, from_=settings.TWILIO_PHONE_NUMBER, to=phone)
+        except TwilioRestException as e:
+            # 4xx other than 429 (invalid number, unverified sender, auth) will fail again
+            raise SMSDeliveryError(str(e), retryable=e.status == 429 or e.status >= 500) from e
+        except Exception as e:
+            raise SMSDeliveryError(str(e)) from e
+        return message.sid
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_sms_provider():
+    """Provider from SMS_PROVIDER; "auto" uses Twilio when it is configured, else the console."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                name = settings.SMS_PROVIDER
+                if name == "auto":
+                    name = "twilio" if get_twilio() is not None else "console"
+                _provider = TwilioProvider() if name == "twilio" else ConsoleProvider()
+    return _provider
+
+def set_sms_provider(provider) -> None:
+    """Swap the provider (tests, or another gateway with a ``send(phone, body) -> id`` method)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
 
 def generate_verification_code() -> str:
     """Generate a 6-digit verification code."""
     return str(random.randint(100000, 999999))
 
+def verification_message(code: str) -> str:
+    return f"Your medicine delivery verification code is: {code}"
+
 def send_verification_sms(phone: str, code: str) -> bool:
-    """Send verification SMS using Twilio."""
-    if not twilio_client:
-        # In development, just print the code
-        print(f"Verification code for {phone}: {code}")
-        return True
-    
+    """Send the verification SMS now, blocking; requests queue it with sms_queue instead."""
     try:
-        message = twilio_client.messages.create(
-            body=f"Your medicine delivery verification code is: {code}",
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone
-        )
-        return message.sid is not None
-    except Exception as e:
-        print(f"Error sending SMS: {e}")
+        get_sms_provider().send(phone, verification_message(code))
+        return True
+    except SMSDeliveryError as e:
+        logger.warning("Error sending SMS to %s: %s", phone, e)
         return False
 
+# Codes issued while the shared backend is down; only this process can then verify them
+_local_codes = MemoryBackend()
+
+def _codes_call(operation: str, *args):
+    try:
+        return getattr(get_cache_backend(), operation)(*args)
+    except CacheUnavailable:
+        return getattr(_local_codes, operation)(*args)
+
 def store_verification_code(phone: str, code: str, expiry_minutes: int = 10) -> None:
-    """Store verification code in Redis with expiry."""
-    key = f"verification_code:{phone}"
-    redis_client.setex(key, expiry_minutes * 60, code)
+    """Store verification code in the cache backend with expiry."""
+    _codes_call("set_many", {f"verification_code:{phone}": code.encode()}, expiry_minutes * 60)
 
-def get_verification_code(phone: str) -> Optional[str]:
-    """Get stored verification code from Redis."""
+def get_verification_code(phone: str) -> Optional[bytes]:
+    """Get stored verification code from the cache backend."""
     key = f"verification_code:{phone}"
-    return redis_client.get(key)
+    return _codes_call("get_many", [key])[0] or _local_codes.get_many([key])[0]
 
 def delete_verification_code(phone: str) -> None:
-    """Delete verification code from Redis."""
+    """Delete verification code from the cache backend."""
     key = f"verification_code:{phone}"
-    redis_client.delete(key)
+    _codes_call("delete_many", [key])
+    _local_codes.delete_many([key])
 
 def verify_phone_code(phone: str, code: str) -> bool:
     """Verify phone number with provided code."""
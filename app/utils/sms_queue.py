@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from app.config import settings
+from app.utils.cache import CacheUnavailable, MemoryBackend, get_cache_backend
+from app.utils.metrics import registry
+from app.utils.sms import SMSDeliveryError, get_sms_provider, verification_message
+
+logger = logging.getLogger("app.sms")
+
+RATE_KEY_PREFIX = "sms:rate"
+SHUTDOWN_DRAIN_SECONDS = 5.0
+
+sms_messages = registry.counter(
+    "sms_messages_total", "Outbound SMS by outcome: sent, retried, failed or dropped (queue full).", ("result",))
+sms_pending = registry.gauge("sms_pending", "SMS queued, being sent or waiting for a retry.")
+
+# Counters used while the shared backend is down; limits then hold per process only
+_local_counters = MemoryBackend()
+
+def _hit(key: str, window: int, amount: int = 1) -> int:
+    """Count ``amount`` events in the current fixed ``window`` (seconds) and return the count so far."""
+    full_key = f"{RATE_KEY_PREFIX}:{key}:{window}:{int(time.time() // window)}"
+    try:
+        return get_cache_backend().incr(full_key, window, amount)
+    except CacheUnavailable:
+        return _local_counters.incr(full_key, window, amount)
+
+def _seconds_left(window: int) -> int:
+    return max(1, math.ceil(window - time.time() % window))
+
+def _phone_limits():
+    return ((1, settings.SMS_PHONE_INTERVAL_SECONDS), (settings.SMS_PHONE_HOURLY_LIMIT, 3600))
+
+def reserve_phone_send(phone: str) -> Optional[int]:
+    """Count a verification SMS to ``phone``; seconds to wait when over a per-phone limit, else None."""
+    for limit, window in _phone_limits():
+        if _hit(f"phone:{phone}", window) > limit:
+            return _seconds_left(window)
+    return None
+
+def release_phone_send(phone: str) -> None:
+    """Give back a successful reservation whose SMS was never queued."""
+    for _, window in _phone_limits():
+        _hit(f"phone:{phone}", window, -1)
+
+@dataclass
+class OutboundSMS:
+    phone: str
+    body: str
+    attempts: int = 0
+
+def _deliver(message: OutboundSMS) -> None:
+    # Global limit shared by every worker process, so bursts stay under the gateway's rate
+    while _hit("global", 1) > settings.SMS_GLOBAL_RATE_PER_SECOND:
+        time.sleep(1 - time.time() % 1)
+    get_sms_provider().send(message.phone, message.body)
+
+class SMSQueue:
+    """Outbound SMS sent from a background event loop instead of inside requests.
+
+    ``enqueue`` is safe from any thread and never blocks on the provider. At most
+    ``workers`` messages are sent at once; transient failures are retried with
+    full-jitter exponential backoff without holding a worker.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._ready,), name="sms-queue", daemon=True)
+                self._thread.start()
+            ready = self._ready
+        # Every caller waits, not just the one that started the thread, so _loop is set on return
+        ready.wait()
+
+    def _run(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sms-send")
+        loop.set_default_executor(executor)
+        self._queue = asyncio.Queue()
+        workers = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._loop = loop
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            for task in workers:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*workers, return_exceptions=True))
+            executor.shutdown(wait=False, cancel_futures=True)
+            loop.close()
+
+    def enqueue(self, phone: str, body: str) -> bool:
+        """Queue a message; False when ``max_pending`` messages are already waiting."""
+        self.start()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                sms_messages.inc(("dropped",))
+                return False
+            # Counted only once the loop has it; holding the lock keeps _finished from running first
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, OutboundSMS(phone, body))
+            self._pending += 1
+            sms_pending.inc()
+        return True
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await self._queue.get()
+            try:
+                await loop.run_in_executor(None, _deliver, message)
+            except SMSDeliveryError as e:
+                message.attempts += 1
+                if e.retryable and message.attempts < settings.SMS_MAX_ATTEMPTS:
+                    backoff = min(settings.SMS_RETRY_MAX_SECONDS, settings.SMS_RETRY_BASE_SECONDS * 2 ** (message.attempts - 1))
+                    sms_messages.inc(("retried",))
+                    loop.call_later(random.uniform(0, backoff), self._queue.put_nowait, message)
+                    continue
+                sms_messages.inc(("failed",))
+                logger.warning("Giving up on SMS to %s after %d attempt(s): %s", message.phone, message.attempts, e)
+            except Exception:
+                sms_messages.inc(("failed",))
+                logger.exception("Unexpected error sending SMS to %s", message.phone)
+            else:
+                sms_messages.inc(("sent",))
+            self._finished()
+
+    def _finished(self) -> None:
+        sms_pending.dec()
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is queued, in flight or awaiting a retry; False on timeout."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout: float = SHUTDOWN_DRAIN_SECONDS) -> None:
+        """Give pending messages ``timeout`` seconds to go out, then stop the loop."""
+        if self._thread is None:
+            return
+        if not self.drain(timeout):
+            logger.warning("Stopping SMS queue with %d message(s) unsent", self._pending)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        with self._lock:
+            sms_pending.dec(amount=self._pending)
+            self._thread = self._loop = self._queue = None
+            self._pending = 0
+
+sms_queue = SMSQueue(settings.SMS_WORKERS, settings.SMS_QUEUE_MAX_SIZE)
+
+def queue_verification_sms(phone: str, code: str) -> bool:
+    """Queue the verification SMS; False when the queue is full."""
+    return sms_queue.enqueue(phone, verification_message(code))
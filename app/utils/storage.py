@@ -0,0 +1,229 @@
+import os
+from abc import ABC, abstractmethod
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.stored_file import StoredFile
+from app.models.prescription import Prescription
+from app.models.delivery import DeliveryProof
+from app.models.medicine import Medicine
+
+class StorageBackend(ABC):
+    """Blob store addressed by relative keys such as ``prescriptions/ab/cd/<sha256>.jpg``.
+
+    The local filesystem implementation below is the default; an object storage
+    implementation only needs to provide the same methods.
+    """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put_file(self, source_path: str, key: str) -> bool:
+        """Move a finished local file into the store. Returns False if the key already existed.
+
+        A duplicate still refreshes the blob's modification time, which keeps
+        garbage collection off it until the caller's reference commits.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def local_path(self, key: str) -> str:
+        """Return a local filesystem path holding the blob's content."""
+
+    @abstractmethod
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        ...
+
+    @abstractmethod
+    def modified_at(self, key: str) -> datetime:
+        ...
+
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def put_file(self, source_path: str, key: str) -> bool:
+        target = self._path(key)
+        if target.exists():
+            try:
+                os.utime(target)
+            except FileNotFoundError:
+                # Collected in between: store this copy after all
+                pass
+            else:
+                os.remove(source_path)
+                return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Same filesystem as the incoming dir, so this is an atomic rename
+        os.replace(source_path, target)
+        return True
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> str:
+        return str(self._path(key))
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        base = self.root / prefix
+        if not base.exists():
+            return
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                yield str((Path(dirpath) / filename).relative_to(self.root))
+
+    def modified_at(self, key: str) -> datetime:
+        return datetime.utcfromtimestamp(self._path(key).stat().st_mtime)
+
+_storage: Optional[StorageBackend] = None
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        _storage = LocalStorageBackend(settings.UPLOAD_DIR)
+    return _storage
+
+def content_key(folder: str, sha256: str, extension: str) -> str:
+    """Sharded content-addressed key, e.g. prescriptions/ab/cd/abcd...ef.jpg"""
+    return f"{folder}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+def is_content_key(key: str) -> bool:
+    parts = key.split("/")
+    if len(parts) != 4:
+        return False
+    name = parts[3].split(".")[0].split("_")[0]
+    return len(name) == 64 and parts[1] == name[:2] and parts[2] == name[2:4]
+
+def key_from_url(image_url: Optional[str]) -> Optional[str]:
+    if not image_url or not image_url.startswith("/uploads/"):
+        return None
+    return image_url[len("/uploads/"):]
+
+def add_reference(db: Session, key: str, sha256: str, size: int) -> None:
+    """Count one more row pointing at a stored blob. Committed by the caller.
+
+    One INSERT ... ON CONFLICT (key) DO UPDATE, so concurrent first uploads of
+    the same content both count instead of one failing on the unique key.
+    """
+    increment = {"ref_count": StoredFile.ref_count + 1, "released_at": None}
+    dialect = db.bind.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(StoredFile.__table__).values(
+            key=key, sha256=sha256, size=size, ref_count=1
+        )
+        db.execute(stmt.on_conflict_do_update(index_elements=["key"], set_=increment))
+        return
+    # Other databases: insert, and count on the existing row if another upload got there first
+    try:
+        with db.begin_nested():
+            db.add(StoredFile(key=key, sha256=sha256, size=size, ref_count=1))
+    except IntegrityError:
+        db.query(StoredFile).filter(StoredFile.key == key).update(increment, synchronize_session=False)
+
+def release_reference(db: Session, image_url: Optional[str]) -> None:
+    """Drop one reference to the blob behind an upload URL. Committed by the caller."""
+    key = key_from_url(image_url)
+    if key is None:
+        return
+    stored = db.query(StoredFile).filter(StoredFile.key == key).first()
+    if stored is not None:
+        stored.ref_count = StoredFile.ref_count - 1
+        stored.released_at = datetime.utcnow()
+
+def recount_references(db: Session) -> int:
+    """Recompute ref counts from the rows that hold upload URLs. Returns rows changed."""
+    counts = {}
+    for column in (Prescription.image_url, DeliveryProof.image_url, Medicine.image_url):
+        rows = db.query(column, func.count()).filter(column.like("/uploads/%")).group_by(column)
+        for image_url, count in rows:
+            key = key_from_url(image_url)
+            counts[key] = counts.get(key, 0) + count
+
+    changed = 0
+    now = datetime.utcnow()
+    for stored in db.query(StoredFile).yield_per(1000):
+        count = counts.get(stored.key, 0)
+        if stored.ref_count != count:
+            stored.ref_count = count
+            if count == 0:
+                stored.released_at = now
+            changed += 1
+    db.commit()
+    return changed
+
+def collect_garbage(db: Session, grace_period: timedelta = timedelta(hours=1)) -> int:
+    """Delete unreferenced content-addressed blobs (and their derivatives). Returns blobs removed."""
+    storage = get_storage()
+    cutoff = datetime.utcnow() - grace_period
+    removed = 0
+
+    unreferenced = (StoredFile.ref_count <= 0, StoredFile.released_at < cutoff)
+    orphans = [key for (key,) in db.query(StoredFile.key).filter(*unreferenced)]
+    for key in orphans:
+        # Re-checked in the DELETE: an upload may have referenced the blob since the query
+        deleted = db.execute(
+            delete(StoredFile).where(StoredFile.key == key, *unreferenced).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        # An upload that deduplicated onto the blob but has not committed its reference yet
+        # only shows in the blob's mtime; its add_reference recreates the row
+        if deleted and not _touched_since(storage, key, cutoff):
+            _delete_with_variants(storage, key)
+            removed += 1
+
+    # Blobs written by uploads whose database transaction never committed
+    tracked = {key for (key,) in db.query(StoredFile.key)}
+    for folder in ("prescriptions", "delivery_proofs", "medicines"):
+        for key in list(storage.iter_keys(folder)):
+            if not is_content_key(key) or "_" in Path(key).stem:
+                continue
+            if key not in tracked and not _touched_since(storage, key, cutoff):
+                _delete_with_variants(storage, key)
+                removed += 1
+
+    # Abandoned partial uploads
+    incoming = Path(settings.UPLOAD_DIR) / ".incoming"
+    if incoming.exists():
+        for path in incoming.iterdir():
+            if datetime.utcfromtimestamp(path.stat().st_mtime) < cutoff:
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+    return removed
+
+def _touched_since(storage: StorageBackend, key: str, cutoff: datetime) -> bool:
+    try:
+        return storage.modified_at(key) >= cutoff
+    except FileNotFoundError:
+        return False
+
+def _delete_with_variants(storage: StorageBackend, key: str) -> None:
+    directory, stem = str(Path(key).parent), Path(key).stem
+    for candidate in list(storage.iter_keys(directory)):
+        if Path(candidate).stem == stem or Path(candidate).stem.startswith(f"{stem}_"):
+            storage.delete(candidate)
@@ -0,0 +1,58 @@
+from typing import Callable, Iterator
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+from app.database import SessionLocal
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 1000
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def _encode(chunk, ndjson: bool, started: bool, last: bool = False) -> bytes:
+    if ndjson:
+        return "".join(item + "\n" for item in chunk).encode()
+    body = ",".join(chunk)
+    if chunk and started:
+        body = "," + body
+    return (("" if started else "[") + body + ("]" if last else "")).encode()
+
+def iter_json(
+    build_query: Callable[[Session], Query],
+    serialize: Callable[[object], str],
+    ndjson: bool = False,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Encode query results as a JSON array (or NDJSON) one batch at a time.
+
+    Rows come off a server-side cursor via ``yield_per`` and the generator owns
+    its session, so memory stays bounded by the batch size and the request's
+    session is not held open (or closed underneath it) while the body streams.
+    """
+    db = SessionLocal()
+    try:
+        rows = build_query(db).yield_per(batch_size)
+        chunk = []
+        started = False
+        for row in rows:
+            chunk.append(serialize(row))
+            if len(chunk) >= batch_size:
+                yield _encode(chunk, ndjson, started)
+                started = True
+                chunk = []
+        yield _encode(chunk, ndjson, started, last=True)
+    finally:
+        db.close()
+
+def streaming_json_response(
+    request: Request,
+    build_query: Callable[[Session], Query],
+    serialize: Callable[[object], str],
+    batch_size: int = STREAM_BATCH_SIZE
+) -> StreamingResponse:
+    ndjson = wants_ndjson(request)
+    return StreamingResponse(
+        iter_json(build_query, serialize, ndjson, batch_size),
+        media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json"
+    )
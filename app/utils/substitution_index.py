@@ -0,0 +1,338 @@
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from threading import Lock, RLock
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.medicine import Medicine
+from app.utils.cache import get_cache_backend, on_invalidation, publish_invalidation
+from app.utils.medicine_matching import parse_medicine_text
+
+# Ranking weights: same salts dominate, then strength/form, availability and price
+COMPOSITION_WEIGHT, STRENGTH_WEIGHT, FORM_WEIGHT = 0.55, 0.15, 0.05
+AVAILABILITY_WEIGHT, PRICE_WEIGHT = 0.15, 0.10
+SCORE_SCALE = 10000  # scores are stored as uint16 fixed point so patched and rebuilt lists rank identically
+
+class SubstituteProfile(NamedTuple):
+    salts: FrozenSet[str]
+    strengths: FrozenSet[str]
+    form: Optional[str]
+    category: Optional[str]
+    price: float
+    in_stock: bool
+
+def build_profile(name: str, composition: Optional[str], category: Optional[str],
+                  price: float, stock: int, is_available: bool) -> SubstituteProfile:
+    """Features used for ranking substitutes; salts come from the composition only, never the brand."""
+    name_features = parse_medicine_text(name)
+    if composition:
+        features = parse_medicine_text(composition)
+        salts, strengths = features.tokens, features.strengths or name_features.strengths
+        form = features.form or name_features.form
+    else:
+        salts, strengths, form = frozenset(), name_features.strengths, name_features.form
+    return SubstituteProfile(salts, strengths, form, category, float(price or 0),
+                             bool(is_available) and (stock or 0) > 0)
+
+def substitute_score(medicine: SubstituteProfile, candidate: SubstituteProfile) -> float:
+    if medicine.salts:
+        composition = len(medicine.salts & candidate.salts) / len(medicine.salts | candidate.salts)
+    else:
+        composition = 0.0  # no composition on record: category fallback, ranked on the rest
+    if not medicine.strengths or not candidate.strengths:
+        strength = 0.5
+    elif medicine.strengths == candidate.strengths:
+        strength = 1.0
+    else:
+        strength = 0.5 if medicine.strengths & candidate.strengths else 0.0
+    if not medicine.form or not candidate.form:
+        form = 0.5
+    else:
+        form = 1.0 if medicine.form == candidate.form else 0.0
+    if candidate.price <= medicine.price or candidate.price <= 0:
+        price = 1.0
+    else:
+        price = medicine.price / candidate.price
+    return (COMPOSITION_WEIGHT * composition + STRENGTH_WEIGHT * strength + FORM_WEIGHT * form
+            + AVAILABILITY_WEIGHT * candidate.in_stock + PRICE_WEIGHT * price)
+
+class SubstitutionIndex:
+    """Top-k substitutes per medicine, kept as compact id/fixed-point score arrays.
+
+    Candidates are medicines sharing at least one salt; medicines without a
+    composition fall back to their category, limited to the ``fallback_window``
+    neighbours on either side by price so large categories stay bounded.
+
+    Each list keeps up to twice ``top_k`` entries. A write patches only the
+    changed medicine's entry in its peers' lists, so no peer is rescanned. A
+    list that is too short to be trusted is rescanned when it is next read.
+    """
+
+    def __init__(self, top_k: int = 10, fallback_window: int = 250):
+        self._lock = RLock()
+        self.top_k = top_k
+        self.capacity = 2 * top_k
+        self.fallback_window = fallback_window
+        self._profiles: Dict[int, SubstituteProfile] = {}
+        self._salt_postings: Dict[str, Set[int]] = defaultdict(set)
+        self._category_prices: Dict[Optional[str], List[Tuple[float, int]]] = defaultdict(list)
+        self._ids: Dict[int, array] = {}
+        self._scores: Dict[int, array] = {}
+        self._truncated: Set[int] = set()  # lists that had more candidates than they keep
+        self._stale: Set[int] = set()  # truncated lists left with fewer than top_k entries
+        self.built = False
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def build(self, rows: Iterable[Tuple]) -> None:
+        """Replace the index with (id, name, composition, category, price, stock, is_available) rows."""
+        with self._lock:
+            self._profiles.clear()
+            self._salt_postings.clear()
+            self._category_prices.clear()
+            self._ids.clear()
+            self._scores.clear()
+            self._truncated.clear()
+            self._stale.clear()
+            for medicine_id, *fields in rows:
+                self._add_profile(medicine_id, build_profile(*fields))
+            for prices in self._category_prices.values():
+                prices.sort()
+            for medicine_id in self._profiles:
+                self._recompute(medicine_id)
+            self.built = True
+
+    def alternatives(self, medicine_id: int, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Ranked (medicine_id, score) substitutes. O(k) unless the list has to be rescanned."""
+        with self._lock:
+            ids = self._ids.get(medicine_id)
+            if ids is None:
+                return []
+            if medicine_id in self._stale:
+                self._recompute(medicine_id)
+                ids = self._ids[medicine_id]
+            scores = self._scores[medicine_id]
+            count = min(self.top_k if limit is None else limit, self.top_k, len(ids))
+            return [(ids[i], scores[i] / SCORE_SCALE) for i in range(count)]
+
+    def upsert(self, medicine_id: int, name: str, composition: Optional[str], category: Optional[str],
+               price: float, stock: int, is_available: bool) -> None:
+        """Re-rank one changed medicine and patch its entry in the lists it can appear in."""
+        with self._lock:
+            old_peers = self._peers(medicine_id) if medicine_id in self._profiles else set()
+            self._remove_profile(medicine_id)
+            self._add_profile(medicine_id, build_profile(name, composition, category, price, stock, is_available),
+                              keep_sorted=True)
+            self._recompute(medicine_id)
+            new_peers = self._peers(medicine_id)
+            for peer in old_peers - new_peers:
+                self._patch(peer, medicine_id, None)
+            for peer in new_peers:
+                self._patch(peer, medicine_id, self._score(peer, medicine_id))
+
+    def remove(self, medicine_id: int) -> None:
+        with self._lock:
+            if medicine_id not in self._profiles:
+                return
+            peers = self._peers(medicine_id)
+            self._remove_profile(medicine_id)
+            self._ids.pop(medicine_id, None)
+            self._scores.pop(medicine_id, None)
+            self._truncated.discard(medicine_id)
+            self._stale.discard(medicine_id)
+            for peer in peers:
+                self._patch(peer, medicine_id, None)
+
+    def _add_profile(self, medicine_id, profile, keep_sorted=False):
+        self._profiles[medicine_id] = profile
+        for salt in profile.salts:
+            self._salt_postings[salt].add(medicine_id)
+        if keep_sorted:
+            insort(self._category_prices[profile.category], (profile.price, medicine_id))
+        else:
+            self._category_prices[profile.category].append((profile.price, medicine_id))
+
+    def _remove_profile(self, medicine_id):
+        profile = self._profiles.pop(medicine_id, None)
+        if profile is None:
+            return
+        for salt in profile.salts:
+            postings = self._salt_postings.get(salt)
+            if postings is not None:
+                postings.discard(medicine_id)
+                if not postings:
+                    del self._salt_postings[salt]
+        prices = self._category_prices.get(profile.category)
+        if prices is not None:
+            position = bisect_left(prices, (profile.price, medicine_id))
+            if position < len(prices) and prices[position] == (profile.price, medicine_id):
+                del prices[position]
+
+    def _category_window(self, medicine_id) -> List[int]:
+        profile = self._profiles[medicine_id]
+        prices = self._category_prices.get(profile.category, [])
+        position = bisect_left(prices, (profile.price, medicine_id))
+        start = max(position - self.fallback_window, 0)
+        return [peer for _, peer in prices[start:position + self.fallback_window + 1]]
+
+    def _candidates(self, medicine_id) -> Set[int]:
+        profile = self._profiles[medicine_id]
+        if profile.salts:
+            candidates = set().union(*(self._salt_postings[salt] for salt in profile.salts))
+        elif profile.category is not None:
+            candidates = set(self._category_window(medicine_id))
+        else:
+            candidates = set()
+        candidates.discard(medicine_id)
+        return candidates
+
+    def _peers(self, medicine_id) -> Set[int]:
+        """Medicines whose candidate set contains this one."""
+        profile = self._profiles[medicine_id]
+        peers = set().union(*(self._salt_postings[salt] for salt in profile.salts)) if profile.salts else set()
+        if profile.category is not None:
+            peers.update(peer for peer in self._category_window(medicine_id) if not self._profiles[peer].salts)
+        peers.discard(medicine_id)
+        return peers
+
+    def _score(self, medicine_id, candidate) -> int:
+        score = substitute_score(self._profiles[medicine_id], self._profiles[candidate])
+        return round(score * SCORE_SCALE)
+
+    def _recompute(self, medicine_id):
+        candidates = self._candidates(medicine_id)
+        ranked = heapq.nsmallest(
+            self.capacity,
+            ((-self._score(medicine_id, candidate), candidate) for candidate in candidates)
+        )
+        self._store(medicine_id, [(candidate, -neg_score) for neg_score, candidate in ranked])
+        if len(candidates) > self.capacity:
+            self._truncated.add(medicine_id)
+        else:
+            self._truncated.discard(medicine_id)
+        self._stale.discard(medicine_id)
+
+    def _store(self, medicine_id, ranked):
+        self._ids[medicine_id] = array("l", (candidate for candidate, _ in ranked))
+        self._scores[medicine_id] = array("H", (score for _, score in ranked))
+
+    def _patch(self, medicine_id, candidate, new_score: Optional[int]):
+        """Set ``candidate``'s score in one list, or take it out when ``new_score`` is None. O(capacity).
+
+        Medicines cut from a truncated list all score at or below its last
+        entry, so a candidate landing below that entry is dropped rather than
+        placed ahead of ones that were never kept.
+        """
+        if medicine_id not in self._ids:
+            return
+        ranked = [item for item in zip(self._ids[medicine_id], self._scores[medicine_id]) if item[0] != candidate]
+        truncated = medicine_id in self._truncated
+        if new_score is not None and (
+            not truncated or (ranked and (-new_score, candidate) < (-ranked[-1][1], ranked[-1][0]))
+        ):
+            ranked.append((candidate, new_score))
+            ranked.sort(key=lambda item: (-item[1], item[0]))
+            if len(ranked) > self.capacity:
+                ranked = ranked[:self.capacity]
+                self._truncated.add(medicine_id)
+        self._store(medicine_id, ranked)
+        if truncated and len(ranked) < self.top_k:
+            self._stale.add(medicine_id)
+
+substitution_index = SubstitutionIndex(top_k=settings.SUBSTITUTES_PER_MEDICINE)
+
+def _substitution_rows(db: Session, ids: Optional[Sequence[int]] = None):
+    query = db.query(
+        Medicine.id, Medicine.name, Medicine.composition, Medicine.category,
+        Medicine.price, Medicine.stock, Medicine.is_available
+    )
+    if ids is not None:
+        query = query.filter(Medicine.id.in_(ids))
+    return query.yield_per(5000)
+
+# Other workers announce the medicines they patched, as for the catalog index
+INDEX_NAMESPACE = "substitution_index"
+_remote_changes: set = set()
+_remote_changes_lock = Lock()
+
+def _on_remote_change(keys: Optional[List[str]]) -> None:
+    with _remote_changes_lock:
+        _remote_changes.update(["*"] if keys is None else keys)
+
+on_invalidation(INDEX_NAMESPACE, _on_remote_change)
+
+def get_substitution_index(db: Session) -> SubstitutionIndex:
+    """Return the substitution index, building it from the database on first use
+    and applying catalog writes other workers made since the last lookup."""
+    if not substitution_index.built:
+        get_cache_backend()  # subscribes to invalidations before the snapshot is read
+        with substitution_index._lock:
+            if not substitution_index.built:
+                substitution_index.build(_substitution_rows(db))
+        return substitution_index
+    with _remote_changes_lock:
+        changes = set(_remote_changes)
+        _remote_changes.clear()
+    if "*" in changes:
+        # Rebuilding takes a while; keep serving the current lists meanwhile
+        threading.Thread(target=rebuild_substitution_index, args=(False,), name="substitution-rebuild", daemon=True).start()
+    elif changes:
+        _patch_index(db, [int(medicine_id) for medicine_id in changes])
+    return substitution_index
+
+def refresh_substitution_index(db: Session, medicine_ids: Sequence[int]) -> None:
+    """Patch the index after a catalog write (deleted ids are dropped), here and in other workers."""
+    if not medicine_ids:
+        return
+    publish_invalidation(INDEX_NAMESPACE, [str(medicine_id) for medicine_id in medicine_ids])
+    with _rebuild_lock:
+        if _rebuild_dirty is not None:
+            _rebuild_dirty.update(medicine_ids)  # replayed once the running rebuild swaps in
+    if substitution_index.built:
+        _patch_index(db, list(medicine_ids))
+
+def _patch_index(db: Session, medicine_ids: List[int]) -> None:
+    seen = set()
+    for medicine_id, *fields in _substitution_rows(db, medicine_ids):
+        substitution_index.upsert(medicine_id, *fields)
+        seen.add(medicine_id)
+    for medicine_id in set(medicine_ids) - seen:
+        substitution_index.remove(medicine_id)
+
+_rebuild_lock = Lock()
+_rebuild_dirty: Optional[Set[int]] = None
+
+def rebuild_substitution_index(announce: bool = True) -> None:
+    """Background job: rebuild off to the side and swap, so lookups keep being served meanwhile.
+
+    ``announce`` has every other worker holding the index rebuild it too.
+    """
+    global _rebuild_dirty
+    if announce:
+        publish_invalidation(INDEX_NAMESPACE, ["*"])
+    if not substitution_index.built:
+        return  # built on first use
+    with _rebuild_lock:
+        if _rebuild_dirty is not None:
+            return  # a rebuild is already running
+        _rebuild_dirty = set()
+    db = SessionLocal()
+    try:
+        fresh = SubstitutionIndex(top_k=substitution_index.top_k, fallback_window=substitution_index.fallback_window)
+        fresh.build(_substitution_rows(db))
+        with substitution_index._lock:
+            substitution_index.__dict__.update(
+                {key: value for key, value in fresh.__dict__.items() if key != "_lock"}
+            )
+            with _rebuild_lock:
+                dirty, _rebuild_dirty = _rebuild_dirty, None
+            _patch_index(db, list(dirty))
+    finally:
+        with _rebuild_lock:
+            _rebuild_dirty = None
+        db.close()
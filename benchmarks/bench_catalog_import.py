@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the bulk catalog import/export pipeline on SQLite.
+
+Generates a synthetic CSV catalog (default 50k SKUs, ~0.5% invalid rows),
+imports it into a fresh database, imports it again (every row an upsert),
+then streams it back out. Compares with the one-row-per-commit path that
+add_medicine takes, measured on a sample.
+
+Usage: python benchmarks/bench_catalog_import.py [--rows 50000]
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def setup_environment(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    from app.config import settings
+    settings.DATABASE_URL = os.environ["DATABASE_URL"]
+
+def make_catalog_csv(rows: int, seed: int = 11) -> str:
+    from app.utils.catalog_import import EXPORT_FIELDS
+    rng = random.Random(seed)
+    salts = ["Paracetamol", "Amoxicillin", "Cetirizine", "Metformin", "Atorvastatin", "Pantoprazole", "Azithromycin"]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for i in range(rows):
+        salt = rng.choice(salts)
+        strength = rng.choice([5, 10, 250, 500, 650])
+        writer.writerow({
+            "sku": f"SKU{i:07d}",
+            "name": f"{salt[:4]}brand {i} {strength}",
+            "description": "",
+            "composition": f"{salt} {strength}mg",
+            "category": rng.choice(["pain", "antibiotic", "allergy", "diabetes", "cardiac"]),
+            "price": "n/a" if rng.random() < 0.005 else f"{rng.uniform(5, 500):.2f}",
+            "stock": rng.randint(0, 500),
+            "prescription_required": rng.choice(["true", "false"]),
+            "manufacturer": rng.choice(["Cipla", "Sun", "Lupin", "Mankind"]),
+            "image_url": "",
+            "is_available": "true",
+        })
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--sample", type=int, default=500, help="Rows for the per-row commit baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        from app.database import Base, SessionLocal, engine
+        from app.models.medicine import Medicine
+        from app.schemas.medicine import MedicineCreate
+        from app.utils.catalog_import import iter_records, import_catalog, export_catalog
+        Base.metadata.create_all(bind=engine, tables=[Medicine.__table__])
+
+        data = make_catalog_csv(args.rows)
+        db = SessionLocal()
+        try:
+            timings = {}
+            for label in ("initial import", "re-import (upserts)"):
+                start = time.perf_counter()
+                report = import_catalog(db, iter_records(io.StringIO(data), "csv"))
+                timings[label] = (time.perf_counter() - start, report)
+
+            start = time.perf_counter()
+            exported = sum(len(chunk) for chunk in export_catalog("csv"))
+            export_seconds = time.perf_counter() - start
+
+            # What add_medicine does today: one INSERT + COMMIT + refresh per row
+            sample = [r for _, r, _ in iter_records(io.StringIO(data), "csv")][:args.sample]
+            start = time.perf_counter()
+            for record in sample:
+                record = dict(record, sku=None)
+                try:
+                    medicine = Medicine(**MedicineCreate(**record).dict())
+                except Exception:
+                    continue
+                db.add(medicine)
+                db.commit()
+                db.refresh(medicine)
+            per_row_seconds = (time.perf_counter() - start) / len(sample)
+        finally:
+            db.close()
+
+    print(f"=== Catalog import, {args.rows:,} CSV rows (SQLite) ===")
+    for label, (seconds, report) in timings.items():
+        print(f"{label}: {seconds:.1f}s ({args.rows / seconds:,.0f} rows/s), "
+              f"{report['imported']:,} imported, {report['failed']} rejected")
+    print(f"export: {export_seconds:.1f}s, {exported / 1024 / 1024:.1f} MB")
+    print(f"per-row commits (sampled): {per_row_seconds * 1000:.2f} ms/row, "
+          f"~{per_row_seconds * args.rows:.0f}s for the full catalog")
+
+if __name__ == "__main__":
+    main()
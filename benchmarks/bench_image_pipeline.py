@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the image derivative pipeline.
+
+Generates synthetic photo-like images, pushes them through the same process pool
+used on upload and reports throughput and bytes saved per image.
+
+Usage: python benchmarks/bench_image_pipeline.py [--images 40] [--size 3000x4000]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.config import settings
+from app.utils import image_processing
+
+def make_photo(path: Path, width: int, height: int, seed: int) -> None:
+    """Write a noisy JPEG that compresses roughly like a phone photo of a prescription."""
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 40).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(60):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle([x, y, x + rng.randrange(50, 800), y + rng.randrange(10, 60)],
+                       fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    image.filter(ImageFilter.GaussianBlur(1)).save(path, "JPEG", quality=92)
+
+async def run(paths):
+    return await asyncio.gather(*(image_processing.generate_image_variants(p) for p in paths))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--size", default="3000x4000")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        settings.UPLOAD_DIR = upload_dir
+        settings.IMAGE_PROCESSING_WORKERS = args.workers
+        folder = Path(upload_dir) / "prescriptions"
+        folder.mkdir()
+
+        print(f"Generating {args.images} source images ({width}x{height})...")
+        paths = []
+        for i in range(args.images):
+            make_photo(folder / f"img{i}.jpg", width, height, seed=i)
+            paths.append(f"prescriptions/img{i}.jpg")
+
+        start = time.perf_counter()
+        results = asyncio.run(run(paths))
+        elapsed = time.perf_counter() - start
+        image_processing.shutdown_image_pipeline()
+
+        original_bytes = sum((Path(upload_dir) / p).stat().st_size for p in paths)
+        variant_bytes = {name: 0 for name in image_processing.IMAGE_VARIANTS}
+        for variants in results:
+            for name, path in variants.items():
+                variant_bytes[name] += (Path(upload_dir) / path).stat().st_size
+
+    print(f"=== Image pipeline ({args.workers} workers) ===")
+    print(f"Throughput: {args.images / elapsed:.2f} images/s ({elapsed:.2f}s total)")
+    print(f"Original: {original_bytes / args.images / 1024:.1f} KB/image")
+    for name, total in variant_bytes.items():
+        per_image = total / args.images
+        saved = (original_bytes / args.images) - per_image
+        print(f"{name:>7}: {per_image / 1024:.1f} KB/image, saves {saved / 1024:.1f} KB "
+              f"({100 * saved / (original_bytes / args.images):.1f}%) when served instead of the original")
+
+if __name__ == "__main__":
+    main()
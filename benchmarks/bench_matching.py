@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark for prescription line -> catalog matching.
+
+Builds a synthetic catalog (default 100k SKUs over ~1k salts) and matches
+prescription lines written the way prescribers write them: generic or brand
+names, abbreviated dosage forms, unit variations and occasional typos.
+
+Usage: python benchmarks/bench_matching.py [--skus 100000] [--lines 10000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.medicine_matching import CatalogIndex
+
+SYLLABLES = ["ab", "ac", "al", "am", "an", "ar", "az", "ce", "ci", "co", "da", "de", "di", "do", "fe",
+             "flu", "ga", "lo", "ma", "me", "mi", "mo", "na", "ne", "ni", "no", "pa", "pe", "pi", "pra",
+             "ra", "re", "ri", "ro", "sa", "se", "so", "ta", "te", "ti", "to", "tra", "va", "ve", "vi", "xa", "zo"]
+SUFFIXES = ["mol", "cillin", "mycin", "pril", "sartan", "olol", "azole", "statin", "dipine", "tidine", "floxacin", "zepam"]
+STRENGTHS = [5, 10, 20, 25, 40, 50, 100, 125, 200, 250, 400, 500, 650, 1000]
+FORMS = [("Tablet", "tab"), ("Capsule", "cap"), ("Syrup", "syp"), ("Injection", "inj"), ("Cream", "cream")]
+
+def make_word(rng, parts, suffix=""):
+    return "".join(rng.choice(SYLLABLES) for _ in range(parts)) + suffix
+
+def build_catalog(rng, skus, salts_count):
+    salts = list({make_word(rng, 2, rng.choice(SUFFIXES)).capitalize() for _ in range(salts_count * 2)})[:salts_count]
+    catalog = []
+    for medicine_id in range(1, skus + 1):
+        salt = rng.choice(salts)
+        strength = rng.choice(STRENGTHS)
+        form = rng.choice(FORMS)
+        brand = make_word(rng, rng.randint(2, 3)).capitalize()
+        catalog.append((medicine_id, f"{brand} {strength} {form[0]}", f"{salt} {strength}mg", True, salt, strength, form, brand))
+    return catalog
+
+def typo(rng, word):
+    if len(word) < 6:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+def make_lines(rng, catalog, count):
+    lines = []
+    for _ in range(count):
+        _, _, _, _, salt, strength, form, brand = rng.choice(catalog)
+        name = brand if rng.random() < 0.3 else salt
+        if rng.random() < 0.1:
+            name = typo(rng, name)
+        if strength >= 1000 and rng.random() < 0.5:
+            strength_text = f"{strength / 1000:g} g"
+        else:
+            strength_text = rng.choice([f"{strength}mg", f"{strength} mg", f"{strength}"])
+        form_text = rng.choice([form[0], form[1], f"{form[1]}.", ""])
+        lines.append((f"{form_text} {name.lower() if rng.random() < 0.5 else name} {strength_text}".strip(),
+                      salt, brand, strength))
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skus", type=int, default=100_000)
+    parser.add_argument("--salts", type=int, default=1_000)
+    parser.add_argument("--lines", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    catalog = build_catalog(rng, args.skus, args.salts)
+    lines = make_lines(rng, catalog, args.lines)
+    by_id = {row[0]: row for row in catalog}
+
+    index = CatalogIndex()
+    start = time.perf_counter()
+    index.build((row[0], row[1], row[2], row[3]) for row in catalog)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = index.match_many([line[0] for line in lines], limit=3)
+    match_seconds = time.perf_counter() - start
+
+    top1 = top3 = 0
+    for (_, salt, brand, strength), matches in zip(lines, results):
+        hits = [by_id[medicine_id] for medicine_id, _ in matches]
+        correct = [row[4] == salt and row[5] == strength for row in hits]
+        top1 += bool(correct[:1] and correct[0])
+        top3 += any(correct)
+
+    upserts = min(1000, args.skus)
+    start = time.perf_counter()
+    for medicine_id in range(1, upserts + 1):
+        row = by_id[medicine_id]
+        index.upsert(medicine_id, row[1] + " Forte", row[2], row[3])
+    upsert_ms = (time.perf_counter() - start) * 1000 / upserts
+
+    print(f"=== Matching {args.lines:,} lines against {args.skus:,} SKUs ===")
+    print(f"Index build: {build_seconds:.2f}s")
+    print(f"Matching: {match_seconds:.2f}s ({args.lines / match_seconds:,.0f} lines/s)")
+    print(f"Top-1 salt+strength accuracy: {100 * top1 / args.lines:.1f}%")
+    print(f"Top-3 salt+strength accuracy: {100 * top3 / args.lines:.1f}%")
+    print(f"Incremental upsert: {upsert_ms:.3f} ms/row")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Overhead of request instrumentation (MetricsMiddleware + SQLAlchemy hooks).
+
+Runs the same in-process requests against the app with instrumentation on
+and off, alternating rounds to cancel out drift, and reports the relative
+CPU cost per request for a trivial route and two DB-backed routes.
+
+Usage: python benchmarks/bench_metrics_overhead.py [--requests 500] [--rounds 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+ROUTES = ["/health", "/medicines/?stream=false", "/categories/"]
+
+def setup_environment(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    from app.config import settings
+    settings.DATABASE_URL = os.environ["DATABASE_URL"]
+    settings.UPLOAD_DIR = os.path.join(workdir, "uploads")
+
+def seed():
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import Category, Medicine
+    db = SessionLocal()
+    try:
+        db.execute(insert(Medicine.__table__), [{"name": f"Medicine {i}", "price": 10.0, "stock": 5} for i in range(100)])
+        db.execute(insert(Category.__table__), [{"name": f"Category {i}"} for i in range(20)])
+        db.commit()
+    finally:
+        db.close()
+
+def set_instrumentation(app, enabled: bool):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from starlette.middleware import Middleware
+    from app.utils import metrics
+    hooks = [("before_cursor_execute", metrics._before_cursor_execute),
+             ("after_cursor_execute", metrics._after_cursor_execute)]
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not metrics.MetricsMiddleware]
+    if enabled:
+        app.user_middleware.insert(0, Middleware(metrics.MetricsMiddleware))
+    for name, hook in hooks:
+        if enabled and not event.contains(Engine, name, hook):
+            event.listen(Engine, name, hook)
+        elif not enabled and event.contains(Engine, name, hook):
+            event.remove(Engine, name, hook)
+    app.middleware_stack = app.build_middleware_stack()
+
+def run_round(client, url: str, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(url)
+    return (time.process_time() - start) / requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        from fastapi.testclient import TestClient
+        from app.main import app
+        seed()
+        results = {route: {True: [], False: []} for route in ROUTES}
+        with TestClient(app) as client:
+            for route in ROUTES:
+                for enabled in (True, False):  # warm up both stacks
+                    set_instrumentation(app, enabled)
+                    run_round(client, route, 20)
+                for _ in range(args.rounds):
+                    for enabled in (False, True):
+                        set_instrumentation(app, enabled)
+                        results[route][enabled].append(run_round(client, route, args.requests))
+            set_instrumentation(app, True)
+
+    print(f"=== Instrumentation overhead ({args.rounds} rounds x {args.requests} requests, best round) ===")
+    for route, timings in results.items():
+        off, on = min(timings[False]), min(timings[True])
+        print(f"{route:28} off {off * 1e6:8.0f} us  on {on * 1e6:8.0f} us  overhead {100 * (on - off) / off:+5.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of RateLimitMiddleware.
+
+Three measurements:
+  * middleware off vs on for a route without a policy (the common case) and
+    for one with an IP and a user policy that never trips, through the
+    in-process app, alternating rounds to cancel out drift;
+  * the limiter alone with the in-process store (Redis down, or
+    CACHE_BACKEND=memory);
+  * the limiter alone against Redis, when --redis-url points at one.
+
+Usage: python benchmarks/bench_rate_limit_overhead.py [--requests 1000] [--rounds 5] [--redis-url redis://localhost:6379/15]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+UNLIMITED = 10 ** 9
+ROUTES = {
+    "no policy": "/health",
+    "ip + user policy": "/help/faqs",
+}
+
+def setup_environment(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:6399")  # nothing listens: in-process store
+    from app.config import settings
+    settings.DATABASE_URL = os.environ["DATABASE_URL"]
+    settings.UPLOAD_DIR = os.path.join(workdir, "uploads")
+
+def policies():
+    from app.utils.rate_limit import RateLimitPolicy
+    return [
+        RateLimitPolicy("GET", "/help/faqs", "ip", "sliding_window", UNLIMITED, 60),
+        RateLimitPolicy("GET", "/help/faqs", "user", "token_bucket", UNLIMITED, 60),
+    ]
+
+def set_rate_limiting(app, enabled: bool, limiter):
+    from starlette.middleware import Middleware
+    from app.utils.rate_limit import RateLimitMiddleware
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not RateLimitMiddleware]
+    if enabled:
+        app.user_middleware.insert(0, Middleware(RateLimitMiddleware, limiter=limiter))
+    app.middleware_stack = app.build_middleware_stack()
+
+def run_round(client, url: str, requests: int, headers) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(url, headers=headers)
+    return (time.process_time() - start) / requests
+
+def bench_limiter(limiter, requests: int) -> float:
+    """Wall time per check: Redis round trips are I/O, not CPU."""
+    checks = [(policy, f"rl:bench:{policy.name}:ip:127.0.0.1") for policy in limiter.policies]
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(requests):
+            await limiter.check(checks)
+        return (time.perf_counter() - start) / requests
+    return asyncio.run(run())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--redis-url", help="also time the shared store against this Redis (use a scratch database)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.utils.auth import create_access_token
+        from app.utils.rate_limit import RateLimiter, RedisRateStore
+        headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench@example.com'})}"}
+        limiter = RateLimiter(policies())
+        results = {label: {True: [], False: []} for label in ROUTES}
+        with TestClient(app) as client:
+            for label, route in ROUTES.items():
+                for enabled in (True, False):  # warm up both stacks
+                    set_rate_limiting(app, enabled, limiter)
+                    run_round(client, route, 50, headers)
+                for _ in range(args.rounds):
+                    for enabled in (False, True):
+                        set_rate_limiting(app, enabled, limiter)
+                        results[label][enabled].append(run_round(client, route, args.requests, headers))
+            set_rate_limiting(app, False, limiter)
+
+        print(f"=== Rate limiting overhead ({args.rounds} rounds x {args.requests} requests, CPU per request, best round) ===")
+        for label, timings in results.items():
+            off, on = min(timings[False]), min(timings[True])
+            print(f"{label:18} off {off * 1e6:7.0f} us  on {on * 1e6:7.0f} us  overhead {(on - off) * 1e6:+6.1f} us ({100 * (on - off) / off:+5.1f}%)")
+
+        print(f"\n=== Limiter alone, 2 policies per check ({args.requests} checks, wall time) ===")
+        print(f"{'in-process store':18} {bench_limiter(RateLimiter(policies()), args.requests) * 1e6:7.1f} us/check")
+        if args.redis_url:
+            import redis
+            client = redis.Redis.from_url(args.redis_url)
+            shared = RateLimiter(policies(), RedisRateStore(client))
+            bench_limiter(shared, 50)
+            print(f"{'redis':18} {bench_limiter(shared, args.requests) * 1e6:7.1f} us/check")
+            client.delete(*client.keys("rl:bench:*"))
+
+if __name__ == "__main__":
+    main()
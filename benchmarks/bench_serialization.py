@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: CPU per response for the hottest list endpoints.
+
+Compares, in-process through the ASGI stack (TestClient):
+  * the previous handlers: ORM objects -> response_model validation ->
+    jsonable_encoder -> stdlib json, with per-item medicine lookups for orders,
+  * the current handlers: column projections encoded with orjson.
+
+CPU is process time per request, so it excludes waiting on the database file.
+
+Usage: python benchmarks/bench_serialization.py [--medicines 2000] [--orders 200] [--requests 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def setup_environment(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    from app.config import settings
+    settings.DATABASE_URL = os.environ["DATABASE_URL"]
+    settings.UPLOAD_DIR = os.path.join(workdir, "uploads")
+
+def seed(medicines: int, orders: int, items_per_order: int = 4):
+    from sqlalchemy import insert
+    from app.database import SessionLocal
+    from app.models import Medicine, Order, OrderItem, User
+    from app.utils.auth import get_password_hash
+    rng = random.Random(3)
+    db = SessionLocal()
+    try:
+        db.execute(insert(Medicine.__table__), [
+            {"name": f"Medicine {i}", "description": "Film coated tablet, strip of 10", "composition": "Paracetamol 500mg",
+             "category": "pain", "price": round(rng.uniform(5, 500), 2), "stock": 100, "manufacturer": "Acme",
+             "is_available": True}
+            for i in range(medicines)
+        ])
+        user = User(email="bench@example.com", phone="+10000000000", first_name="B", last_name="U",
+                    hashed_password=get_password_hash("benchpass"), role="user", is_active=True)
+        db.add(user)
+        db.commit()
+        db.execute(insert(Order.__table__), [
+            {"user_id": user.id, "delivery_address": "221B Baker Street", "status": "pending", "total_amount": 100.0}
+            for _ in range(orders)
+        ])
+        order_ids = [order_id for (order_id,) in db.query(Order.id)]
+        db.execute(insert(OrderItem.__table__), [
+            {"order_id": order_id, "medicine_id": rng.randint(1, medicines), "quantity": 1, "price": 10.0}
+            for order_id in order_ids for _ in range(items_per_order)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+def baseline_app():
+    """The handlers as they were before projections and orjson."""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+    from app.database import get_db
+    from app.dependencies import get_current_active_user
+    from app.models import Medicine, Order, OrderItem
+    from app.schemas.medicine import MedicineResponse
+    from app.schemas.order import OrderItemResponse, OrderResponse
+
+    app = FastAPI()
+
+    @app.get("/medicines/", response_model=List[MedicineResponse])
+    def get_all_medicines(db: Session = Depends(get_db)):
+        return db.query(Medicine).all()
+
+    @app.get("/orders/", response_model=List[OrderResponse])
+    def get_user_orders(db: Session = Depends(get_db), current_user=Depends(get_current_active_user)):
+        responses = []
+        for order in db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all():
+            items = [OrderItemResponse(
+                id=oi.id, medicine_id=oi.medicine_id, quantity=oi.quantity, price=oi.price,
+                prescription_id=oi.prescription_id,
+                medicine_name=db.query(Medicine).filter(Medicine.id == oi.medicine_id).first().name,
+                medicine_image_url=db.query(Medicine).filter(Medicine.id == oi.medicine_id).first().image_url
+            ) for oi in db.query(OrderItem).filter(OrderItem.order_id == order.id).all()]
+            responses.append(OrderResponse(
+                id=order.id, user_id=order.user_id, delivery_address=order.delivery_address, status=order.status,
+                total_amount=order.total_amount, items=items, created_at=order.created_at, updated_at=order.updated_at
+            ))
+        return responses
+
+    return app
+
+def cpu_per_request(client, url, headers, requests: int):
+    client.get(url, headers=headers)  # warm up
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    size = 0
+    for _ in range(requests):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+        size = len(response.content)
+    return ((time.process_time() - cpu_start) / requests * 1000,
+            (time.perf_counter() - wall_start) / requests * 1000, size)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--medicines", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.utils.auth import create_access_token
+        seed(args.medicines, args.orders)
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@example.com'})}"}
+
+        results = {}
+        for name, target in (("before", baseline_app()), ("after", app)):
+            with TestClient(target) as client:
+                results[name] = {
+                    "GET /medicines/": cpu_per_request(client, "/medicines/", {}, args.requests),
+                    "GET /orders/": cpu_per_request(client, "/orders/", headers, max(args.requests // 5, 1)),
+                }
+
+    print(f"=== Serialization, {args.medicines:,} medicines, {args.orders:,} orders x 4 items ===")
+    for endpoint in results["before"]:
+        before, after = results["before"][endpoint], results["after"][endpoint]
+        print(f"{endpoint} ({before[2] / 1024:,.0f} KB)")
+        print(f"  before: {before[0]:8.2f} ms CPU, {before[1]:8.2f} ms wall")
+        print(f"  after:  {after[0]:8.2f} ms CPU, {after[1]:8.2f} ms wall  ({before[0] / after[0]:.1f}x less CPU)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batch stock sync vs. per-medicine stock updates on SQLite.
+
+Seeds a catalog, then applies a POS-style sync of N medicines (a mix of
+absolute levels and deltas, some selling out) through apply_stock_sync, and
+the same kind of change one medicine at a time the way PATCH /medicines/{id}/stock
+does it (lookup, commit, refresh), measured on a sample.
+
+Usage: python benchmarks/bench_stock_sync.py [--rows 10000] [--catalog 50000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def setup_environment(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    from app.config import settings
+    settings.DATABASE_URL = os.environ["DATABASE_URL"]
+
+def make_sync(rng, ids, rows):
+    items = []
+    for medicine_id in rng.sample(ids, rows):
+        if rng.random() < 0.5:
+            items.append(SimpleNamespace(id=medicine_id, stock=rng.choice([0, rng.randint(1, 500)]), delta=None))
+        else:
+            items.append(SimpleNamespace(id=medicine_id, stock=None, delta=rng.randint(-60, 40)))
+    return items
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--catalog", type=int, default=50_000)
+    parser.add_argument("--sample", type=int, default=500, help="Items for the per-medicine baseline")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(5)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        from sqlalchemy import insert
+        from app.database import Base, SessionLocal, engine
+        from app.models.medicine import Medicine
+        from app.utils.inventory import apply_stock_sync
+        Base.metadata.create_all(bind=engine, tables=[Medicine.__table__])
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(Medicine.__table__), [
+                {"name": f"Medicine {i}", "price": 10.0, "stock": rng.randint(0, 200), "is_available": True}
+                for i in range(args.catalog)
+            ])
+            db.commit()
+            ids = [medicine_id for (medicine_id,) in db.query(Medicine.id)]
+
+            batch_times = []
+            for _ in range(args.rounds):
+                items = make_sync(rng, ids, args.rows)
+                start = time.perf_counter()
+                result = apply_stock_sync(db, items)
+                batch_times.append(time.perf_counter() - start)
+
+            items = make_sync(rng, ids, args.sample)
+            start = time.perf_counter()
+            for item in items:
+                medicine = db.query(Medicine).filter(Medicine.id == item.id).first()
+                medicine.stock = item.stock if item.stock is not None else max((medicine.stock or 0) + item.delta, 0)
+                db.commit()
+                db.refresh(medicine)
+            per_item = (time.perf_counter() - start) / args.sample
+        finally:
+            db.close()
+
+    best = min(batch_times)
+    print(f"=== Stock sync, {args.rows:,} items against {args.catalog:,} medicines (SQLite) ===")
+    print(f"batch sync: best {best * 1000:.0f} ms over {args.rounds} rounds ({args.rows / best:,.0f} items/s), "
+          f"{result['out_of_stock']:,} out of stock after the last round")
+    print(f"per-medicine updates (sampled): {per_item * 1000:.2f} ms/item, "
+          f"~{per_item * args.rows:.1f}s for the same sync")
+
+if __name__ == "__main__":
+    main()
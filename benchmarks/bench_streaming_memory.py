@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Memory check for the streaming list responses.
+
+Seeds N medicines (default 200k) and serializes the whole catalog twice:
+  * the buffered path: query.all(), one response model per row, one JSON body,
+  * the streaming path: iter_json over a yield_per cursor, discarding each chunk
+    as a client socket would.
+
+Peak traced memory is measured with tracemalloc at N/4 and N rows. The
+streaming peak must stay flat (it is bounded by the batch size, not N); the
+script exits non-zero when it grows with the row count.
+
+Usage: python benchmarks/bench_streaming_memory.py [--rows 200000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def setup_environment(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    from app.config import settings
+    settings.DATABASE_URL = os.environ["DATABASE_URL"]
+
+def seed(rows: int):
+    from sqlalchemy import insert
+    from app.database import Base, SessionLocal, engine
+    from app.models.medicine import Medicine
+    Base.metadata.drop_all(bind=engine, tables=[Medicine.__table__])
+    Base.metadata.create_all(bind=engine, tables=[Medicine.__table__])
+    db = SessionLocal()
+    try:
+        for start in range(0, rows, 20000):
+            db.execute(insert(Medicine.__table__), [
+                {"name": f"Medicine {i}", "description": "Film coated tablet, strip of 10",
+                 "composition": "Paracetamol 500mg", "category": "pain", "price": 10.5, "stock": 100,
+                 "manufacturer": "Acme Pharma", "is_available": True}
+                for i in range(start, min(start + 20000, rows))
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+def buffered_body() -> int:
+    from fastapi.encoders import jsonable_encoder
+    from app.database import SessionLocal
+    from app.models.medicine import Medicine
+    from app.schemas.medicine import MedicineResponse
+    db = SessionLocal()
+    try:
+        models = [MedicineResponse.model_validate(m) for m in db.query(Medicine).all()]
+        return len(json.dumps(jsonable_encoder(models)).encode())
+    finally:
+        db.close()
+
+def streamed_body():
+    from app.models.medicine import Medicine
+    from app.utils.serialization import MEDICINE_COLUMNS, dump_medicine_row
+    from app.utils.streaming import iter_json
+    total = 0
+    first_chunk = None
+    start = time.perf_counter()
+    for chunk in iter_json(lambda s: s.query(*MEDICINE_COLUMNS).order_by(Medicine.id), dump_medicine_row):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        total += len(chunk)
+    return total, first_chunk
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--skip-buffered", action="store_true", help="Only measure the streaming path")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        import app.routers.medicines  # noqa: F401 -- keep one-off import cost out of the traced peaks
+        for rows in (args.rows // 4, args.rows):
+            seed(rows)
+            results[rows] = {"streaming": measure(streamed_body)}
+            if not args.skip_buffered:
+                results[rows]["buffered"] = measure(buffered_body)
+
+    print(f"=== Serializing the medicine catalog ===")
+    for rows, paths in results.items():
+        for name, (peak_mb, elapsed, result) in paths.items():
+            extra = f", first chunk after {result[1] * 1000:.0f} ms" if name == "streaming" else ""
+            print(f"{rows:>8,} rows {name:>9}: peak {peak_mb:7.1f} MB, {elapsed:5.1f}s{extra}")
+
+    small, large = (results[rows]["streaming"][0] for rows in results)
+    flat = large < small * 1.5 + 1
+    print(f"streaming peak {'flat' if flat else 'GROWS'} with row count ({small:.1f} MB -> {large:.1f} MB)")
+    sys.exit(0 if flat else 1)
+
+if __name__ == "__main__":
+    main()
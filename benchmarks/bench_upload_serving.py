@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upload serving router vs. the previous plain StaticFiles mount.
+
+Runs both in-process over httpx's ASGI transport and reports
+  * raw GET throughput for full files,
+  * requests and bytes for repeat views (a client that revalidates whenever the
+    response carries no explicit freshness, as CDNs and most mobile HTTP stacks do),
+  * bytes for resuming a download interrupted halfway.
+
+Usage: python benchmarks/bench_upload_serving.py [--files 50] [--views 5]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def setup_environment(workdir: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    from app.config import settings
+    settings.DATABASE_URL = os.environ["DATABASE_URL"]
+    settings.UPLOAD_DIR = os.path.join(workdir, "uploads")
+
+def write_files(upload_dir: str, count: int, size: int):
+    from app.utils.storage import content_key
+    keys = []
+    for i in range(count):
+        data = os.urandom(size)
+        sha256 = hashlib.sha256(data).hexdigest()
+        key = content_key("medicines", sha256, ".jpg")
+        path = Path(upload_dir) / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        keys.append(key)
+    return keys
+
+def response_bytes(response) -> int:
+    header_bytes = sum(len(k) + len(v) + 4 for k, v in response.headers.raw)
+    return header_bytes + len(response.content)
+
+async def throughput(client, urls, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(client.get(url) for url in urls))
+    return rounds * len(urls) / (time.perf_counter() - start)
+
+async def repeat_views(client, urls, views: int):
+    requests = 0
+    transferred = 0
+    for url in urls:
+        cached = None
+        for _ in range(views):
+            if cached is not None and "immutable" in cached.headers.get("cache-control", ""):
+                continue  # fresh in the client cache, no request at all
+            headers = {}
+            if cached is not None and "etag" in cached.headers:
+                headers["If-None-Match"] = cached.headers["etag"]
+            response = await client.get(url, headers=headers)
+            requests += 1
+            transferred += response_bytes(response)
+            if response.status_code == 200:
+                cached = response
+    return requests, transferred
+
+async def resume_download(client, urls, size: int) -> int:
+    transferred = 0
+    for url in urls:
+        response = await client.get(url, headers={"Range": f"bytes={size // 2}-"})
+        transferred += response_bytes(response)
+    return transferred
+
+async def run_benchmark(app, urls, args):
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await throughput(client, urls[:5], 1)  # warm up
+        rps = await throughput(client, urls, args.rounds)
+        requests, transferred = await repeat_views(client, urls, args.views)
+        resumed = await resume_download(client, urls, args.size)
+    return rps, requests, transferred, resumed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size", type=int, default=200 * 1024)
+    parser.add_argument("--views", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        from fastapi import FastAPI
+        from fastapi.staticfiles import StaticFiles
+        from app.config import settings
+        from app.main import app
+
+        keys = write_files(settings.UPLOAD_DIR, args.files, args.size)
+        urls = [f"/uploads/{key}" for key in keys]
+
+        baseline = FastAPI()
+        baseline.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+
+        results = {
+            "StaticFiles mount": asyncio.run(run_benchmark(baseline, urls, args)),
+            "uploads router": asyncio.run(run_benchmark(app, urls, args)),
+        }
+
+    print(f"=== Upload serving ({args.files} files x {args.size // 1024} KB, {args.views} views each) ===")
+    for name, (rps, requests, transferred, resumed) in results.items():
+        print(f"{name}:")
+        print(f"  full GET throughput: {rps:,.0f} req/s")
+        print(f"  repeat views: {requests} requests, {transferred / 1024:,.0f} KB transferred")
+        print(f"  resume at 50%: {resumed / 1024:,.0f} KB transferred")
+
+if __name__ == "__main__":
+    main()
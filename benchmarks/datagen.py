@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic data for scale testing, across every model in app/models.
+
+Rows are generated in batches with explicit primary keys and written with
+the fastest path the database offers: COPY on PostgreSQL, raw executemany
+inside one transaction on SQLite. The same --seed and --end always produce
+the same rows.
+
+Shape of the data:
+  * users, pharmacies and delivery partners cluster around neighbourhoods of
+    a few weighted cities; partners stay close to pharmacies,
+  * medicines share a realistic salt vocabulary and a Zipf-like popularity,
+    which drives which medicines show up in order items,
+  * order volume grows over the period, with weekly and time-of-day peaks;
+    ids increase with created_at, and the status depends on the order's age
+    (old orders delivered or cancelled, the last hours still in flight),
+  * prescriptions (with stored images and medicine lines), open carts,
+    delivery tracking and proofs, and emergency requests hang off those.
+
+Usage:
+  python benchmarks/datagen.py --database-url sqlite:///./scale.db --profile medium
+  python benchmarks/datagen.py --database-url postgresql://... --profile large   # ~10M order items
+  python benchmarks/datagen.py --profile small --orders 20000 --items-per-order 4
+
+Every seeded user can log in as user<N>@example.com with the password
+"datagen-password"; the target tables must be empty.
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+USER_PASSWORD = "datagen-password"
+# bcrypt of USER_PASSWORD with a fixed salt, so the users table is deterministic too
+USER_PASSWORD_HASH = "$2b$12$i664cj2eOe713J9WRftj3Os0l7GFNBQDyieVcmk/QmoQViOVbkVUC"
+BATCH_SIZE = 50_000
+
+@dataclass
+class Volumes:
+    users: int
+    medicines: int
+    pharmacies: int
+    partners: int
+    orders: int
+    items_per_order: float = 2.5
+    days: int = 365
+    prescription_rate: float = 0.3  # share of users with prescriptions on file
+    cart_rate: float = 0.05  # share of users with an open cart
+    emergency_rate: float = 0.002  # emergency requests per order
+
+PROFILES = {
+    "small": Volumes(users=2_000, medicines=10_000, pharmacies=60, partners=150, orders=10_000),
+    "medium": Volumes(users=100_000, medicines=100_000, pharmacies=600, partners=2_500, orders=400_000),
+    "large": Volumes(users=1_000_000, medicines=200_000, pharmacies=5_000, partners=20_000, orders=4_000_000),
+}
+
+# --- vocabularies -----------------------------------------------------------------------------
+
+SALTS = [
+    ("Paracetamol", ["250mg", "500mg", "650mg"]), ("Ibuprofen", ["200mg", "400mg"]),
+    ("Amoxicillin", ["250mg", "500mg"]), ("Azithromycin", ["250mg", "500mg"]),
+    ("Cetirizine", ["5mg", "10mg"]), ("Metformin", ["500mg", "850mg", "1000mg"]),
+    ("Atorvastatin", ["10mg", "20mg", "40mg"]), ("Amlodipine", ["2.5mg", "5mg", "10mg"]),
+    ("Omeprazole", ["20mg", "40mg"]), ("Pantoprazole", ["20mg", "40mg"]),
+    ("Losartan", ["25mg", "50mg"]), ("Montelukast", ["4mg", "10mg"]),
+    ("Levocetirizine", ["5mg"]), ("Diclofenac", ["50mg", "75mg"]), ("Ciprofloxacin", ["250mg", "500mg"]),
+    ("Vitamin D3", ["1000IU", "60000IU"]), ("Dolo", ["650mg"]), ("Ranitidine", ["150mg"]),
+]
+# Synthetic molecules for the long tail, so salt groups stay realistically small
+STEMS = ["ab", "bre", "cal", "dex", "eto", "flu", "gal", "hy", "ite", "ke", "lor", "mi", "nor", "ox", "pra", "que",
+         "ri", "so", "tel", "ul", "val", "xy", "zo"]
+SUFFIXES = ["amine", "azole", "cillin", "dipine", "floxacin", "mab", "olol", "pril", "sartan", "statin", "tidine",
+            "vir", "zepam", "tropin"]
+BRANDS = ["Cipla", "Sun", "Lupin", "Zydus", "Mankind", "Alkem", "Torrent", "Intas", "Glenmark", "Abbott"]
+FORMS = ["Tablet", "Capsule", "Syrup", "Suspension", "Injection", "Cream", "Drops"]
+CATEGORIES = ["pain", "antibiotic", "allergy", "diabetes", "cardiac", "gastro", "respiratory", "supplements",
+              "dermatology", "ophthalmic"]
+# name, latitude, longitude, share of the population
+CITIES = [("Bengaluru", 12.9716, 77.5946, 0.24), ("Mumbai", 19.0760, 72.8777, 0.22),
+          ("Delhi", 28.6139, 77.2090, 0.22), ("Hyderabad", 17.3850, 78.4867, 0.12),
+          ("Chennai", 13.0827, 80.2707, 0.10), ("Pune", 18.5204, 73.8567, 0.10)]
+NEIGHBOURHOODS_PER_CITY = 25
+# Relative order volume per local hour of the day and per weekday (Mon..Sun); all cities are on IST
+LOCAL_OFFSET = 5.5 * 3600
+HOURLY_WEIGHTS = [1, 0.6, 0.4, 0.3, 0.3, 0.5, 1.2, 2.5, 3.5, 4.2, 4.6, 4.4, 4.0, 3.6, 3.4, 3.5, 3.8, 4.4, 5.2, 5.8,
+                  5.4, 4.2, 2.8, 1.8]
+WEEKDAY_WEIGHTS = [1.0, 0.95, 0.95, 1.0, 1.05, 1.25, 1.3]
+ANNUAL_GROWTH = 2.0  # the last day of the period sees this many times the first day's orders
+
+def user_email(index: int) -> str:
+    return f"user{index}@example.com"
+
+def molecule(rng: random.Random) -> Tuple[str, str]:
+    """A (salt, strength) pair: common molecules a tenth of the time, else one of ~7k synthetic ones."""
+    if rng.random() < 0.1:
+        salt, strengths = rng.choice(SALTS)
+        return salt, rng.choice(strengths)
+    salt = (rng.choice(STEMS) + rng.choice(STEMS) + rng.choice(SUFFIXES)).capitalize()
+    return salt, f"{rng.choice([5, 10, 20, 25, 50, 100, 250, 500])}mg"
+
+def _timestamp(epoch: float) -> str:
+    # The text format SQLAlchemy stores on SQLite; PostgreSQL parses it too
+    whole = int(epoch)
+    return f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(whole))}.{int((epoch - whole) * 1e6):06d}"
+
+# --- writers ----------------------------------------------------------------------------------
+
+class SQLiteWriter:
+    """executemany on the raw connection, one transaction, journaling relaxed for the load."""
+
+    def __init__(self, engine):
+        self.connection = engine.raw_connection()
+        self.cursor = self.connection.cursor()
+        for pragma in ("journal_mode=MEMORY", "synchronous=OFF", "cache_size=-262144", "temp_store=MEMORY"):
+            self.cursor.execute(f"PRAGMA {pragma}")
+
+    def write(self, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        if rows:
+            placeholders = ",".join("?" * len(columns))
+            self.cursor.executemany(f"INSERT INTO {table} ({','.join(columns)}) VALUES ({placeholders})", rows)
+
+    def finish(self, tables: Sequence[str]) -> None:
+        self.connection.commit()
+        self.cursor.execute("ANALYZE")
+        self.connection.close()
+
+class PostgresWriter:
+    """COPY ... FROM STDIN in CSV, then move each id sequence past the explicit ids."""
+
+    def __init__(self, engine):
+        self.connection = engine.raw_connection()
+        self.cursor = self.connection.cursor()
+
+    def write(self, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+        if not rows:
+            return
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        self.cursor.copy_expert(f"COPY {table} ({','.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def finish(self, tables: Sequence[str]) -> None:
+        for table in tables:
+            self.cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+            )
+        self.cursor.execute("ANALYZE")
+        self.connection.commit()
+        self.connection.close()
+
+def make_writer(engine):
+    if engine.dialect.name == "sqlite":
+        return SQLiteWriter(engine)
+    if engine.dialect.name == "postgresql":
+        return PostgresWriter(engine)
+    raise SystemExit(f"Unsupported database for bulk generation: {engine.dialect.name}")
+
+# --- generator --------------------------------------------------------------------------------
+
+COLUMNS = {
+    "categories": ("id", "name", "description", "created_at", "updated_at"),
+    "medicines": ("id", "sku", "name", "description", "composition", "category", "price", "stock",
+                  "prescription_required", "manufacturer", "is_available", "created_at", "updated_at"),
+    "users": ("id", "email", "phone", "hashed_password", "first_name", "last_name", "address_line1", "city",
+              "state", "postal_code", "latitude", "longitude", "is_phone_verified", "is_email_verified",
+              "is_active", "role", "created_at", "updated_at"),
+    "pharmacies": ("id", "name", "address", "latitude", "longitude", "is_active", "created_at", "updated_at"),
+    "stored_files": ("id", "key", "sha256", "size", "ref_count", "created_at"),
+    "prescriptions": ("id", "user_id", "image_url", "description", "is_verified", "verified_by", "verified_at",
+                      "status", "notes", "priority", "created_at", "updated_at"),
+    "prescription_medicines": ("id", "prescription_id", "medicine_name", "dosage", "frequency", "duration",
+                               "quantity", "created_at"),
+    "orders": ("id", "user_id", "delivery_address", "status", "total_amount", "created_at", "updated_at"),
+    "order_items": ("id", "order_id", "medicine_id", "quantity", "price", "prescription_id", "created_at"),
+    "delivery_tracking": ("id", "order_id", "current_status", "current_latitude", "current_longitude",
+                          "last_updated"),
+    "delivery_proofs": ("id", "order_id", "image_url", "signature", "delivered_at"),
+    "delivery_partners": ("id", "name", "phone", "latitude", "longitude", "is_available", "current_order_id",
+                          "status", "last_active"),
+    "carts": ("id", "user_id", "created_at", "updated_at"),
+    "cart_items": ("id", "cart_id", "medicine_id", "quantity", "prescription_required", "prescription_id",
+                   "created_at", "updated_at"),
+    "emergency_delivery_requests": ("id", "user_id", "medicine_id", "urgency", "status", "delivery_partner_id",
+                                    "pharmacy_id", "delivery_address", "dynamic_price", "created_at", "updated_at"),
+}
+
+class DataGenerator:
+    def __init__(self, writer, volumes: Volumes, seed: int, end: datetime, batch_size: int = BATCH_SIZE):
+        self.writer = writer
+        self.volumes = volumes
+        self.seed = seed
+        self.end = end.timestamp()
+        self.start = self.end - volumes.days * 86400
+        self.batch_size = batch_size
+        self.counts: Dict[str, int] = {}
+        rng = self.rng("geography")
+        self.neighbourhoods = [
+            [(lat + rng.gauss(0, 0.06), lng + rng.gauss(0, 0.06)) for _ in range(NEIGHBOURHOODS_PER_CITY)]
+            for _, lat, lng, _ in CITIES
+        ]
+        self.city_weights = list(accumulate(share for *_, share in CITIES))
+
+    def rng(self, stream: str) -> random.Random:
+        # One independent stream per table: changing one volume leaves the other tables' rows alone
+        return random.Random(f"{self.seed}:{stream}")
+
+    def emit(self, table: str, rows: List[tuple]) -> None:
+        self.writer.write(table, COLUMNS[table], rows)
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+        rows.clear()
+
+    def place(self, rng: random.Random, spread: float) -> Tuple[int, float, float]:
+        city = min(bisect_right(self.city_weights, rng.random() * self.city_weights[-1]), len(CITIES) - 1)
+        lat, lng = rng.choice(self.neighbourhoods[city])
+        return city, round(lat + rng.gauss(0, spread), 6), round(lng + rng.gauss(0, spread), 6)
+
+    def run(self) -> Dict[str, int]:
+        self.categories()
+        self.medicines()
+        self.users()
+        self.pharmacies()
+        self.prescriptions()
+        self.orders()
+        self.partners()
+        self.carts()
+        self.emergency_requests()
+        self.writer.finish(list(COLUMNS))
+        return self.counts
+
+    def categories(self):
+        created = _timestamp(self.start)
+        self.emit("categories", [(i + 1, name, f"{name.title()} medicines", created, created)
+                                 for i, name in enumerate(CATEGORIES)])
+
+    def medicines(self):
+        rng = self.rng("medicines")
+        rows, prices, rx = [], array("d"), bytearray()
+        for i in range(self.volumes.medicines):
+            salt, strength = molecule(rng)
+            composition = f"{salt} {strength}"
+            if rng.random() < 0.08:
+                second, second_strength = molecule(rng)
+                composition += f" + {second} {second_strength}"
+            price = round(math.exp(rng.gauss(4.2, 1.0)), 2)  # log-normal: most under 200, a long tail
+            prescription_required = rng.random() < 0.25
+            stock = 0 if rng.random() < 0.03 else rng.randint(5, 2000)
+            created = _timestamp(self.start - rng.uniform(0, 3 * 365 * 86400))
+            rows.append((
+                i + 1, f"SKU{i:08d}", f"{rng.choice(BRANDS)} {salt} {strength} {rng.choice(FORMS)}",
+                f"Strip of {rng.choice([10, 15, 30])}", composition, rng.choice(CATEGORIES), price,
+                stock, prescription_required, f"{rng.choice(BRANDS)} Pharmaceuticals", stock > 0, created, created,
+            ))
+            prices.append(price)
+            rx.append(prescription_required)
+            if len(rows) >= self.batch_size:
+                self.emit("medicines", rows)
+        self.emit("medicines", rows)
+        self.medicine_prices, self.medicine_rx = prices, rx
+        # Zipf-like popularity over a shuffled ranking: a few hundred SKUs carry half the orders
+        ranking = list(range(1, self.volumes.medicines + 1))
+        rng.shuffle(ranking)
+        self.popular_medicines = ranking
+        self.popularity = list(accumulate(1 / (rank + 1) ** 1.05 for rank in range(len(ranking))))
+
+    def pick_medicines(self, rng: random.Random, count: int) -> List[int]:
+        return rng.choices(self.popular_medicines, cum_weights=self.popularity, k=count)
+
+    def users(self):
+        rng = self.rng("users")
+        self.user_city = bytearray(self.volumes.users)
+        self.user_location = array("d")
+        rows = []
+        staff = [("pharmacist", f"pharmacist{i}@example.com") for i in range(max(self.volumes.users // 5000, 1))]
+        staff.append(("admin", "admin@example.com"))
+        for i in range(self.volumes.users + len(staff)):
+            city, lat, lng = self.place(rng, 0.015)
+            role, email = ("user", user_email(i)) if i < self.volumes.users else staff[i - self.volumes.users]
+            if i < self.volumes.users:
+                self.user_city[i] = city
+                self.user_location.extend((lat, lng))
+            # Most of the user base signed up early in the period
+            created = _timestamp(self.start - 30 * 86400 + (self.end - self.start) * rng.random() ** 1.5)
+            rows.append((
+                i + 1, email, f"+91{7000000000 + i}", USER_PASSWORD_HASH, rng.choice(["Asha", "Ravi", "Meera", "Arjun", "Priya", "Kiran"]),
+                f"User{i}", self.address(i, city), CITIES[city][0], "", f"{560000 + i % 1000:06d}", lat, lng,
+                rng.random() < 0.8, rng.random() < 0.5, rng.random() > 0.01, role, created, created,
+            ))
+            if len(rows) >= self.batch_size:
+                self.emit("users", rows)
+        self.emit("users", rows)
+        self.pharmacist_ids = [self.volumes.users + i + 1 for i in range(len(staff) - 1)]
+
+    @staticmethod
+    def address(user_index: int, city: int) -> str:
+        return f"{user_index % 400 + 1}, {user_index % 53 + 1}th Cross, Sector {user_index % 40 + 1}, {CITIES[city][0]}"
+
+    def pharmacies(self):
+        rng = self.rng("pharmacies")
+        self.pharmacy_locations = []
+        rows = []
+        for i in range(self.volumes.pharmacies):
+            city, lat, lng = self.place(rng, 0.01)
+            self.pharmacy_locations.append((lat, lng))
+            created = _timestamp(self.start - rng.uniform(0, 365 * 86400))
+            rows.append((i + 1, f"{rng.choice(BRANDS)} Pharmacy {i}", f"Shop {i % 90 + 1}, Main Road, {CITIES[city][0]}",
+                         lat, lng, rng.random() > 0.05, created, created))
+        self.emit("pharmacies", rows)
+
+    def prescriptions(self):
+        rng = self.rng("prescriptions")
+        files, prescriptions, lines = [], [], []
+        prescription_id = line_id = 0
+        self.user_prescriptions: Dict[int, int] = {}
+        for user_index in range(self.volumes.users):
+            if rng.random() >= self.volumes.prescription_rate:
+                continue
+            for _ in range(1 + int(rng.expovariate(1.5))):
+                prescription_id += 1
+                created = self.start + (self.end - self.start) * rng.random()
+                sha256 = hashlib.sha256(f"{self.seed}:rx:{prescription_id}".encode()).hexdigest()
+                key = f"prescriptions/{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg"
+                files.append((prescription_id, key, sha256, rng.randint(80_000, 900_000), 1, _timestamp(created)))
+                age = self.end - created
+                status = "pending" if age < 3600 else rng.choices(["verified", "rejected"], [0.9, 0.1])[0]
+                verified_at = _timestamp(created + rng.uniform(300, 3600)) if status != "pending" else None
+                prescriptions.append((
+                    prescription_id, user_index + 1, f"/uploads/{key}", None, status == "verified",
+                    rng.choice(self.pharmacist_ids) if verified_at else None, verified_at, status,
+                    "Illegible dosage" if status == "rejected" else None, 0, _timestamp(created),
+                    verified_at or _timestamp(created),
+                ))
+                self.user_prescriptions[user_index + 1] = prescription_id
+                for _ in range(rng.randint(1, 4)):
+                    line_id += 1
+                    salt, strength = molecule(rng)
+                    lines.append((line_id, prescription_id, f"{salt} {strength}", strength,
+                                  rng.choice(["1-0-1", "1-1-1", "0-0-1", "SOS"]), f"{rng.choice([3, 5, 7, 14, 30])} days",
+                                  rng.randint(1, 3), _timestamp(created)))
+            if len(lines) >= self.batch_size:
+                self.emit("stored_files", files)
+                self.emit("prescriptions", prescriptions)
+                self.emit("prescription_medicines", lines)
+        self.emit("stored_files", files)
+        self.emit("prescriptions", prescriptions)
+        self.emit("prescription_medicines", lines)
+
+    def order_times(self, rng: random.Random):
+        """Per-day order counts with growth and weekly seasonality; hours follow the daily curve."""
+        # Days run midnight to midnight local time; the first and last ones are cut by the period
+        first_midnight = (self.start + LOCAL_OFFSET) // 86400 * 86400 - LOCAL_OFFSET
+        days = math.ceil((self.end - first_midnight) / 86400)
+        hours = list(accumulate(HOURLY_WEIGHTS))
+        windows, weights = [], []
+        for day in range(days):
+            day_start = first_midnight + day * 86400
+            low, high = max(self.start, day_start) - day_start, min(self.end, day_start + 86400) - day_start
+            covered = sum(HOURLY_WEIGHTS[hour] * max(0.0, min(high, 3600 * (hour + 1)) - max(low, 3600 * hour)) / 3600
+                          for hour in range(24)) / hours[-1]
+            weekday = datetime.fromtimestamp(day_start + LOCAL_OFFSET, timezone.utc).weekday()
+            windows.append((day_start, low, high))
+            weights.append(ANNUAL_GROWTH ** (day / max(days - 1, 1)) * WEEKDAY_WEIGHTS[weekday] * covered)
+        scale = self.volumes.orders / sum(weights)
+        counts = [int(weight * scale) for weight in weights]
+        for day in sorted(range(days), key=lambda d: weights[d] * scale - counts[d], reverse=True)[:self.volumes.orders - sum(counts)]:
+            counts[day] += 1  # largest remainders, so the total is exact
+        for (day_start, low, high), count in zip(windows, counts):
+            offsets = []
+            for _ in range(count):
+                offset = (bisect_right(hours, rng.random() * hours[-1]) + rng.random()) * 3600
+                while not low <= offset < high:  # only on the two partial days
+                    offset = (bisect_right(hours, rng.random() * hours[-1]) + rng.random()) * 3600
+                offsets.append(offset)
+            for offset in sorted(offsets):
+                yield day_start + offset
+
+    def order_status(self, rng: random.Random, age: float) -> Tuple[str, float]:
+        """Status for an order of this age (seconds), and how long after creation it last changed."""
+        if age < 1800:
+            return rng.choice(["pending", "confirmed"]), rng.uniform(0, age)
+        if age < 7200:
+            status = rng.choices(["confirmed", "dispatched", "delivered"], [0.2, 0.6, 0.2])[0]
+            return status, rng.uniform(600, age)
+        if rng.random() < 0.07:
+            return "cancelled", rng.uniform(60, 1800)
+        return "delivered", rng.uniform(1200, 5400)
+
+    def orders(self):
+        rng = self.rng("orders")
+        volumes = self.volumes
+        orders, items, tracking, proofs = [], [], [], []
+        order_id = item_id = proof_id = 0
+        geometric = math.log(1 - 1 / max(volumes.items_per_order, 1.0001))
+        self.in_flight_orders: List[int] = []
+        for created in self.order_times(rng):
+            order_id += 1
+            user_index = int(volumes.users * rng.random() ** 2)  # a core of repeat customers
+            status, changed_after = self.order_status(rng, self.end - created)
+            created_at, updated_at = _timestamp(created), _timestamp(created + changed_after)
+            count = min(1 + int(math.log(1 - rng.random()) / geometric), 15)
+            total = 0.0
+            prescription_id = self.user_prescriptions.get(user_index + 1)
+            for medicine_id in self.pick_medicines(rng, count):
+                item_id += 1
+                quantity = 1 if rng.random() < 0.7 else rng.randint(2, 4)
+                price = self.medicine_prices[medicine_id - 1]
+                total += price * quantity
+                items.append((item_id, order_id, medicine_id, quantity, price,
+                              prescription_id if self.medicine_rx[medicine_id - 1] else None, created_at))
+            orders.append((order_id, user_index + 1, self.address(user_index, self.user_city[user_index]), status,
+                           round(total, 2), created_at, updated_at))
+            if status == "dispatched":
+                self.in_flight_orders.append(order_id)
+                lat, lng = self.user_location[2 * user_index], self.user_location[2 * user_index + 1]
+                tracking.append((order_id, order_id, status, lat + rng.gauss(0, 0.01), lng + rng.gauss(0, 0.01), updated_at))
+            else:
+                tracking.append((order_id, order_id, status, None, None, updated_at))
+            if status == "delivered" and rng.random() < 0.9:
+                proof_id += 1
+                proofs.append((proof_id, order_id, None, f"Received by {rng.choice(['customer', 'family', 'security'])}",
+                               updated_at))
+            if len(items) >= self.batch_size:
+                self.flush_orders(orders, items, tracking, proofs)
+        self.flush_orders(orders, items, tracking, proofs)
+        self.order_count = order_id
+
+    def flush_orders(self, orders, items, tracking, proofs):
+        # Parents first: COPY checks foreign keys row by row
+        self.emit("orders", orders)
+        self.emit("order_items", items)
+        self.emit("delivery_tracking", tracking)
+        self.emit("delivery_proofs", proofs)
+
+    def partners(self):
+        rng = self.rng("partners")
+        in_flight = list(self.in_flight_orders)
+        rng.shuffle(in_flight)
+        rows = []
+        for i in range(self.volumes.partners):
+            lat, lng = rng.choice(self.pharmacy_locations) if self.pharmacy_locations else self.place(rng, 0.02)[1:]
+            current_order = in_flight.pop() if in_flight and rng.random() < 0.5 else None
+            status = "on_delivery" if current_order else rng.choices(["available", "offline"], [0.6, 0.4])[0]
+            rows.append((i + 1, f"Partner {i}", f"+91{8000000000 + i}", round(lat + rng.gauss(0, 0.01), 6),
+                         round(lng + rng.gauss(0, 0.01), 6), status == "available", current_order, status,
+                         _timestamp(self.end - rng.uniform(0, 6 * 3600))))
+        self.emit("delivery_partners", rows)
+
+    def carts(self):
+        rng = self.rng("carts")
+        carts, items = [], []
+        cart_id = item_id = 0
+        for user_index in range(self.volumes.users):
+            if rng.random() >= self.volumes.cart_rate:
+                continue
+            cart_id += 1
+            created = _timestamp(self.end - rng.uniform(0, 7 * 86400))
+            carts.append((cart_id, user_index + 1, created, created))
+            for medicine_id in set(self.pick_medicines(rng, rng.randint(1, 5))):
+                item_id += 1
+                rx = bool(self.medicine_rx[medicine_id - 1])
+                items.append((item_id, cart_id, medicine_id, rng.randint(1, 3), rx,
+                              self.user_prescriptions.get(user_index + 1) if rx else None, created, created))
+            if len(items) >= self.batch_size:
+                self.emit("carts", carts)
+                self.emit("cart_items", items)
+        self.emit("carts", carts)
+        self.emit("cart_items", items)
+
+    def emergency_requests(self):
+        rng = self.rng("emergency")
+        rows = []
+        for i in range(int(self.order_count * self.volumes.emergency_rate)):
+            user_index = rng.randrange(self.volumes.users)
+            medicine_id = self.pick_medicines(rng, 1)[0]
+            created = self.start + (self.end - self.start) * rng.random()
+            urgency = rng.choices(["high", "critical"], [0.8, 0.2])[0]
+            status = "completed" if self.end - created > 7200 else rng.choice(["pending", "assigned"])
+            assigned = status != "pending" and self.volumes.partners and self.volumes.pharmacies
+            rows.append((
+                i + 1, user_index + 1, medicine_id, urgency, status,
+                rng.randint(1, self.volumes.partners) if assigned else None,
+                rng.randint(1, self.volumes.pharmacies) if assigned else None,
+                self.address(user_index, self.user_city[user_index]),
+                round(self.medicine_prices[medicine_id - 1] * (1.5 if urgency == "critical" else 1.2), 2),
+                _timestamp(created), _timestamp(created + rng.uniform(300, 3600)),
+            ))
+        self.emit("emergency_delivery_requests", rows)
+
+def generate(database_url: str, volumes: Volumes, seed: int = 42, end: datetime = None,
+             batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Create the schema if needed and fill it. Returns rows written per table."""
+    os.environ["DATABASE_URL"] = database_url
+    from app.config import settings
+    settings.DATABASE_URL = database_url
+    from sqlalchemy import func, select
+    from app.database import Base, engine
+    import app.models  # noqa: F401  registers every table on Base.metadata
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        for table in COLUMNS:
+            if connection.execute(select(func.count()).select_from(Base.metadata.tables[table])).scalar():
+                raise SystemExit(f"Table {table} is not empty; generate into a fresh database")
+    end = end or datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    generator = DataGenerator(make_writer(engine), volumes, seed, end, batch_size)
+    return generator.run()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./datagen.db")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    for field in ("users", "medicines", "pharmacies", "partners", "orders", "days"):
+        parser.add_argument(f"--{field}", type=int, help="Override the profile's volume")
+    parser.add_argument("--items-per-order", type=float, help="Mean order items per order")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", help="End of the generated period (ISO 8601, UTC); default: now")
+    args = parser.parse_args()
+
+    overrides = {field: getattr(args, field) for field in ("users", "medicines", "pharmacies", "partners", "orders",
+                                                           "days", "items_per_order") if getattr(args, field)}
+    volumes = replace(PROFILES[args.profile], **overrides)
+    end = datetime.fromisoformat(args.end).replace(tzinfo=timezone.utc) if args.end else None
+    print("Generating " + ", ".join(f"{key}={value:,}" for key, value in asdict(volumes).items()
+                                    if isinstance(value, int)))
+    start = time.perf_counter()
+    counts = generate(args.database_url, volumes, args.seed, end)
+    elapsed = time.perf_counter() - start
+    for table, count in counts.items():
+        print(f"  {table:30} {count:>12,}")
+    total = sum(counts.values())
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Load test: concurrent virtual users running realistic shopping sessions.
+
+Seeds a database with benchmarks/datagen.py (users, a 100k medicine
+catalog, pharmacies, delivery partners and order history), then runs virtual users for a fixed duration.
+Each session is browse -> search -> cart -> checkout -> track; only part of
+the sessions check out, like real traffic. The app is driven either
+in-process (ASGI, no sockets) or over HTTP against a running server.
+
+Reports requests/s and p50/p95/p99 latency per route template and writes
+the run to benchmarks/results/ as JSON, keyed by git commit, so runs can be
+compared across commits with --compare.
+
+Usage:
+  python benchmarks/loadtest.py [--users 20] [--duration 30] [--medicines 100000]
+  python benchmarks/loadtest.py --mode http --url http://localhost:8000 \\
+      --database-url sqlite:///./medicine_delivery.db      # seeds the server's database first
+  python benchmarks/loadtest.py --compare benchmarks/results/<previous>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from datagen import CATEGORIES, CITIES, SALTS, USER_PASSWORD, Volumes, generate, user_email
+
+CHECKOUT_RATE = 0.35
+
+# --- seeding ----------------------------------------------------------------------------------
+
+def setup_environment(database_url: str, workdir: str):
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:6399")  # nothing listens: exercise the fallbacks
+    from app.config import settings
+    settings.DATABASE_URL = database_url
+    settings.UPLOAD_DIR = os.path.join(workdir, "uploads")
+    # Every virtual user shares one client address in-process
+    settings.RATE_LIMIT_ENABLED = False
+
+def is_seeded() -> bool:
+    import app.main  # noqa: F401  creates the tables
+    from app.database import SessionLocal
+    from app.models import User
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(User.email == user_email(0)).first() is not None
+    finally:
+        db.close()
+
+def seed(users: int, medicines: int, pharmacies: int, partners: int, orders_per_user: int, seed_value: int):
+    volumes = Volumes(users=users, medicines=medicines, pharmacies=pharmacies, partners=partners,
+                      orders=users * orders_per_user, days=180)
+    generate(os.environ["DATABASE_URL"], volumes, seed_value)
+
+# --- virtual users ----------------------------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, route: str, seconds: float, ok: bool):
+        self.samples.setdefault(route, []).append(seconds)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, index: int, rng: random.Random,
+                 think_time: float):
+        self.client = client
+        self.recorder = recorder
+        self.index = index
+        self.rng = rng
+        self.think_time = think_time
+        self.headers: Dict[str, str] = {}
+        self.location = rng.choice(CITIES)[1:3]
+
+    async def call(self, method: str, route: str, url: str, expect=(200,), **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.add(f"{method} {route}", time.perf_counter() - start, False)
+            return None
+        self.recorder.add(f"{method} {route}", time.perf_counter() - start, response.status_code in expect)
+        return response if response.status_code in expect else None
+
+    async def think(self):
+        if self.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+
+    async def login(self) -> bool:
+        response = await self.call("POST", "/auth/login", "/auth/login",
+                                   json={"email": user_email(self.index), "password": USER_PASSWORD})
+        if response is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def session(self):
+        rng = self.rng
+        # Browse: a category, narrowed by price like the app's filter chips
+        await self.call("GET", "/categories/", "/categories/")
+        await self.think()
+        category = rng.choice(CATEGORIES)
+        listing = await self.call("GET", "/medicines/search", "/medicines/search",
+                                  params={"category": category, "max_price": rng.choice([50, 100, 200])})
+        candidates = listing.json() if listing is not None else []
+        await self.think()
+
+        # Search by salt and strength; the product page shows alternatives
+        salt, strengths = rng.choice(SALTS)
+        found = await self.call("GET", "/medicines/search", "/medicines/search",
+                                params={"q": f"{salt} {rng.choice(strengths)}"})
+        results = found.json() if found is not None else []
+        if results:
+            await self.call("GET", "/medicines/{id}/alternatives", f"/medicines/{rng.choice(results)['id']}/alternatives")
+        await self.think()
+
+        # Cart: over-the-counter items only, no prescription upload in this flow
+        pool = [m for m in candidates + results if m["is_available"] and not m["prescription_required"]]
+        for medicine in rng.sample(pool, min(len(pool), rng.randint(1, 3))):
+            await self.call("POST", "/cart/items", "/cart/items", expect=(201,),
+                            json={"medicine_id": medicine["id"], "quantity": rng.randint(1, 2)})
+        await self.call("GET", "/cart/", "/cart/")
+        await self.think()
+
+        # Checkout, for part of the sessions
+        order_id = None
+        if pool and rng.random() < CHECKOUT_RATE:
+            lat, lng = self.location
+            await self.call("GET", "/delivery/estimate", "/delivery/estimate",
+                            params={"user_latitude": lat, "user_longitude": lng, "medicine_id": pool[0]["id"]})
+            order = await self.call("POST", "/orders/", "/orders/", expect=(201,),
+                                    json={"delivery_address": f"{self.index} Test Street"})
+            if order is not None:
+                order_id = order.json()["id"]
+            await self.think()
+
+        # Track: order history, then the latest order
+        history = await self.call("GET", "/orders/", "/orders/")
+        if order_id is None and history is not None and history.json():
+            order_id = history.json()[0]["id"]
+        if order_id is not None:
+            await self.call("GET", "/orders/{id}", f"/orders/{order_id}")
+            await self.call("GET", "/orders/{id}/track", f"/orders/{order_id}/track")
+
+    async def run(self, deadline: float) -> int:
+        sessions = 0
+        if not await self.login():
+            return sessions
+        while time.perf_counter() < deadline:
+            await self.session()
+            sessions += 1
+            await self.think()
+        return sessions
+
+async def warm_up(client: httpx.AsyncClient):
+    """Build the lazily created in-memory indexes and caches before anything is timed."""
+    response = await client.get("/medicines/search", params={"q": SALTS[0][0]})
+    response.raise_for_status()
+    if response.json():
+        await client.get(f"/medicines/{response.json()[0]['id']}/alternatives")
+    await client.get("/categories/")
+
+async def run_load(client_factory, users: int, duration: float, ramp_up: float, think_time: float,
+                   seed_value: int) -> dict:
+    recorder = Recorder()
+    async with client_factory() as client:
+        start = time.perf_counter()
+        await warm_up(client)
+        warm_up_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        deadline = start + ramp_up + duration
+
+        async def start_user(index: int):
+            await asyncio.sleep(ramp_up * index / max(users, 1))
+            user = VirtualUser(client, recorder, index, random.Random(seed_value * 1000 + index), think_time)
+            return await user.run(deadline)
+
+        sessions = await asyncio.gather(*(start_user(i) for i in range(users)))
+        elapsed = time.perf_counter() - start
+    return {"recorder": recorder, "sessions": sum(sessions), "elapsed": elapsed, "warm_up": warm_up_seconds}
+
+# --- reporting --------------------------------------------------------------------------------
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(samples: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(samples)
+    return {
+        "requests": len(values), "errors": errors, "rps": round(len(values) / elapsed, 2),
+        "mean_ms": round(1000 * sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 50), 2),
+        "p95_ms": round(1000 * percentile(values, 95), 2),
+        "p99_ms": round(1000 * percentile(values, 99), 2),
+        "max_ms": round(1000 * values[-1], 2) if values else 0.0,
+    }
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def print_report(result: dict, previous: Optional[dict] = None):
+    print(f"=== {result['mode']} load test @ {result['commit'][:10]}{' (dirty)' if result['dirty'] else ''}: "
+          f"{result['config']['users']} users, {result['elapsed_s']:.0f}s, {result['sessions']} sessions ===")
+    header = f"{'route':34} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header + ("  p95 vs prev" if previous else ""))
+    rows = sorted(result["routes"].items()) + [("TOTAL", result["total"])]
+    for route, stats in rows:
+        line = (f"{route:34} {stats['requests']:7d} {stats['errors']:5d} {stats['rps']:8.1f} "
+                f"{stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f}")
+        before = (previous or {}).get("routes", {}).get(route) if route != "TOTAL" else (previous or {}).get("total")
+        if before and before["p95_ms"]:
+            line += f"  {100 * (stats['p95_ms'] - before['p95_ms']) / before['p95_ms']:+6.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server for --mode http")
+    parser.add_argument("--database-url", help="Database to seed (default: a temporary SQLite file)")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the data already in the database")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of steady load after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=5)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between steps, seconds")
+    parser.add_argument("--medicines", type=int, default=100_000)
+    parser.add_argument("--seed-users", type=int, default=1_000)
+    parser.add_argument("--pharmacies", type=int, default=200)
+    parser.add_argument("--partners", type=int, default=500)
+    parser.add_argument("--orders-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=str(ROOT / "benchmarks" / "results"), help="Directory for JSON results")
+    parser.add_argument("--compare", help="Earlier result file to compare p95 latencies against")
+    args = parser.parse_args()
+    if args.users > args.seed_users:
+        parser.error("--users cannot exceed --seed-users")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = args.database_url or f"sqlite:///{workdir}/loadtest.db"
+        setup_environment(database_url, workdir)
+        if args.mode == "inprocess" or args.database_url:
+            if args.skip_seed or is_seeded():
+                print("Using existing data")
+            else:
+                start = time.perf_counter()
+                seed(args.seed_users, args.medicines, args.pharmacies, args.partners, args.orders_per_user, args.seed)
+                print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        if args.mode == "inprocess":
+            from app.main import app
+            def client_factory():
+                return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                         timeout=60)
+        else:
+            def client_factory():
+                limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+                return httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits)
+
+        outcome = asyncio.run(run_load(client_factory, args.users, args.duration, args.ramp_up, args.think_time,
+                                       args.seed))
+
+    recorder, elapsed = outcome["recorder"], outcome["elapsed"]
+    result = {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "mode": args.mode,
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "database_url")},
+        "warm_up_s": round(outcome["warm_up"], 2),
+        "elapsed_s": round(elapsed, 2),
+        "sessions": outcome["sessions"],
+        "routes": {route: summarize(samples, recorder.errors.get(route, 0), elapsed)
+                   for route, samples in recorder.samples.items()},
+        "total": summarize([s for samples in recorder.samples.values() for s in samples],
+                           sum(recorder.errors.values()), elapsed),
+    }
+    previous = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(result, previous)
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = output / f"loadtest-{args.mode}-{result['commit'][:10]}-{stamp}.json"
+    path.write_text(json.dumps(result, indent=2))
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
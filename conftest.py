@@ -0,0 +1,22 @@
+import os
+import tempfile
+import pytest
+
+# Tests run against a throwaway database and upload dir; set before app.config is imported
+_workdir = tempfile.mkdtemp(prefix="medicine-delivery-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(_workdir, "uploads")
+
+from app.utils.query_profiler import query_budget as _query_budget
+
+# Manual script against a running server, not a pytest module
+collect_ignore = ["test_api.py"]
+
+@pytest.fixture
+def query_budget():
+    """Declare how many queries a block may run, e.g. ``with query_budget(3): client.get("/cart/")``.
+
+    Fails the test on more statements than budgeted, or on an N+1 pattern
+    unless ``allow_n_plus_one=True``.
+    """
+    return _query_budget
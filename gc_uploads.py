@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Garbage collection for content-addressed upload storage.
+
+Recomputes reference counts from prescriptions, delivery proofs and medicines,
+then deletes blobs (and their image derivatives) nobody points at anymore.
+"""
+
+import argparse
+from datetime import timedelta
+
+from app.database import SessionLocal
+from app.utils.storage import recount_references, collect_garbage
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete unreferenced uploads")
+    parser.add_argument("--grace-minutes", type=int, default=60,
+                        help="Only delete blobs unreferenced for at least this long")
+    parser.add_argument("--skip-recount", action="store_true",
+                        help="Trust the stored reference counts")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not args.skip_recount:
+            changed = recount_references(db)
+            print(f"Reference counts corrected: {changed}")
+        removed = collect_garbage(db, timedelta(minutes=args.grace_minutes))
+        print(f"Blobs removed: {removed}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Bulk import of the medicine catalog from CSV or JSONL.
+
+Rows are validated with the MedicineCreate schema and written in chunks;
+rows carrying a SKU update the existing medicine with that SKU. The columns
+match GET /medicines/export. Running API servers keep their in-memory
+catalog indexes, so call POST /medicines/alternatives/rebuild afterwards
+(or restart them) to pick the new rows up in matching and alternatives.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from app.database import SessionLocal
+from app.utils.catalog_import import detect_format, iter_records, import_catalog
+
+def main():
+    parser = argparse.ArgumentParser(description="Import medicines from a CSV or JSONL file")
+    parser.add_argument("path", help="Catalog file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Rows validated and written per statement")
+    parser.add_argument("--errors", type=int, default=20,
+                        help="Row errors to print")
+    args = parser.parse_args()
+
+    fmt = detect_format(args.path, args.format)
+    if fmt is None:
+        parser.error("cannot tell the format from the file name, pass --format")
+
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        report = import_catalog(db, iter_records(stream, fmt), chunk_size=args.chunk_size)
+    finally:
+        db.close()
+        if stream is not sys.stdin:
+            stream.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {report['processed']} rows in {elapsed:.1f}s: "
+          f"{report['imported']} imported, {report['failed']} failed")
+    for error in report["errors"][:args.errors]:
+        print(json.dumps(error))
+    if report["failed"] > args.errors:
+        print(f"... {report['failed'] - args.errors} more")
+    sys.exit(1 if report["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ Database initialization script for Medicine Delivery API
 """
 
 from app.database import engine
-from app.models import User, Medicine, Category, Prescription, PrescriptionMedicine, Cart, CartItem, Order, OrderItem, DeliveryTracking, DeliveryProof, DeliveryPartner, Pharmacy, EmergencyDeliveryRequest
+from app.models import User, Medicine, Category, Prescription, PrescriptionMedicine, Cart, CartItem, Order, OrderItem, DeliveryTracking, DeliveryProof, DeliveryPartner, Pharmacy, EmergencyDeliveryRequest, StoredFile, OrderEvent, OutboxMessage
 from app.utils.auth import get_password_hash
 
 def init_database():
@@ -26,6 +26,9 @@ def init_database():
     DeliveryPartner.metadata.create_all(bind=engine)
     Pharmacy.metadata.create_all(bind=engine)
     EmergencyDeliveryRequest.metadata.create_all(bind=engine)
+    StoredFile.metadata.create_all(bind=engine)
+    OrderEvent.metadata.create_all(bind=engine)
+    OutboxMessage.metadata.create_all(bind=engine)
     
     print("Database tables created successfully!")
     print("You can now start the application with: python run.py")
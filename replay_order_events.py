@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Rebuild delivery tracking status from the order event log.
+
+Each order's tracking row is reset to its latest event, which repairs rows
+left behind by lost or failed outbox deliveries.
+"""
+
+import argparse
+
+from app.database import SessionLocal
+from app.utils.order_events import rebuild_tracking
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild delivery tracking from order events")
+    parser.add_argument("--order-id", type=int, action="append", dest="order_ids",
+                        help="Only this order (repeatable); default is every order with events")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Orders per query and commit")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        changed = rebuild_tracking(db, args.order_ids, args.chunk_size)
+        print(f"Tracking rows updated: {changed}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
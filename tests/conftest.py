@@ -0,0 +1,30 @@
+import pytest
+
+@pytest.fixture(scope="session")
+def app():
+    from app.main import app
+    return app
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+    # Not entered as a context manager: startup would run the outbox relay, whose
+    # polling would show up in query budgets
+    return TestClient(app)
+
+def _login(client, email: str, role: str, phone: str) -> dict:
+    client.post("/auth/register", json={
+        "email": email, "phone": phone, "password": "password123",
+        "first_name": "Test", "last_name": role.title(), "role": role
+    })
+    response = client.post("/auth/login", json={"email": email, "password": "password123"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(scope="session")
+def user_headers(client):
+    return _login(client, "customer@example.com", "user", "+15550000001")
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return _login(client, "admin@example.com", "admin", "+15550000002")
